@@ -0,0 +1,149 @@
+"""Partition contacts by user
+
+Revision ID: 224e6c7a0ab4
+Revises: d4ecec2e4a8e
+Create Date: 2026-10-19 12:00:00.000000
+
+Moves ``contacts`` to a table hash-partitioned on ``user_id`` while the app
+keeps serving:
+
+1. create ``contacts_partitioned`` with ``POSTGRES_CONTACTS_PARTITIONS``
+   partitions (override with ``alembic -x partitions=N upgrade head``);
+2. mirror every write on ``contacts`` into it with a trigger;
+3. copy the existing rows in id batches (``-x batch_size=N``), each batch in
+   its own transaction, locking only the rows being copied;
+4. swap the tables under a short exclusive lock.
+
+Unique constraints on a partitioned table must include the partition key, so
+the global ``phone`` and ``email`` constraints become per-user constraints.
+Only Postgres is migrated; other databases keep a plain table.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from src.settings import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '224e6c7a0ab4'
+down_revision: Union[str, None] = 'd4ecec2e4a8e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, user_id, first_name, last_name, phone, email, birth_date, extra"
+
+CREATE_PARTITIONED = """
+CREATE TABLE contacts_partitioned (
+    id         integer      NOT NULL DEFAULT nextval('contacts_id_seq'),
+    user_id    integer      NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    first_name varchar(15)  NOT NULL,
+    last_name  varchar(15),
+    phone      varchar(15)  NOT NULL,
+    email      varchar(25),
+    birth_date date,
+    extra      varchar(150),
+    CONSTRAINT contacts_partitioned_pkey PRIMARY KEY (id, user_id),
+    CONSTRAINT uq_contacts_user_phone UNIQUE (user_id, phone),
+    CONSTRAINT uq_contacts_user_email UNIQUE (user_id, email)
+) PARTITION BY HASH (user_id)
+"""
+
+CREATE_MIRROR = f"""
+CREATE FUNCTION contacts_mirror() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM contacts_partitioned WHERE id = OLD.id AND user_id = OLD.user_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO contacts_partitioned ({COLUMNS})
+        VALUES (NEW.id, NEW.user_id, NEW.first_name, NEW.last_name,
+                NEW.phone, NEW.email, NEW.birth_date, NEW.extra);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# FOR SHARE makes a batch wait for concurrent writers of its rows (and skip rows
+# they deleted), so the trigger and the copy cannot resurrect a deleted contact.
+COPY_BATCH = f"""
+INSERT INTO contacts_partitioned ({COLUMNS})
+SELECT {COLUMNS} FROM contacts WHERE id > :low AND id <= :high FOR SHARE
+ON CONFLICT DO NOTHING
+"""
+
+
+def _option(name: str, default: int) -> int:
+    return int(context.get_x_argument(as_dictionary=True).get(name, default))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    partitions = _option("partitions", settings.postgres.contacts_partitions)
+    batch_size = _option("batch_size", 10_000)
+
+    op.execute(CREATE_PARTITIONED)
+    for remainder in range(partitions):
+        op.execute(
+            f"CREATE TABLE contacts_p{remainder} PARTITION OF contacts_partitioned "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        )
+    op.execute(CREATE_MIRROR)
+    op.execute(
+        "CREATE TRIGGER contacts_mirror AFTER INSERT OR UPDATE OR DELETE ON contacts "
+        "FOR EACH ROW EXECUTE FUNCTION contacts_mirror()"
+    )
+
+    # Rows written from here on are mirrored; copy everything older in batches.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM contacts")).scalar()
+        for low in range(0, max_id, batch_size):
+            bind.execute(sa.text(COPY_BATCH), {"low": low, "high": low + batch_size})
+
+    op.execute("SET LOCAL lock_timeout = '10s'")
+    op.execute("LOCK TABLE contacts IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER contacts_mirror ON contacts")
+    op.execute("DROP FUNCTION contacts_mirror()")
+    op.execute("ALTER TABLE contacts RENAME TO contacts_old")
+    op.execute("ALTER TABLE contacts_partitioned RENAME TO contacts")
+    op.execute("ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id")
+    op.execute("DROP TABLE contacts_old")
+    op.execute("ALTER TABLE contacts RENAME CONSTRAINT contacts_partitioned_pkey TO contacts_pkey")
+    op.execute("ANALYZE contacts")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    # Fails if two users share a phone or email, which the per-user constraints allowed.
+    op.execute("""
+        CREATE TABLE contacts_unpartitioned (
+            id         integer      NOT NULL DEFAULT nextval('contacts_id_seq'),
+            user_id    integer      NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            first_name varchar(15)  NOT NULL,
+            last_name  varchar(15),
+            phone      varchar(15)  NOT NULL,
+            email      varchar(25),
+            birth_date date,
+            extra      varchar(150),
+            CONSTRAINT contacts_unpartitioned_pkey PRIMARY KEY (id),
+            CONSTRAINT contacts_unpartitioned_phone_key UNIQUE (phone),
+            CONSTRAINT contacts_unpartitioned_email_key UNIQUE (email)
+        )
+    """)
+    op.execute(f"INSERT INTO contacts_unpartitioned ({COLUMNS}) SELECT {COLUMNS} FROM contacts")
+    op.execute("ALTER TABLE contacts RENAME TO contacts_old")
+    op.execute("ALTER TABLE contacts_unpartitioned RENAME TO contacts")
+    op.execute("ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id")
+    op.execute("DROP TABLE contacts_old")
+    op.execute("ALTER TABLE contacts RENAME CONSTRAINT contacts_unpartitioned_pkey TO contacts_pkey")
+    op.execute("ALTER TABLE contacts RENAME CONSTRAINT contacts_unpartitioned_phone_key TO contacts_phone_key")
+    op.execute("ALTER TABLE contacts RENAME CONSTRAINT contacts_unpartitioned_email_key TO contacts_email_key")
@@ -0,0 +1,61 @@
+"""Add contact versions and tombstones
+
+Revision ID: 225a1a85fbfe
+Revises: 224e6c7a0ab4
+Create Date: 2026-10-19 14:00:00.000000
+
+Existing contacts are numbered 1..n per user, so a full sync (``since=0``)
+returns them and paginates without ties.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '225a1a85fbfe'
+down_revision: Union[str, None] = '224e6c7a0ab4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('contacts_version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('contacts', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('contacts', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("""
+        UPDATE contacts SET version = numbered.version
+        FROM (
+            SELECT id, user_id, row_number() OVER (PARTITION BY user_id ORDER BY id) AS version
+            FROM contacts
+        ) AS numbered
+        WHERE contacts.id = numbered.id AND contacts.user_id = numbered.user_id
+    """)
+    op.execute("""
+        UPDATE users SET contacts_version = (
+            SELECT coalesce(max(version), 0) FROM contacts WHERE contacts.user_id = users.id
+        )
+    """)
+    op.create_index('ix_contacts_user_version', 'contacts', ['user_id', 'version'])
+    op.create_table(
+        'contact_tombstones',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('contact_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'contact_id'),
+    )
+    op.create_index('ix_contact_tombstones_user_version', 'contact_tombstones', ['user_id', 'version'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contact_tombstones_user_version', table_name='contact_tombstones')
+    op.drop_table('contact_tombstones')
+    op.drop_index('ix_contacts_user_version', table_name='contacts')
+    op.drop_column('contacts', 'updated_at')
+    op.drop_column('contacts', 'version')
+    op.drop_column('users', 'contacts_version')
@@ -0,0 +1,68 @@
+"""Add normalized phone and email
+
+Revision ID: d3d38abbf8da
+Revises: 225a1a85fbfe
+Create Date: 2026-10-19 16:00:00.000000
+
+Existing rows are backfilled in id batches (``alembic -x batch_size=N``)
+outside the migration transaction, with the same normalisers the application
+uses on write. Rows written during the backfill are normalised by the
+application itself; a row changed after its batch was read is skipped.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from src.utils.normalize import normalize_email, normalize_phone
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3d38abbf8da'
+down_revision: Union[str, None] = '225a1a85fbfe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SELECT_BATCH = sa.text(
+    "SELECT id, user_id, phone, email FROM contacts WHERE id > :low AND id <= :high"
+)
+UPDATE_ROW = sa.text(
+    "UPDATE contacts SET phone_normalized = :phone_normalized, email_normalized = :email_normalized "
+    "WHERE id = :id AND user_id = :user_id AND phone = :phone AND coalesce(email, '') = :email"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column('phone_normalized', sa.String(length=20), nullable=True))
+    op.add_column('contacts', sa.Column('email_normalized', sa.String(length=25), nullable=True))
+
+    batch_size = int(context.get_x_argument(as_dictionary=True).get("batch_size", 5_000))
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM contacts")).scalar()
+        for low in range(0, max_id, batch_size):
+            rows = bind.execute(SELECT_BATCH, {"low": low, "high": low + batch_size}).all()
+            if rows:
+                bind.execute(UPDATE_ROW, [
+                    {
+                        "id": row.id,
+                        "user_id": row.user_id,
+                        "phone": row.phone,
+                        "email": row.email or "",
+                        "phone_normalized": normalize_phone(row.phone),
+                        "email_normalized": normalize_email(row.email),
+                    }
+                    for row in rows
+                ])
+
+    op.create_index('ix_contacts_user_phone_normalized', 'contacts', ['user_id', 'phone_normalized'])
+    op.create_index('ix_contacts_user_email_normalized', 'contacts', ['user_id', 'email_normalized'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_user_email_normalized', table_name='contacts')
+    op.drop_index('ix_contacts_user_phone_normalized', table_name='contacts')
+    op.drop_column('contacts', 'email_normalized')
+    op.drop_column('contacts', 'phone_normalized')
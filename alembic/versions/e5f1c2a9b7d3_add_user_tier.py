@@ -0,0 +1,29 @@
+"""Add user tier
+
+Revision ID: e5f1c2a9b7d3
+Revises: d3d38abbf8da
+Create Date: 2026-10-19 18:00:00.000000
+
+Existing users stay in the default rate limit tier (NULL).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f1c2a9b7d3'
+down_revision: Union[str, None] = 'd3d38abbf8da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('tier', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'tier')
@@ -0,0 +1,97 @@
+"""
+Sign and verify throughput of the JWT backends.
+
+Builds every backend from :mod:`src.utils.jwt_backend` for HS256, ES256,
+EdDSA and RS256 with freshly generated keys and reports operations per
+second for signing and verifying an access-token-sized payload. Pairs a
+backend does not support (python-jose has no EdDSA) are skipped.
+
+Usage::
+
+    python -m benchmarks.jwt_backends
+    python -m benchmarks.jwt_backends --seconds 2 --algorithms HS256 EdDSA
+"""
+import argparse
+import secrets
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from src.utils.jwt_backend import BACKENDS, create_backend
+
+ALGORITHMS = ("HS256", "ES256", "EdDSA", "RS256")
+
+
+def generate_keys(algorithm: str) -> tuple[str | bytes, str | bytes]:
+    if algorithm.startswith("HS"):
+        secret = secrets.token_hex(32)
+        return secret, secret
+    if algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return private_pem, public_pem
+
+
+def ops_per_second(func: Callable[[], object], seconds: float) -> float:
+    for _ in range(50):
+        func()
+    operations = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            func()
+        operations += 100
+    return operations / (time.perf_counter() - started)
+
+
+def main(args: argparse.Namespace) -> int:
+    now = datetime.now(timezone.utc)
+    payload = {
+        "sub": "12345",
+        "sid": secrets.token_urlsafe(16),
+        "jti": secrets.token_urlsafe(16),
+        "token_type": "access",
+        "iat": now,
+        "exp": now + timedelta(minutes=15),
+    }
+
+    print(f"{'algorithm':<10}{'backend':<8}{'sign ops/s':>14}{'verify ops/s':>14}")
+    for algorithm in args.algorithms:
+        signing_key, verifying_key = generate_keys(algorithm)
+        for name in args.backends:
+            try:
+                backend = create_backend(name, algorithm, signing_key, verifying_key)
+            except (ValueError, RuntimeError) as e:
+                print(f"{algorithm:<10}{name:<8}{'skipped: ' + str(e):>28}")
+                continue
+            token = backend.encode(payload)
+            sign = ops_per_second(lambda: backend.encode(payload), args.seconds)
+            verify = ops_per_second(lambda: backend.decode(token), args.seconds)
+            print(f"{algorithm:<10}{name:<8}{sign:>14,.0f}{verify:>14,.0f}")
+    return 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="Measuring time per operation.")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS))
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,371 @@
+"""
+Load and latency benchmark for the REST API.
+
+Seeds a dataset, then drives the real ASGI app with concurrent clients, either
+in-process (``--transport asgi``) or through uvicorn over a local socket
+(``--transport http``). Redis, SMTP and Cloudinary are replaced by the local
+stand-ins from :mod:`benchmarks.standins`.
+
+Usage::
+
+    python -m benchmarks.load --duration 10 --concurrency 16
+    python -m benchmarks.load --save-baseline
+    python -m benchmarks.load --baseline benchmarks/baseline.json --tolerance 0.15
+
+Results are written as JSON; when a baseline is given, scenarios whose p95
+latency or throughput regressed by more than the tolerance are reported and
+the process exits with status 1.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+import uvicorn
+from sqlalchemy import select
+
+from benchmarks import seed as seed_data
+from benchmarks import standins
+from main import app
+from src.database.models import ContactORM, UserORM
+
+RESULTS_DIR = Path(__file__).parent / "results"
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+FIRST_NAMES = ["Olena", "Taras", "Iryna", "Andrii", "Sofiia", "Maksym", "Anna", "Dmytro", "Kateryna", "Oleh"]
+LAST_NAMES = ["Shevchenko", "Koval", "Bondarenko", "Tkachenko", "Kravets", "Melnyk", "Boiko", "Lysenko"]
+PASSWORD = "BenchPass123"
+
+
+@dataclass
+class Fixture:
+    session_users: list[dict]
+    login_users:   list[str]
+    counter:       itertools.count = field(default_factory=lambda: itertools.count(1))
+
+
+@dataclass
+class Scenario:
+    name:     str
+    run:      Callable[[httpx.AsyncClient, Fixture, int], Awaitable[httpx.Response | None]]
+    expected: tuple[int, ...] = (200,)
+
+
+def _auth(user: dict) -> dict[str, str]:
+    return {"Authorization": f"Bearer {user['access_token']}"}
+
+
+def _unique_phone(fixture: Fixture) -> str:
+    return f"+999{next(fixture.counter):09d}"
+
+
+async def signup(client, fixture, worker):
+    n = next(fixture.counter)
+    return await client.post("/auth/signup", json={
+        "email": f"s{n}@bench.io", "password": PASSWORD, "first_name": "Bench", "last_name": "User",
+    })
+
+
+async def login(client, fixture, worker):
+    email = fixture.login_users[worker % len(fixture.login_users)]
+    return await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+
+
+async def refresh(client, fixture, worker):
+    # Refresh tokens rotate, so each worker keeps the latest one of its user.
+    user = fixture.session_users[worker % len(fixture.session_users)]
+    response = await client.post("/auth/refresh", headers={"Authorization": f"Bearer {user['refresh_token']}"})
+    if response.status_code == 200 and response.json().get("refresh_token"):
+        user["refresh_token"] = response.json()["refresh_token"]
+    return response
+
+
+async def users_me(client, fixture, worker):
+    user = fixture.session_users[worker % len(fixture.session_users)]
+    return await client.get("/users/me", headers=_auth(user))
+
+
+async def list_contacts(client, fixture, worker):
+    user = fixture.session_users[worker % len(fixture.session_users)]
+    return await client.get("/contacts", headers=_auth(user))
+
+
+async def filter_contacts(client, fixture, worker):
+    user = fixture.session_users[worker % len(fixture.session_users)]
+    return await client.get("/contacts", params={"first_name": random.choice(FIRST_NAMES)}, headers=_auth(user))
+
+
+async def upcoming_birthdays(client, fixture, worker):
+    user = fixture.session_users[worker % len(fixture.session_users)]
+    return await client.get("/contacts/upcoming-birthdays", params={"days": 30}, headers=_auth(user))
+
+
+async def read_contact(client, fixture, worker):
+    user = fixture.session_users[worker % len(fixture.session_users)]
+    return await client.get(f"/contacts/{random.choice(user['contact_ids'])}", headers=_auth(user))
+
+
+async def create_contact(client, fixture, worker):
+    user = fixture.session_users[worker % len(fixture.session_users)]
+    return await client.post("/contacts", headers=_auth(user), json={
+        "first_name": random.choice(FIRST_NAMES), "last_name": random.choice(LAST_NAMES),
+        "phone": _unique_phone(fixture),
+    })
+
+
+async def update_contact(client, fixture, worker):
+    user = fixture.session_users[worker % len(fixture.session_users)]
+    return await client.put(f"/contacts/{random.choice(user['contact_ids'])}", headers=_auth(user), json={
+        "first_name": random.choice(FIRST_NAMES), "last_name": random.choice(LAST_NAMES),
+        "phone": _unique_phone(fixture),
+    })
+
+
+async def patch_birth_date(client, fixture, worker):
+    user = fixture.session_users[worker % len(fixture.session_users)]
+    birth_date = date(1990, 1, 1) + timedelta(days=random.randrange(365))
+    return await client.patch(
+        f"/contacts/{random.choice(user['contact_ids'])}", headers=_auth(user),
+        json={"birth_date": birth_date.isoformat()},
+    )
+
+
+async def delete_contact(client, fixture, worker):
+    user = fixture.session_users[worker % len(fixture.session_users)]
+    if not user["disposable_ids"]:
+        return None
+    return await client.delete(f"/contacts/{user['disposable_ids'].pop()}", headers=_auth(user))
+
+
+SCENARIOS = [
+    Scenario("signup", signup, (201,)),
+    Scenario("login", login),
+    Scenario("refresh", refresh),
+    Scenario("users_me", users_me),
+    Scenario("list_contacts", list_contacts),
+    Scenario("filter_contacts", filter_contacts, (200, 404)),
+    Scenario("upcoming_birthdays", upcoming_birthdays, (200, 404)),
+    Scenario("read_contact", read_contact),
+    Scenario("create_contact", create_contact, (201,)),
+    Scenario("update_contact", update_contact),
+    Scenario("patch_birth_date", patch_birth_date),
+    Scenario("delete_contact", delete_contact, (204,)),
+]
+
+
+def seed(session_factory, url: str, users: int, contacts_per_user: int, disposable_per_user: int) -> list[int]:
+    """
+    Seeds confirmed users and their contacts with :mod:`benchmarks.seed`.
+    Returns the created user ids.
+    """
+    engine = session_factory.kw["bind"]
+    user_ids = seed_data.seed_users(engine, users, PASSWORD)
+    total = len(user_ids) * (contacts_per_user + disposable_per_user)
+    chunks = seed_data.plan_chunks(engine, user_ids, total, chunk_size=50_000, seed=42)
+    seed_data.seed_contacts(engine, url, chunks, workers=None, batch_size=10_000)
+    seed_data.number_contacts(engine, user_ids)
+    print(file=sys.stderr)
+    return user_ids
+
+
+async def prepare_fixture(client, session_factory, user_ids: list[int], login_pool: int,
+                          contacts_per_user: int) -> Fixture:
+    login_ids, session_ids = user_ids[:login_pool], user_ids[login_pool:]
+    with session_factory() as db:
+        emails = dict(db.execute(select(UserORM.id, UserORM.email).where(UserORM.id.in_(user_ids))).all())
+        contact_rows = db.execute(
+            select(ContactORM.user_id, ContactORM.id).where(ContactORM.user_id.in_(session_ids)).order_by(ContactORM.id)
+        ).all()
+
+    contacts: dict[int, list[int]] = {}
+    for user_id, contact_id in contact_rows:
+        contacts.setdefault(user_id, []).append(contact_id)
+
+    session_users = []
+    for user_id in session_ids:
+        response = await client.post("/auth/login", data={"username": emails[user_id], "password": PASSWORD})
+        response.raise_for_status()
+        ids = contacts.get(user_id, [])
+        session_users.append({
+            **response.json(),
+            "contact_ids": ids[:contacts_per_user],
+            "disposable_ids": ids[contacts_per_user:],
+        })
+    return Fixture(session_users=session_users, login_users=[emails[user_id] for user_id in login_ids])
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_scenario(client, fixture: Fixture, scenario: Scenario, concurrency: int,
+                       duration: float, max_requests: int | None) -> dict:
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+    issued = itertools.count()
+
+    async def worker(worker_id: int):
+        while time.perf_counter() < deadline:
+            if max_requests is not None and next(issued) >= max_requests:
+                return
+            started = time.perf_counter()
+            try:
+                response = await scenario.run(client, fixture, worker_id)
+                if response is None:
+                    return
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status not in scenario.expected:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests":       len(latencies),
+        "errors":         errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms":        round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "p50_ms":         round(percentile(latencies, 50), 3),
+        "p95_ms":         round(percentile(latencies, 95), 3),
+        "p99_ms":         round(percentile(latencies, 99), 3),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Returns a description of every scenario that regressed against the baseline.
+    """
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {previous['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} req/s"
+            )
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{'scenario':<20}{'req':>8}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in results["scenarios"].items():
+        print(
+            f"{name:<20}{r['requests']:>8}{sum(r['errors'].values()):>6}{r['throughput_rps']:>10.1f}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+        )
+
+
+async def open_client(transport: str, port: int) -> tuple[httpx.AsyncClient, uvicorn.Server | None]:
+    if transport == "asgi":
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench"), None
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    return httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits), server
+
+
+async def main(args: argparse.Namespace) -> int:
+    random.seed(args.seed)
+    session_factory = standins.create_database(args.db_url)
+    standins.install(app, session_factory)
+    smtp, smtp_handler = standins.start_smtp_sink()
+
+    user_ids = seed(session_factory, args.db_url, args.users, args.contacts, args.disposable)
+    client, server = await open_client(args.transport, args.port)
+    try:
+        fixture = await prepare_fixture(client, session_factory, user_ids, args.login_users, args.contacts)
+        selected = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+        results = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                **{key: value for key, value in vars(args).items() if key not in ("baseline", "output")},
+            },
+            "scenarios": {},
+        }
+        for scenario in selected:
+            results["scenarios"][scenario.name] = await run_scenario(
+                client, fixture, scenario, args.concurrency, args.duration, args.requests,
+            )
+        results["meta"]["emails_sent"] = smtp_handler.received
+    finally:
+        await client.aclose()
+        if server is not None:
+            server.should_exit = True
+        smtp.stop()
+        standins.dispose(session_factory)
+
+    print_table(results)
+
+    output = args.output or RESULTS_DIR / f"load-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, default=str))
+    print(f"\nResults written to {output}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, default=str))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if args.baseline.exists():
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            print("\n".join(f"  {line}" for line in regressions))
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default="sqlite:///./bench.db", help="Database to seed and benchmark against.")
+    parser.add_argument("--transport", choices=("asgi", "http"), default="asgi")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --transport http.")
+    parser.add_argument("--users", type=int, default=60, help="Seeded users.")
+    parser.add_argument("--login-users", type=int, default=10, help="Seeded users reserved for the login scenario.")
+    parser.add_argument("--contacts", type=int, default=200, help="Seeded contacts per user.")
+    parser.add_argument("--disposable", type=int, default=100, help="Extra contacts per user for the delete scenario.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per scenario.")
+    parser.add_argument("--requests", type=int, default=None, help="Optional cap on requests per scenario.")
+    parser.add_argument("--scenario", action="append", choices=[s.name for s in SCENARIOS])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression.")
+    args = parser.parse_args(argv)
+    if args.login_users >= args.users:
+        parser.error("--login-users must be lower than --users")
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,128 @@
+"""
+Per-request latency of the rate limiters.
+
+Runs the same endpoint through the ASGI stack without a limiter, with
+``fastapi_limiter``'s RateLimiter (one Lua round trip per request) and with
+:class:`src.services.rate_limit.RateLimiter` (batched leases), and reports
+the overhead each limiter adds.
+
+Usage::
+
+    python -m benchmarks.rate_limit --redis-url redis://localhost:6379/15
+    python -m benchmarks.rate_limit --fake --latency-ms 0.5
+
+``--fake`` uses fakeredis with an artificial round-trip delay instead of a
+real server. Limits are set high enough that no request is rejected, so a
+lease covers many requests; with a limit of N per window a worker goes to
+Redis once every ``ceil(N * RATE_LIMIT_LEASE_FRACTION)`` requests instead.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi_limiter import FastAPILimiter
+from fastapi_limiter.depends import RateLimiter as FastAPILimiterRateLimiter
+from redis.asyncio import Redis
+
+from src.services.auth import get_current_user
+from src.services.rate_limit import RateLimiter, limiter
+from src.settings import RateLimit, settings
+
+LIMIT = 10_000_000
+
+
+def create_redis(args: argparse.Namespace) -> Redis:
+    if not args.fake:
+        return Redis.from_url(args.redis_url)
+
+    from fakeredis import FakeAsyncRedis
+
+    class SlowFakeRedis(FakeAsyncRedis):
+        async def execute_command(self, *args, **options):
+            await asyncio.sleep(latency)
+            return await super().execute_command(*args, **options)
+
+    latency = args.latency_ms / 1000
+    return SlowFakeRedis()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    settings.rate_limit.routes["bench"] = RateLimit(times=LIMIT, seconds=60)
+
+    async def current_user():
+        return SimpleNamespace(id=1)
+
+    app.dependency_overrides[get_current_user] = current_user
+
+    @app.get("/none")
+    async def no_limiter():
+        return {}
+
+    @app.get("/fastapi-limiter", dependencies=[Depends(FastAPILimiterRateLimiter(times=LIMIT, seconds=60))])
+    async def with_fastapi_limiter():
+        return {}
+
+    @app.get("/gcra", dependencies=[Depends(RateLimiter("bench"))])
+    async def with_gcra_limiter():
+        return {}
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path)
+        samples.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return samples
+
+
+async def main(args: argparse.Namespace) -> int:
+    redis = create_redis(args)
+    await redis.flushdb()
+    await FastAPILimiter.init(redis)
+    limiter.init(redis)
+
+    app = create_app()
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/none", "/fastapi-limiter", "/gcra"):
+            await measure(client, path, args.warmup)
+            results[path] = await measure(client, path, args.requests)
+
+    await FastAPILimiter.close()
+    limiter.init(None)
+
+    baseline = statistics.median(results["/none"])
+    print(f"{'limiter':<18}{'p50 ms':>10}{'p95 ms':>10}{'overhead p50 ms':>18}")
+    for path, samples in results.items():
+        p50 = statistics.median(samples)
+        p95 = statistics.quantiles(samples, n=20)[-1]
+        print(f"{path.strip('/'):<18}{p50:>10.3f}{p95:>10.3f}{p50 - baseline:>18.3f}")
+
+    saved = statistics.median(results["/fastapi-limiter"]) - statistics.median(results["/gcra"])
+    print(f"\nLatency saved per request (p50): {saved:.3f} ms")
+    return 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default=f"redis://{settings.redis.host}:{settings.redis.port}/15")
+    parser.add_argument("--fake", action="store_true", help="Use fakeredis instead of a Redis server.")
+    parser.add_argument("--latency-ms", type=float, default=0.3, help="Simulated round trip with --fake.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,271 @@
+"""
+Synthetic data seeding for benchmarks and capacity planning.
+
+Generates confirmed users and realistic contacts (unique phones and emails,
+birthdays spread over the whole year) and bulk-loads them, numbered per user
+like contacts written through the API. Generation runs in parallel worker
+processes; on Postgres every worker streams its chunk with ``COPY ... FROM
+STDIN``, on SQLite the chunks are written by the parent process with batched
+multi-row inserts (SQLite allows a single writer).
+
+Usage::
+
+    python -m benchmarks.seed --users 5000 --contacts 10000000 --workers 8
+    python -m benchmarks.seed --db-url sqlite:///./bench.db --users 100 --contacts 100000
+
+Seeded phones use the unassigned +999 country code and emails the seed.io
+domain, numbered after the current maximum ids, so repeated runs never collide
+with each other or with real data.
+"""
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator
+
+from sqlalchemy import create_engine, event, func, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from src.database.models import ContactORM, UserORM
+from src.services.auth import hash_password
+from src.settings import settings
+from src.utils.normalize import normalize_email, normalize_phone
+
+FIRST_NAMES = [
+    "Olena", "Taras", "Iryna", "Andrii", "Sofiia", "Maksym", "Anna", "Dmytro", "Kateryna", "Oleh",
+    "Yuliia", "Bohdan", "Mariia", "Serhii", "Nataliia", "Ivan", "Oksana", "Roman", "Daryna", "Petro",
+    "James", "Emma", "Liam", "Olivia", "Noah", "Ava", "Lucas", "Mia", "Ethan", "Chloe",
+]
+LAST_NAMES = [
+    "Shevchenko", "Koval", "Bondarenko", "Tkachenko", "Kravets", "Melnyk", "Boiko", "Lysenko",
+    "Marchenko", "Rudenko", "Savchenko", "Polishchuk", "Smith", "Johnson", "Brown", "Miller",
+    "Davis", "Wilson", "Taylor", "Anderson",
+]
+EXTRAS = ["Work", "Family", "Gym", "School friend", "Neighbour", "Met at conference", "Dentist"]
+
+# Bulk loads bypass the ORM validators, so the normalized columns are filled here
+CONTACT_COLUMNS = (
+    "user_id", "first_name", "last_name", "phone", "email", "birth_date", "extra",
+    "phone_normalized", "email_normalized",
+)
+
+BIRTH_YEARS = range(1950, 2011)
+
+
+@dataclass(frozen=True)
+class Chunk:
+    index:    int
+    start:    int
+    size:     int
+    user_ids: tuple[int, ...]
+    seed:     int
+
+
+def contact_phone(n: int) -> str:
+    return f"+999{n:011d}"
+
+
+def contact_email(n: int) -> str:
+    return f"c{n}@seed.io"
+
+
+def generate_contacts(chunk: Chunk) -> Iterator[tuple]:
+    """
+    Yields contact rows (in ``CONTACT_COLUMNS`` order) for one chunk.
+    Roughly 80% have an email, 70% a birthday and 20% a note.
+    """
+    rng = random.Random(chunk.seed + chunk.index)
+    choice, rand, randrange = rng.choice, rng.random, rng.randrange
+    user_ids = chunk.user_ids
+    jan_first = {year: date(year, 1, 1) for year in BIRTH_YEARS}
+    for n in range(chunk.start, chunk.start + chunk.size):
+        birth_date = None
+        if rand() < 0.7:
+            birth_date = jan_first[choice(BIRTH_YEARS)] + timedelta(days=randrange(365))
+        phone = contact_phone(n)
+        email = contact_email(n) if rand() < 0.8 else None
+        yield (
+            choice(user_ids),
+            choice(FIRST_NAMES),
+            choice(LAST_NAMES),
+            phone,
+            email,
+            birth_date,
+            choice(EXTRAS) if rand() < 0.2 else None,
+            normalize_phone(phone),
+            normalize_email(email),
+        )
+
+
+def _copy_chunk(url: str, chunk: Chunk) -> int:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(generate_contacts(chunk))
+    buffer.seek(0)
+
+    engine = create_engine(url, poolclass=NullPool)
+    sql = f"COPY {ContactORM.__tablename__} ({', '.join(CONTACT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        if engine.dialect.driver == "psycopg2":
+            cursor.copy_expert(sql, buffer)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        conn.commit()
+    finally:
+        conn.close()
+        engine.dispose()
+    return chunk.size
+
+
+def _generate_chunk(chunk: Chunk) -> list[tuple]:
+    return list(generate_contacts(chunk))
+
+
+def seed_users(engine: Engine, count: int, password: str, batch_size: int = 1000) -> list[int]:
+    """
+    Inserts ``count`` confirmed users sharing one password hash with batched
+    multi-row inserts and returns their ids.
+    """
+    hashed_password = hash_password(password)
+    created_at = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        offset = conn.scalar(select(func.coalesce(func.max(UserORM.id), 0)))
+        user_ids = []
+        for start in range(0, count, batch_size):
+            rows = [
+                {
+                    "email": f"seed{offset + i}@seed.io",
+                    "hashed_password": hashed_password,
+                    "first_name": FIRST_NAMES[i % len(FIRST_NAMES)],
+                    "last_name": LAST_NAMES[i % len(LAST_NAMES)],
+                    "confirmed": True,
+                    "created_at": created_at,
+                }
+                for i in range(start, min(start + batch_size, count))
+            ]
+            user_ids.extend(conn.scalars(insert(UserORM).values(rows).returning(UserORM.id)))
+    return user_ids
+
+
+def plan_chunks(engine: Engine, user_ids: list[int], count: int, chunk_size: int, seed: int) -> list[Chunk]:
+    with engine.connect() as conn:
+        offset = conn.scalar(select(func.coalesce(func.max(ContactORM.id), 0)))
+    ids = tuple(user_ids)
+    return [
+        Chunk(index=i, start=offset + start, size=min(chunk_size, count - start), user_ids=ids, seed=seed)
+        for i, start in enumerate(range(0, count, chunk_size))
+    ]
+
+
+def seed_contacts(engine: Engine, url: str, chunks: list[Chunk], workers: int, batch_size: int) -> int:
+    """
+    Generates the chunks in ``workers`` processes and loads them: with parallel
+    ``COPY`` on Postgres, with batched inserts from this process on SQLite.
+    """
+    loaded = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if engine.dialect.name == "postgresql":
+            futures = [pool.submit(_copy_chunk, url, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                loaded += future.result()
+                _progress(loaded)
+            with engine.begin() as conn:
+                conn.execute(text(f"ANALYZE {ContactORM.__tablename__}"))
+            return loaded
+
+        placeholders = ", ".join("?" for _ in CONTACT_COLUMNS)
+        sql = f"INSERT INTO {ContactORM.__tablename__} ({', '.join(CONTACT_COLUMNS)}) VALUES ({placeholders})"
+        with engine.begin() as conn:
+            for rows in pool.map(_generate_chunk, chunks):
+                for start in range(0, len(rows), batch_size):
+                    conn.exec_driver_sql(sql, rows[start:start + batch_size])
+                loaded += len(rows)
+                _progress(loaded)
+    return loaded
+
+
+def number_contacts(engine: Engine, user_ids: list[int]):
+    """
+    Numbers the contacts of the seeded users 1..n per user in id order and sets
+    ``users.contacts_version``, the way the ``225a1a85fbfe`` migration backfills
+    existing rows, so a full sync returns them and paginates without ties.
+    """
+    if not user_ids:
+        return
+    bounds = {"first": min(user_ids), "last": max(user_ids)}
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            UPDATE {ContactORM.__tablename__} SET version = numbered.version
+            FROM (
+                SELECT id, user_id, row_number() OVER (PARTITION BY user_id ORDER BY id) AS version
+                FROM {ContactORM.__tablename__}
+                WHERE user_id BETWEEN :first AND :last
+            ) AS numbered
+            WHERE {ContactORM.__tablename__}.id = numbered.id
+                AND {ContactORM.__tablename__}.user_id = numbered.user_id
+        """), bounds)
+        conn.execute(text(f"""
+            UPDATE {UserORM.__tablename__} SET contacts_version = (
+                SELECT coalesce(max(version), 0) FROM {ContactORM.__tablename__}
+                WHERE {ContactORM.__tablename__}.user_id = {UserORM.__tablename__}.id
+            )
+            WHERE id BETWEEN :first AND :last
+        """), bounds)
+
+
+def _progress(loaded: int):
+    print(f"\r  {loaded:,} contacts loaded", end="", file=sys.stderr, flush=True)
+
+
+def create_seed_engine(url: str) -> Engine:
+    if not url.startswith("sqlite"):
+        return create_engine(url)
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _fast_writes(dbapi_conn, _):
+        dbapi_conn.execute("PRAGMA journal_mode=WAL")
+        dbapi_conn.execute("PRAGMA synchronous=OFF")
+
+    return engine
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default=settings.postgres.dsn)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--contacts", type=int, default=100_000, help="Total contacts across all users.")
+    parser.add_argument("--password", default="SeedPass123", help="Password shared by every seeded user.")
+    parser.add_argument("--workers", type=int, default=None, help="Generator processes (default: CPU count).")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Contacts generated per task.")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Rows per multi-row insert (SQLite).")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    engine = create_seed_engine(args.db_url)
+
+    started = time.perf_counter()
+    user_ids = seed_users(engine, args.users, args.password)
+    print(f"{len(user_ids):,} users in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    started = time.perf_counter()
+    chunks = plan_chunks(engine, user_ids, args.contacts, args.chunk_size, args.seed)
+    loaded = seed_contacts(engine, args.db_url, chunks, args.workers, args.batch_size)
+    number_contacts(engine, user_ids)
+    elapsed = time.perf_counter() - started
+    print(f"\n{loaded:,} contacts in {elapsed:.1f}s ({loaded / elapsed:,.0f} rows/s)", file=sys.stderr)
+
+    engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
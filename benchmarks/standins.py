@@ -0,0 +1,130 @@
+"""
+Local stand-ins for the external services used by the app.
+
+Redis is replaced with fakeredis, SMTP with an in-process aiosmtpd sink and
+Cloudinary uploads with a no-op, so benchmarks run without network access.
+"""
+import socket
+from pathlib import Path
+
+import cloudinary.uploader
+from aiosmtpd.controller import Controller
+from fakeredis import FakeAsyncRedis
+from fastapi import FastAPI
+from fastapi_mail import ConnectionConfig
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.db import get_db, get_read_db
+from src.database.models import Base
+from src.database.redis import get_redis
+from src.services import email as email_service
+
+
+class SinkHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_smtp_sink() -> tuple[Controller, SinkHandler]:
+    """
+    Starts a local SMTP server that accepts and discards every message,
+    and points the email service at it.
+    """
+    handler = SinkHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    email_service.conf = ConnectionConfig(
+        MAIL_USERNAME="bench@example.com",
+        MAIL_PASSWORD="",
+        MAIL_FROM="bench@example.com",
+        MAIL_PORT=controller.port,
+        MAIL_SERVER=controller.hostname,
+        MAIL_FROM_NAME="AddressBook App Benchmark",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False,
+        VALIDATE_CERTS=False,
+        TEMPLATE_FOLDER=Path(email_service.__file__).parent / "templates",
+    )
+    return controller, handler
+
+
+def stub_cloudinary():
+    """
+    Replaces Cloudinary uploads with a local no-op.
+    """
+    def upload(file, **options):
+        file.read()
+        return {"public_id": options.get("public_id"), "secure_url": "https://res.cloudinary.test/avatar.png"}
+
+    cloudinary.uploader.upload = upload
+
+
+def _sqlite_to_char(value: str | None, fmt: str) -> str | None:
+    # Only the "MM-DD" format used by get_upcoming_birthdays is needed.
+    if value is None:
+        return None
+    if fmt != "MM-DD":
+        raise ValueError(f"Unsupported to_char format: {fmt}")
+    return value[5:10]
+
+
+def create_database(url: str) -> sessionmaker:
+    """
+    Creates a fresh schema at ``url`` and returns a session factory bound to it.
+    SQLite gets a ``to_char`` shim so Postgres-only queries keep working.
+    """
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _register_functions(dbapi_conn, _):
+            dbapi_conn.create_function("to_char", 2, _sqlite_to_char, deterministic=True)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def install(app: FastAPI, session_factory: sessionmaker) -> FakeAsyncRedis:
+    """
+    Wires the stand-ins into ``app`` through dependency overrides.
+
+    Rate limits stay disabled (the limiter is never bound to Redis): they would
+    turn most benchmark traffic into 429s.
+    """
+    fake_redis = FakeAsyncRedis()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_redis] = lambda: fake_redis
+
+    stub_cloudinary()
+    return fake_redis
+
+
+def dispose(session_factory: sessionmaker):
+    engine: Engine = session_factory.kw["bind"]
+    engine.dispose()
@@ -1,29 +1,67 @@
-from contextlib import asynccontextmanager
+import asyncio
+import secrets
+from contextlib import asynccontextmanager, suppress
+from typing import Annotated
 
-import redis.asyncio as redis
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
-from fastapi_limiter import FastAPILimiter
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from starlette import status
+from starlette.concurrency import run_in_threadpool
 
+from src.database.db import engine
+from src.database.pool import warm_up
+from src.database.redis import init_redis, close_redis
+from src.database.replicas import replicas
+from src.middleware.admission import AdmissionControlMiddleware
+from src.middleware.compression import CompressionMiddleware
+from src.middleware.idempotency import IdempotencyMiddleware
+from src.middleware.negotiation import ContentNegotiationMiddleware
+from src.middleware.read_your_writes import ReadYourWritesMiddleware
+from src.middleware.sql_profiler import SQLProfilerMiddleware
+from src.services.auth_throttle import throttle
+from src.services.contact_events import contact_events
+from src.services.rate_limit import limiter
+from src.services.revocation import revocations
 from src.settings import settings
 from src.routes import auth, contacts, users
+from src.utils.jwt_backend import get_jwt_backend
+from src.utils.metrics import registry
+from src.utils.responses import NegotiatedResponse
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    r = await redis.Redis(
-        host=settings.redis.host,
-        port=settings.redis.port,
-        db=0,
-        encoding="utf-8",
-        decode_responses=True,
-    )
-    await FastAPILimiter.init(r)
+    get_jwt_backend()
+    connections = settings.postgres.pool_warm_up
+    if connections is None:
+        connections = settings.postgres.pool_size
+    for pool_engine in (engine, *replicas.engines):
+        await run_in_threadpool(warm_up, pool_engine, connections)
+    r = await init_redis()
+    limiter.init(r)
+    throttle.init(r)
+    background = [
+        asyncio.create_task(revocations.run_sync(r)),
+        asyncio.create_task(contact_events.run(r)),
+    ]
+    if replicas.engines:
+        background.append(asyncio.create_task(replicas.run_health_checks()))
     yield
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    contact_events.close_all()
+    throttle.init(None)
+    limiter.init(None)
+    await close_redis()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=NegotiatedResponse)
+# Innermost, so shed requests still get CORS headers
+app.add_middleware(AdmissionControlMiddleware, settings=settings.admission)
+# Outside admission control, so waiting duplicates do not hold a slot
+app.add_middleware(IdempotencyMiddleware, settings=settings.idempotency)
 
 origins = [
     "http://localhost:3000",
@@ -35,6 +73,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(SQLProfilerMiddleware, settings=settings.sql_profiler)
+app.add_middleware(
+    ReadYourWritesMiddleware,
+    seconds=settings.postgres.read_your_writes_seconds,
+    enabled=bool(settings.postgres.replica_dsns),
+)
+app.add_middleware(ContentNegotiationMiddleware)
+# Outermost, so it compresses the final headers and body
+app.add_middleware(CompressionMiddleware, settings=settings.compression)
 
 
 @app.get("/")
@@ -42,6 +89,20 @@ async def redirect_to_docs():
     return RedirectResponse("/docs", status_code=status.HTTP_302_FOUND)
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Annotated[str | None, Header()] = None):
+    token = settings.metrics.token
+    if token is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not secrets.compare_digest((authorization or "").encode(), f"Bearer {token}".encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(auth.router)
 app.include_router(contacts.router)
 app.include_router(users.router)
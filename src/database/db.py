@@ -1,9 +1,14 @@
-from sqlalchemy import create_engine
+import time
+
+from fastapi import Request
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
 
+from src.database.pool import create_pooled_engine
+from src.database.replicas import READ_YOUR_WRITES_COOKIE, replicas
 from src.settings import settings
 
-engine = create_engine(url=settings.postgres.dsn)
+engine = create_pooled_engine(settings.postgres.dsn, settings.postgres)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -17,3 +22,42 @@ def get_db():
         raise
     finally:
         db.close()
+
+
+def wrote_recently(request: Request) -> bool:
+    """
+    Tells whether the client wrote recently enough that a replica may not have its write yet.
+
+    :param request: The incoming request.
+    :type request: Request
+    :return: True while the read-your-writes cookie set by the last write is valid.
+    :rtype: bool
+    """
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def get_read_db(request: Request):
+    """
+    Yields a session for read-only endpoints, on a healthy replica when one
+    is configured and the client has not just written, otherwise on the primary.
+    """
+    replica = None if wrote_recently(request) else replicas.choose()
+    if replica is None:
+        yield from get_db()
+        return
+
+    db = SessionLocal(bind=replica)
+    try:
+        yield db
+    except OperationalError:
+        db.rollback()
+        replicas.eject(replica)
+        raise
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Boolean
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Boolean, UniqueConstraint, Index
+from sqlalchemy.orm import declarative_base, relationship, validates
 
 from src.utils.common import current_time
+from src.utils.normalize import normalize_email, normalize_phone
 
 Base = declarative_base()
 
@@ -9,27 +10,70 @@ Base = declarative_base()
 class UserORM(Base):
     __tablename__ = "users"
 
-    id              = Column(Integer, primary_key=True)
-    email           = Column(String(25), nullable=False, unique=True)
-    hashed_password = Column(String, nullable=False)
-    first_name      = Column(String(15), nullable=False)
-    last_name       = Column(String(15))
-    avatar          = Column(String(255), nullable=True)
-    created_at      = Column(DateTime(timezone=True), default=current_time)
-    confirmed       = Column(Boolean, default=False)
-    refresh_token   = Column(String, nullable=True)
+    id               = Column(Integer, primary_key=True)
+    email            = Column(String(25), nullable=False, unique=True)
+    hashed_password  = Column(String, nullable=False)
+    first_name       = Column(String(15), nullable=False)
+    last_name        = Column(String(15))
+    avatar           = Column(String(255), nullable=True)
+    created_at       = Column(DateTime(timezone=True), default=current_time)
+    confirmed        = Column(Boolean, default=False)
+    refresh_token    = Column(String, nullable=True)
+    # Bumped on every contact change; the value is stamped on the changed row or tombstone
+    contacts_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Rate limit tier, see RATE_LIMIT_TIERS; None is the default tier
+    tier             = Column(String(20), nullable=True)
 
     contacts = relationship("ContactORM", backref="user")
 
 
 class ContactORM(Base):
     __tablename__ = "contacts"
+    # On Postgres the table is hash-partitioned by user_id (see the
+    # partition_contacts_by_user migration), so uniqueness is per user.
+    __table_args__ = (
+        UniqueConstraint("user_id", "phone", name="uq_contacts_user_phone"),
+        UniqueConstraint("user_id", "email", name="uq_contacts_user_email"),
+        Index("ix_contacts_user_version", "user_id", "version"),
+        Index("ix_contacts_user_phone_normalized", "user_id", "phone_normalized"),
+        Index("ix_contacts_user_email_normalized", "user_id", "email_normalized"),
+    )
 
-    id         = Column(Integer, primary_key=True)
-    user_id    = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    first_name = Column(String(15), nullable=False)
-    last_name  = Column(String(15))
-    phone      = Column(String(15), nullable=False, unique=True)
-    email      = Column(String(25), nullable=True, unique=True)
-    birth_date = Column(Date, nullable=True)
-    extra      = Column(String(150), nullable=True)
+    id               = Column(Integer, primary_key=True)
+    user_id          = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    first_name       = Column(String(15), nullable=False)
+    last_name        = Column(String(15))
+    phone            = Column(String(15), nullable=False)
+    email            = Column(String(25), nullable=True)
+    birth_date       = Column(Date, nullable=True)
+    extra            = Column(String(150), nullable=True)
+    version          = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at       = Column(DateTime(timezone=True), default=current_time, onupdate=current_time)
+    # Filled on write, used by the phone and email filters
+    phone_normalized = Column(String(20), nullable=True)
+    email_normalized = Column(String(25), nullable=True)
+
+    # Identity includes the partition key, so ORM updates and deletes prune to one partition.
+    __mapper_args__ = {"primary_key": [id, user_id]}
+
+    @validates("phone")
+    def _set_phone_normalized(self, key, phone):
+        self.phone_normalized = normalize_phone(phone)
+        return phone
+
+    @validates("email")
+    def _set_email_normalized(self, key, email):
+        self.email_normalized = normalize_email(email)
+        return email
+
+
+class ContactTombstoneORM(Base):
+    __tablename__ = "contact_tombstones"
+    __table_args__ = (
+        Index("ix_contact_tombstones_user_version", "user_id", "version"),
+    )
+
+    user_id    = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    contact_id = Column(Integer, primary_key=True)
+    version    = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), default=current_time)
@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+from src.settings import PostgresSettings
+from src.utils.metrics import Counter, Gauge, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ["pool"],
+)
+checkout_timeouts = Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after the pool timeout.", ["pool"],
+)
+pool_connections = Gauge(
+    "db_pool_connections", "Connections of the pool by state.", ["pool", "state"],
+)
+
+_pools: dict[str, QueuePool] = {}
+# Time the current checkout of this thread spent opening a new connection
+_connecting = threading.local()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    :class:`QueuePool` recording how long each checkout waits for a connection.
+
+    Only the wait for the queue counts: time spent opening a new (overflow)
+    connection is left out, it shows up in the request latency instead.
+    """
+
+    pool_name = "primary"
+
+    def recreate(self) -> "TimedQueuePool":
+        pool = super().recreate()
+        pool.pool_name = self.pool_name
+        _pools[self.pool_name] = pool
+        return pool
+
+    def _do_get(self):
+        _connecting.seconds = 0.0
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            checkout_timeouts.inc(pool=self.pool_name)
+            raise
+        finally:
+            waited = time.perf_counter() - started - _connecting.seconds
+            checkout_wait.observe(max(0.0, waited), pool=self.pool_name)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            _connecting.seconds = getattr(_connecting, "seconds", 0.0) + time.perf_counter() - started
+
+
+def _collect_pool_connections():
+    for name, pool in _pools.items():
+        pool_connections.set(pool.checkedout(), pool=name, state="checked_out")
+        pool_connections.set(pool.checkedin(), pool=name, state="idle")
+        pool_connections.set(max(0, pool.overflow()), pool=name, state="overflow")
+
+
+registry.add_collector(_collect_pool_connections)
+
+
+def engine_options(config: PostgresSettings) -> dict[str, Any]:
+    """
+    Builds the ``create_engine`` options for the configured pooling mode.
+
+    In PgBouncer transaction-pooling mode PgBouncer does the pooling, so the
+    engine opens a connection per session (``NullPool``) and sends no startup
+    parameters, which PgBouncer would reject; set ``statement_timeout`` on the
+    database role instead. Server-side prepared statements are disabled there too.
+
+    With the ``psycopg`` driver, statements executed ``prepare_threshold`` times
+    on a connection are prepared server-side, keeping up to ``prepared_max`` of
+    them per connection.
+
+    :param config: The Postgres settings.
+    :type config: PostgresSettings
+    :return: The engine options.
+    :rtype: dict[str, Any]
+    """
+    connect_args: dict[str, Any] = {}
+    if config.driver == "psycopg":
+        connect_args["prepare_threshold"] = None if config.pgbouncer else config.prepare_threshold
+
+    if config.pgbouncer:
+        if config.statement_timeout_ms:
+            logger.warning("POSTGRES_STATEMENT_TIMEOUT_MS is ignored in PgBouncer mode, set it on the role.")
+        return {"poolclass": NullPool, "query_cache_size": config.query_cache_size, "connect_args": connect_args}
+
+    if config.statement_timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={config.statement_timeout_ms}"
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": config.pool_size,
+        "max_overflow": config.max_overflow,
+        "pool_timeout": config.pool_timeout,
+        "pool_recycle": config.pool_recycle,
+        "pool_pre_ping": config.pool_pre_ping,
+        "query_cache_size": config.query_cache_size,
+        "connect_args": connect_args,
+    }
+
+
+def create_pooled_engine(dsn: str, config: PostgresSettings, pool_name: str = "primary") -> Engine:
+    """
+    Creates an engine using the pool settings.
+
+    :param dsn: The database URL.
+    :type dsn: str
+    :param config: The Postgres settings.
+    :type config: PostgresSettings
+    :param pool_name: The name the pool metrics are reported under.
+    :type pool_name: str
+    :return: The engine.
+    :rtype: Engine
+    """
+    engine = create_engine(dsn, **engine_options(config))
+    if engine.dialect.driver == "psycopg" and not config.pgbouncer:
+        @event.listens_for(engine, "connect")
+        def set_prepared_max(dbapi_connection, connection_record):
+            dbapi_connection.prepared_max = config.prepared_max
+
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.pool_name = pool_name
+        _pools[pool_name] = engine.pool
+    return engine
+
+
+def warm_up(engine: Engine, connections: int) -> int:
+    """
+    Opens ``connections`` connections at once and returns them to the pool,
+    so the first requests after a deploy do not pay for connecting.
+
+    :param engine: The engine to warm up.
+    :type engine: Engine
+    :param connections: How many connections to open.
+    :type connections: int
+    :return: The number of connections opened.
+    :rtype: int
+    """
+    if not isinstance(engine.pool, QueuePool):
+        return 0
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.raw_connection())
+    except SQLAlchemyError as e:
+        logger.warning("Pool warm-up stopped after %d connections: %s", len(opened), e)
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
@@ -0,0 +1,153 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current_profile: ContextVar["QueryProfile | None"] = ContextVar("sql_profile", default=None)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+|\?")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Normalises a SQL statement so that executions differing only by literals compare equal.
+
+    :param statement: The raw SQL statement.
+    :type statement: str
+    :return: The statement with literals and bind markers replaced by ``?``.
+    :rtype: str
+    """
+    normalized = _STRING_RE.sub("?", statement)
+    normalized = _PLACEHOLDER_RE.sub("?", normalized)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _IN_LIST_RE.sub("(?)", normalized)
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+def count_parameters(parameters: Any, executemany: bool) -> int:
+    """
+    Counts the bound values passed along with a statement.
+
+    :param parameters: The DBAPI parameters (a mapping, a sequence or a list of them).
+    :type parameters: Any
+    :param executemany: Whether the statement was executed with ``executemany``.
+    :type executemany: bool
+    :return: The total number of bound values.
+    :rtype: int
+    """
+    if not parameters:
+        return 0
+    if executemany:
+        return sum(len(params) for params in parameters)
+    return len(parameters)
+
+
+@dataclass(slots=True)
+class QueryRecord:
+    statement:   str
+    duration_ms: float
+    params:      int
+
+
+@dataclass
+class QueryProfile:
+    slow_query_ms:    float
+    repeat_threshold: int
+    records:          list[QueryRecord] = field(default_factory=list)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(record.duration_ms for record in self.records)
+
+    def repeated(self) -> dict[str, int]:
+        """
+        Returns the statements executed at least ``repeat_threshold`` times (likely N+1 patterns).
+
+        :return: A mapping of normalised statement to execution count.
+        :rtype: dict[str, int]
+        """
+        counts = Counter(record.statement for record in self.records)
+        return {stmt: n for stmt, n in counts.items() if n >= self.repeat_threshold}
+
+    def slow(self) -> list[QueryRecord]:
+        """
+        Returns the statements that took longer than ``slow_query_ms``.
+
+        :return: The slow query records.
+        :rtype: list[QueryRecord]
+        """
+        return [record for record in self.records if record.duration_ms >= self.slow_query_ms]
+
+    def summary(self) -> str:
+        """
+        Formats a compact summary suitable for a response header.
+
+        :return: The summary, e.g. ``queries=3; total_ms=1.52; slow=0; repeated=0``.
+        :rtype: str
+        """
+        return (
+            f"queries={len(self.records)}; total_ms={self.total_ms:.2f}; "
+            f"slow={len(self.slow())}; repeated={len(self.repeated())}"
+        )
+
+
+def parse_summary(summary: str) -> dict[str, float]:
+    """
+    Parses a summary produced by :meth:`QueryProfile.summary`.
+
+    :param summary: The summary string.
+    :type summary: str
+    :return: The summary values keyed by name.
+    :rtype: dict[str, float]
+    """
+    pairs = (item.split("=", 1) for item in summary.split(";") if "=" in item)
+    return {key.strip(): float(value) for key, value in pairs}
+
+
+@contextmanager
+def profile_queries(slow_query_ms: float, repeat_threshold: int) -> Iterator[QueryProfile]:
+    """
+    Records every SQL statement executed in the current context.
+
+    :param slow_query_ms: Threshold above which a statement is reported as slow.
+    :type slow_query_ms: float
+    :param repeat_threshold: Number of identical executions reported as a repeat.
+    :type repeat_threshold: int
+    :return: The profile being filled.
+    :rtype: Iterator[QueryProfile]
+    """
+    profile = QueryProfile(slow_query_ms=slow_query_ms, repeat_threshold=repeat_threshold)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is None or not conn.info.get("query_start_time"):
+        return
+    duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+    profile.records.append(QueryRecord(
+        statement=normalize_statement(statement),
+        duration_ms=duration_ms,
+        params=count_parameters(parameters, executemany),
+    ))
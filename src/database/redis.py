@@ -2,6 +2,34 @@ import redis.asyncio as redis
 
 from src.settings import settings
 
+redis_client: redis.Redis | None = None
+
+
+async def init_redis() -> redis.Redis:
+    """
+    Creates the process-wide Redis client shared by requests and background services.
+
+    :return: The shared Redis client.
+    :rtype: redis.Redis
+    """
+    global redis_client
+    redis_client = redis.Redis(host=settings.redis.host, port=settings.redis.port, db=0)
+    return redis_client
+
+
+async def close_redis():
+    """
+    Closes the shared Redis client.
+
+    :return: None
+    """
+    global redis_client
+    if redis_client is not None:
+        await redis_client.aclose()
+        redis_client = None
+
 
 def get_redis():
+    if redis_client is not None:
+        return redis_client
     return redis.Redis(host=settings.redis.host, port=settings.redis.port, db=0)
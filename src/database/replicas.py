@@ -0,0 +1,105 @@
+import asyncio
+import itertools
+import logging
+import threading
+
+from sqlalchemy import Engine, text
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from src.database.pool import create_pooled_engine
+from src.settings import PostgresSettings, settings
+
+logger = logging.getLogger(__name__)
+
+READ_YOUR_WRITES_COOKIE = "rw_until"
+
+REPLICATION_LAG = text("SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)")
+
+
+class ReplicaSet:
+    """
+    Round-robin balancing over the healthy read replicas.
+
+    A replica is ejected when its health check fails, when it lags behind
+    the primary by more than ``replica_max_lag_seconds`` or when a request
+    fails to reach it, and is admitted again once a health check passes.
+    """
+
+    def __init__(self, config: PostgresSettings, engines: list[Engine] | None = None):
+        self.config = config
+        self.engines = engines if engines is not None else [
+            create_pooled_engine(dsn, config, f"replica-{i}") for i, dsn in enumerate(config.replica_dsns)
+        ]
+        self.healthy = list(self.engines)
+        self._cycle = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self) -> Engine | None:
+        """
+        Picks the next healthy replica.
+
+        :return: The replica engine, or None if no replica is healthy.
+        :rtype: Engine | None
+        """
+        healthy = self.healthy
+        if not healthy:
+            return None
+        return healthy[next(self._cycle) % len(healthy)]
+
+    def eject(self, engine: Engine):
+        """
+        Stops routing reads to a replica until its next successful health check.
+
+        :param engine: The replica engine.
+        :type engine: Engine
+        :return: None
+        """
+        with self._lock:
+            if engine in self.healthy:
+                logger.warning("Ejecting read replica %s", engine.url.render_as_string())
+                self.healthy = [healthy for healthy in self.healthy if healthy is not engine]
+
+    def is_healthy(self, engine: Engine) -> bool:
+        """
+        Checks that a replica answers and is not lagging too far behind.
+
+        :param engine: The replica engine.
+        :type engine: Engine
+        :return: True if the replica can serve reads.
+        :rtype: bool
+        """
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name != "postgresql":
+                    conn.execute(text("SELECT 1"))
+                    return True
+                lag = conn.execute(REPLICATION_LAG).scalar_one()
+        except SQLAlchemyError:
+            return False
+        return float(lag) <= self.config.replica_max_lag_seconds
+
+    def check(self):
+        """
+        Runs the health checks and updates the healthy set.
+
+        :return: None
+        """
+        healthy = [engine for engine in self.engines if self.is_healthy(engine)]
+        with self._lock:
+            for engine in set(healthy) - set(self.healthy):
+                logger.info("Read replica %s is healthy again", engine.url.render_as_string())
+            self.healthy = healthy
+
+    async def run_health_checks(self):
+        """
+        Checks the replicas every ``replica_health_interval_seconds`` until cancelled.
+
+        :return: None
+        """
+        while True:
+            await run_in_threadpool(self.check)
+            await asyncio.sleep(self.config.replica_health_interval_seconds)
+
+
+replicas = ReplicaSet(settings.postgres)
@@ -0,0 +1,186 @@
+import asyncio
+import itertools
+import json
+from dataclasses import dataclass, field
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.settings import AdmissionSettings
+from src.utils.metrics import Counter, Gauge, registry
+
+shed_requests = Counter(
+    "http_shed_requests_total", "Requests rejected by admission control.", ["route_class", "reason"],
+)
+admission_queue_depth = Gauge(
+    "http_admission_queue_depth", "Requests waiting for admission.", ["route_class"],
+)
+admission_in_flight = Gauge(
+    "http_admission_in_flight", "Admitted requests being served.", ["route_class"],
+)
+
+# Not limited: cheap, or long-lived streams that would hold a slot for hours
+EXEMPT_PATHS = frozenset({"/", "/metrics", "/docs", "/redoc", "/openapi.json", "/contacts/events"})
+UPLOAD_PATHS = frozenset({"/users/avatar"})
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def classify(method: str, path: str) -> str | None:
+    """
+    Returns the route class of a request.
+
+    :param method: The request method.
+    :type method: str
+    :param path: The request path.
+    :type path: str
+    :return: ``auth``, ``upload``, ``read`` or ``write``, or None if the request is not limited.
+    :rtype: str | None
+    """
+    if path in EXEMPT_PATHS:
+        return None
+    if path.startswith("/auth/"):
+        return "auth"
+    if path in UPLOAD_PATHS:
+        return "upload"
+    return "read" if method in READ_METHODS else "write"
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq:      int
+    name:     str = field(compare=False)
+    future:   asyncio.Future = field(compare=False)
+
+
+class AdmissionController:
+    """
+    Per-worker concurrency limits by route class, with bounded wait queues.
+
+    A request runs when both the worker and its class are below their limits;
+    otherwise it waits, up to the class timeout, in a queue of at most
+    ``queue_size`` requests. Freed slots go to the waiting request of the
+    highest priority class (cheap reads first), in arrival order.
+    """
+
+    def __init__(self, config: AdmissionSettings):
+        self.config = config
+        self.classes = config.classes
+        self.active = {name: 0 for name in self.classes}
+        self.queued = {name: 0 for name in self.classes}
+        self.total = 0
+        self.waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+
+    def _can_run(self, name: str) -> bool:
+        return self.total < self.config.max_concurrent and self.active[name] < self.classes[name].limit
+
+    def _take(self, name: str):
+        self.active[name] += 1
+        self.total += 1
+
+    async def acquire(self, name: str) -> str | None:
+        """
+        Waits for a slot of a route class.
+
+        :param name: The route class.
+        :type name: str
+        :return: None once admitted, or why the request was shed: ``queue_full`` or ``timeout``.
+        :rtype: str | None
+        """
+        route_class = self.classes[name]
+        # Waiters are admitted as soon as they fit, so a free slot means nobody waits for it
+        if self._can_run(name):
+            self._take(name)
+            return None
+        if self.queued[name] >= route_class.queue_size:
+            return "queue_full"
+
+        waiter = _Waiter(route_class.priority, next(self._seq), name, asyncio.get_running_loop().create_future())
+        self.waiters.append(waiter)
+        self.queued[name] += 1
+        try:
+            await asyncio.wait_for(waiter.future, route_class.timeout_seconds)
+            return None
+        except asyncio.TimeoutError:
+            # Handed a slot on the tick the deadline passed: the slot is taken, so use it
+            if waiter.future.done() and not waiter.future.cancelled():
+                return None
+            return "timeout"
+        except BaseException:
+            # Disconnected after being admitted: give the slot back
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(name)
+            raise
+        finally:
+            self.queued[name] -= 1
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+    def release(self, name: str):
+        """
+        Frees a slot of a route class and admits the waiting requests that fit.
+
+        :param name: The route class.
+        :type name: str
+        :return: None
+        """
+        self.active[name] -= 1
+        self.total -= 1
+        for waiter in sorted(self.waiters):
+            if self.total >= self.config.max_concurrent:
+                break
+            if waiter.future.done() or not self._can_run(waiter.name):
+                continue
+            self._take(waiter.name)
+            waiter.future.set_result(None)
+            self.waiters.remove(waiter)
+
+    def collect(self):
+        for name in self.classes:
+            admission_queue_depth.set(self.queued[name], route_class=name)
+            admission_in_flight.set(self.active[name], route_class=name)
+
+
+class AdmissionControlMiddleware:
+    """
+    Sheds load with ``503 Service Unavailable`` and ``Retry-After`` once a
+    route class is saturated and its wait queue is full or its deadline passes,
+    instead of letting every request queue in the server and the DB pool.
+    """
+
+    def __init__(self, app: ASGIApp, settings: AdmissionSettings):
+        self.app = app
+        self.settings = settings
+        self.controller = AdmissionController(settings)
+        registry.add_collector(self.controller.collect)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        name = None
+        if self.settings.enabled and scope["type"] == "http":
+            name = classify(scope["method"], scope["path"])
+        if name is None or name not in self.controller.classes:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await self.controller.acquire(name)
+        if reason is not None:
+            shed_requests.inc(route_class=name, reason=reason)
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name)
+
+    async def _reject(self, send: Send):
+        body = json.dumps({"detail": "The server is busy, retry later."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.settings.retry_after_seconds).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,164 @@
+import gzip
+from typing import Callable
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.settings import CompressionSettings
+from src.utils.metrics import Counter
+
+try:
+    import brotli
+except ImportError:  # the 'compression' extra
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # the 'compression' extra
+    zstandard = None
+
+compressed_responses = Counter(
+    "http_compressed_responses_total", "Responses sent compressed.", ["encoding"],
+)
+compression_saved_bytes = Counter(
+    "http_compression_saved_bytes_total", "Response bytes saved by compression.", ["encoding"],
+)
+
+# Content types not worth compressing: already compressed, or streamed as they are produced
+SKIP_CONTENT_TYPES = ("image/", "video/", "audio/", "text/event-stream", "application/zip", "application/gzip")
+
+
+def compressors(config: CompressionSettings) -> dict[str, Callable[[bytes], bytes]]:
+    """
+    Returns the available compressors by ``Content-Encoding``, most preferred first.
+
+    :param config: The compression settings.
+    :type config: CompressionSettings
+    :return: The compress functions by encoding.
+    :rtype: dict[str, Callable[[bytes], bytes]]
+    """
+    available = {}
+    if zstandard is not None:
+        # A ZstdCompressor must not be shared between threads
+        available["zstd"] = lambda body: zstandard.ZstdCompressor(level=config.zstd_level).compress(body)
+    if brotli is not None:
+        available["br"] = lambda body: brotli.compress(body, quality=config.brotli_quality)
+    available["gzip"] = lambda body: gzip.compress(body, compresslevel=config.gzip_level, mtime=0)
+    return available
+
+
+def choose_encoding(accept_encoding: str | None, available: dict) -> str | None:
+    """
+    Picks the encoding for an ``Accept-Encoding`` header: the highest q-value
+    wins, ties go to the server's preference.
+
+    :param accept_encoding: The ``Accept-Encoding`` header.
+    :type accept_encoding: str | None
+    :param available: The available encodings, most preferred first.
+    :type available: dict
+    :return: The encoding, or None to send the body as it is.
+    :rtype: str | None
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compresses response bodies with the best encoding the client accepts
+    (zstd, brotli or gzip, the first two with the ``compression`` extra).
+
+    Bodies smaller than ``min_size`` are sent as they are, bodies of
+    ``offload_size`` bytes or more are compressed in the thread pool so the
+    event loop keeps serving. Streamed responses pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, settings: CompressionSettings):
+        self.app = app
+        self.settings = settings
+        self.compressors = compressors(settings)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        encoding = None
+        if self.settings.enabled and scope["type"] == "http":
+            encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), self.compressors)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        chunks: list[bytes] = []
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or content_type.startswith(SKIP_CONTENT_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                # A streamed body: send it as it comes
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            await self._send(start, b"".join(chunks), encoding, send)
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _send(self, start: Message, body: bytes, encoding: str, send: Send):
+        headers = MutableHeaders(scope=start)
+        headers.add_vary_header("Accept-Encoding")
+        if len(body) < self.settings.min_size:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        compress = self.compressors[encoding]
+        if len(body) >= self.settings.offload_size:
+            compressed = await run_in_threadpool(compress, body)
+        else:
+            compressed = compress(body)
+        if len(compressed) >= len(body):
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers["content-encoding"] = encoding
+        headers["content-length"] = str(len(compressed))
+        compressed_responses.inc(encoding=encoding)
+        compression_saved_bytes.inc(len(body) - len(compressed), encoding=encoding)
+        await send(start)
+        await send({"type": "http.response.body", "body": compressed})
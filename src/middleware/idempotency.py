@@ -0,0 +1,234 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+import uuid
+
+from jose import JWTError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import ACCESS_TOKEN_TYPE, TOKEN_TYPE_FIELD
+from src.database import redis as redis_db
+from src.settings import IdempotencySettings
+from src.utils.auth import decode_jwt
+from src.utils.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+idempotent_replays = Counter(
+    "http_idempotent_replays_total", "Duplicate requests answered with the stored response.",
+)
+
+IDEMPOTENT_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+PATH_PREFIXES = ("/contacts",)
+# Transient failures the client should be able to retry with the same key,
+# authentication ones included: the retry comes with a refreshed token
+UNSTORED_STATUSES = frozenset({401, 403, 408, 409, 425, 429})
+
+# Stores the response, or drops the record if the response is not stored,
+# only while the record is still the one this request created.
+FINISH_SCRIPT = """
+local record = redis.call("GET", KEYS[1])
+if not record or cjson.decode(record).token ~= ARGV[1] then return 0 end
+if ARGV[2] == "" then return redis.call("DEL", KEYS[1]) end
+redis.call("SET", KEYS[1], ARGV[2], "EX", ARGV[3])
+return 1
+"""
+
+
+def _respond(status: int, detail: str, retry_after: int | None = None) -> tuple[int, list, bytes]:
+    body = json.dumps({"detail": detail}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    if retry_after is not None:
+        headers.append((b"retry-after", str(retry_after).encode()))
+    return status, headers, body
+
+
+def _token_subject(authorization: str | None) -> str | None:
+    # The user a bearer access token was issued to, None without a valid one
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = decode_jwt(token)
+    except JWTError:
+        return None
+    if payload.get(TOKEN_TYPE_FIELD) != ACCESS_TOKEN_TYPE:
+        return None
+    return payload.get("sub")
+
+
+class IdempotencyMiddleware:
+    """
+    Makes contact mutations safe to retry with an ``Idempotency-Key`` header.
+
+    The first response to a key is stored in Redis for ``ttl_seconds`` and
+    replayed, with ``Idempotent-Replayed: true``, for every retry with the same
+    key and request. Duplicates arriving while the first request runs wait for
+    its response instead of running again. Keys are scoped to the user the
+    access token was issued to, so a retry with a refreshed token still
+    replays; a key reused for a different request (method, path, query, body
+    or ``Accept``) gets 422.
+
+    Server errors and transient statuses are not stored, so the request can be
+    retried. Without Redis, or without a valid access token (the request is
+    rejected anyway), requests run as they are.
+    """
+
+    def __init__(self, app: ASGIApp, settings: IdempotencySettings):
+        self.app = app
+        self.settings = settings
+        self.in_flight: dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        r = redis_db.redis_client
+        if (
+                not self.settings.enabled or r is None or scope["type"] != "http"
+                or scope["method"] not in IDEMPOTENT_METHODS or not scope["path"].startswith(PATH_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(idempotency_key) <= self.settings.max_key_length:
+            await self._send(send, *_respond(400, "Invalid Idempotency-Key header."))
+            return
+
+        subject = _token_subject(headers.get("authorization"))
+        if subject is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        key = f"idempotency:{subject}:{hashlib.sha256(idempotency_key.encode()).hexdigest()[:32]}"
+        request = hashlib.sha256(b"\n".join((
+            scope["method"].encode(),
+            scope["path"].encode(),
+            scope["query_string"],
+            headers.get("accept", "").encode("latin-1"),
+            body,
+        ))).hexdigest()
+
+        try:
+            outcome = await self._claim(r, key, request)
+        except RedisError as e:
+            logger.warning("Idempotency check failed, running the request as it is: %s", e)
+            outcome = None
+        if isinstance(outcome, tuple):
+            await self._send(send, *outcome)
+            return
+        if outcome is None:
+            await self.app(scope, self._replay_body(body, receive), send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            await self._run(r, scope, self._replay_body(body, receive), send, key, request, token=outcome)
+        finally:
+            del self.in_flight[key]
+            future.set_result(None)
+
+    async def _claim(self, r: Redis, key: str, request: str) -> str | tuple[int, list, bytes]:
+        # The token of the record this request created, or the response to send
+        deadline = time.monotonic() + self.settings.wait_seconds
+        while True:
+            future = self.in_flight.get(key)
+            if future is not None:
+                # A duplicate in this process: wait for it, then read what it stored
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    return _respond(409, "A request with this Idempotency-Key is in progress.", retry_after=1)
+
+            raw = await r.get(key)
+            if raw is not None:
+                record = json.loads(raw)
+                if record["request"] != request:
+                    return _respond(422, "Idempotency-Key was used for a different request.")
+                if record["state"] == "done":
+                    idempotent_replays.inc()
+                    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+                    headers.append((b"idempotent-replayed", b"true"))
+                    return record["status"], headers, base64.b64decode(record["body"])
+                # Running in another process
+                if time.monotonic() >= deadline:
+                    return _respond(409, "A request with this Idempotency-Key is in progress.", retry_after=1)
+                await asyncio.sleep(self.settings.poll_ms / 1000)
+                continue
+
+            token = uuid.uuid4().hex
+            pending = json.dumps({"state": "pending", "request": request, "token": token})
+            if await r.set(key, pending, nx=True, ex=self.settings.lock_seconds):
+                return token
+
+    async def _run(self, r: Redis, scope: Scope, receive: Receive, send: Send, key: str, request: str, token: str):
+        start: Message | None = None
+        chunks: list[bytes] = []
+        streamed = False
+
+        async def send_and_capture(message: Message):
+            nonlocal start, streamed
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                streamed = streamed or message.get("more_body", False)
+            await send(message)
+
+        record = ""
+        try:
+            await self.app(scope, receive, send_and_capture)
+            status = start["status"] if start is not None else 500
+            if status < 500 and status not in UNSTORED_STATUSES and not streamed:
+                record = json.dumps({
+                    "state": "done",
+                    "request": request,
+                    "token": token,
+                    "status": status,
+                    "headers": [(name.decode("latin-1"), value.decode("latin-1")) for name, value in start["headers"]],
+                    "body": base64.b64encode(b"".join(chunks)).decode(),
+                })
+        finally:
+            try:
+                await r.eval(FINISH_SCRIPT, 1, key, token, record, self.settings.ttl_seconds)
+            except RedisError as e:
+                logger.warning("Storing the idempotent response failed: %s", e)
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    @staticmethod
+    def _replay_body(body: bytes, receive: Receive) -> Receive:
+        sent = False
+
+        async def replay() -> Message:
+            nonlocal sent
+            if sent:
+                # The body was read already, what follows is the disconnect
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return replay
+
+    @staticmethod
+    async def _send(send: Send, status: int, headers: list, body: bytes):
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
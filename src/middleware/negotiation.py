@@ -0,0 +1,25 @@
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.utils.responses import negotiate, response_media_type
+
+
+class ContentNegotiationMiddleware:
+    """
+    Records the response media type the request's ``Accept`` header asks for,
+    so :class:`src.utils.responses.NegotiatedResponse` renders JSON or MessagePack.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = response_media_type.set(negotiate(Headers(scope=scope).get("accept")))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            response_media_type.reset(token)
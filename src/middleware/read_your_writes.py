@@ -0,0 +1,40 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.database.replicas import READ_YOUR_WRITES_COOKIE
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins a client's reads to the primary for a short while after it writes.
+
+    Successful responses to unsafe methods set a cookie holding the time until
+    which :func:`src.database.db.get_read_db` skips the replicas, so a client
+    reading back its own write never sees a lagging replica.
+    """
+
+    def __init__(self, app: ASGIApp, seconds: int, enabled: bool = True):
+        self.app = app
+        self.seconds = seconds
+        self.enabled = enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.enabled or scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + self.seconds
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{READ_YOUR_WRITES_COOKIE}={until:.3f}; Max-Age={self.seconds}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,48 @@
+import logging
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.database.profiler import profile_queries
+from src.settings import ProfilerSettings
+
+logger = logging.getLogger(__name__)
+
+
+class SQLProfilerMiddleware:
+    """
+    Profiles the SQL statements executed while serving a request.
+
+    Profiling runs for every request when ``settings.enabled`` is set, or for
+    requests carrying ``settings.header`` when ``settings.allow_header`` is set.
+    The summary is returned in the same header and written to the log.
+    """
+
+    def __init__(self, app: ASGIApp, settings: ProfilerSettings):
+        self.app = app
+        self.settings = settings
+
+    def _is_requested(self, scope: Scope) -> bool:
+        if self.settings.enabled:
+            return True
+        return self.settings.allow_header and self.settings.header in Headers(scope=scope)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._is_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries(self.settings.slow_query_ms, self.settings.repeat_threshold) as profile:
+            async def send_with_summary(message: Message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append(self.settings.header, profile.summary())
+                await send(message)
+
+            await self.app(scope, receive, send_with_summary)
+
+        logger.info("%s %s %s", scope["method"], scope["path"], profile.summary())
+        for statement, count in profile.repeated().items():
+            logger.warning("Repeated %d times (possible N+1): %s", count, statement)
+        for record in profile.slow():
+            logger.warning("Slow query (%.2f ms, %d params): %s", record.duration_ms, record.params, record.statement)
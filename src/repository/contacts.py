@@ -1,19 +1,109 @@
-from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+from functools import cache
+from typing import Any
 
-from src.database.models import ContactORM
+from sqlalchemy import Select, bindparam, case, extract, func, select, update
+from sqlalchemy.orm import Session, load_only
+
+from src.database.models import ContactORM, ContactTombstoneORM, UserORM
 from src.schemas.contacts import (
     ContactCreateSchema,
     ContactUpdateSchema,
     ContactBirthDateUpdateSchema,
 )
 from src.schemas.filters import FilterParams
+from src.services.autocomplete import autocomplete, index_entry, terms
+from src.services.contact_events import contact_event, contact_events
+from src.services.contact_stats import contact_stats
+from src.utils.normalize import normalize_email, normalize_phone
+
+# Hot statements are built once; only their parameters change per call, so
+# SQLAlchemy's compiled cache hits without rebuilding the statement.
+CONTACT_BY_ID = select(ContactORM).where(
+    ContactORM.id == bindparam("contact_id"),
+    ContactORM.user_id == bindparam("user_id"),
+)
+
+UPCOMING_BIRTHDAYS = select(ContactORM).where(
+    ContactORM.user_id == bindparam("user_id"),
+    func.to_char(ContactORM.birth_date, "MM-DD").in_(bindparam("date_list", expanding=True)),
+)
+
+# The user row lock taken by the bump is held until commit, so a user's changes
+# commit in version order and a sync cursor never skips a late commit.
+NEXT_CONTACTS_VERSION = (
+    update(UserORM)
+    .where(UserORM.id == bindparam("user_id"))
+    .values(contacts_version=UserORM.contacts_version + 1)
+    .returning(UserORM.contacts_version)
+    .execution_options(synchronize_session=False)
+)
+
+CHANGED_CONTACTS = (
+    select(ContactORM)
+    .where(ContactORM.user_id == bindparam("user_id"), ContactORM.version > bindparam("since"))
+    .order_by(ContactORM.version)
+    .limit(bindparam("limit"))
+)
+
+DELETED_CONTACTS = (
+    select(ContactTombstoneORM)
+    .where(ContactTombstoneORM.user_id == bindparam("user_id"), ContactTombstoneORM.version > bindparam("since"))
+    .order_by(ContactTombstoneORM.version)
+    .limit(bindparam("limit"))
+)
+
+OPTIONAL_FIELDS = ("last_name", "email", "birth_date", "extra")
+
+CONTACT_STATS = select(
+    func.count().label("total"),
+    *(func.count(getattr(ContactORM, field)).label(f"with_{field}") for field in OPTIONAL_FIELDS),
+    *(
+        func.count(case((extract("month", ContactORM.birth_date) == month, 1))).label(f"month_{month}")
+        for month in range(1, 13)
+    ),
+    # Same statement, so the version matches the counts
+    select(UserORM.contacts_version).where(UserORM.id == bindparam("user_id")).scalar_subquery().label("version"),
+).where(ContactORM.user_id == bindparam("user_id"))
+
+FILTER_FIELDS = ("first_name", "last_name", "email", "phone")
+
+# Phone and email filters compare normalised values, see src.utils.normalize
+FILTER_COLUMNS = {"email": ContactORM.email_normalized, "phone": ContactORM.phone_normalized}
+NORMALIZERS = {"email": normalize_email, "phone": normalize_phone}
+
+
+@cache
+def _contacts_statement(fields: tuple[str, ...]) -> Select:
+    stmt = select(ContactORM).where(ContactORM.user_id == bindparam("user_id"))
+    for field in fields:
+        column = FILTER_COLUMNS.get(field, getattr(ContactORM, field))
+        stmt = stmt.where(column == bindparam(field))
+    return stmt
+
+
+@cache
+def _project(stmt: Select, fields: tuple[str, ...] | None) -> Select:
+    # Loads only the requested columns (plus the primary key the ORM always loads)
+    if fields is None:
+        return stmt
+    return stmt.options(load_only(*(getattr(ContactORM, field) for field in fields)))
+
+
+def _next_version(db: Session, user_id: int) -> int:
+    return db.execute(NEXT_CONTACTS_VERSION, {"user_id": user_id}).scalar_one()
+
+
+async def _changed(user_id: int, event: dict):
+    # Runs after the commit
+    await contact_events.publish(user_id, event)
+    await contact_stats.invalidate(user_id, event["version"])
 
 
 async def get_contacts(
         db: Session,
         user_id: int,
-        fp: FilterParams
+        fp: FilterParams,
+        fields: tuple[str, ...] | None = None
 ) -> list[ContactORM]:
     """
     Retrieves a list of contacts for a specific user with optional filtering.
@@ -24,27 +114,24 @@ async def get_contacts(
     :type user_id: int
     :param fp: Optional filter parameters to narrow down results.
     :type fp: FilterParams
+    :param fields: The columns to load, or None for all of them.
+    :type fields: tuple[str, ...] | None
     :return: A list of contact objects.
     :rtype: list[ContactORM]
     """
-    stmt = select(ContactORM).filter_by(user_id=user_id)
-
-    if fp.first_name:
-        stmt = stmt.filter_by(first_name=fp.first_name)
-    if fp.last_name:
-        stmt = stmt.filter_by(last_name=fp.last_name)
-    if fp.email:
-        stmt = stmt.filter_by(email=fp.email)
-    if fp.phone:
-        stmt = stmt.filter_by(phone=fp.phone)
-
-    return db.scalars(stmt).all()
+    params = {field: getattr(fp, field) for field in FILTER_FIELDS if getattr(fp, field)}
+    for field, normalize in NORMALIZERS.items():
+        if field in params:
+            params[field] = normalize(params[field])
+    stmt = _project(_contacts_statement(tuple(params)), fields)
+    return db.scalars(stmt, {"user_id": user_id, **params}).all()
 
 
 async def get_contact_by_id(
         db: Session,
         user_id: int,
-        contact_id: int
+        contact_id: int,
+        fields: tuple[str, ...] | None = None
 ) -> ContactORM | None:
     """
     Retrieves a specific contact by its ID for a given user.
@@ -55,17 +142,20 @@ async def get_contact_by_id(
     :type user_id: int
     :param contact_id: The ID of the contact to retrieve.
     :type contact_id: int
+    :param fields: The columns to load, or None for all of them.
+    :type fields: tuple[str, ...] | None
     :return: The contact object if found, otherwise None.
     :rtype: ContactORM | None
     """
-    stmt = select(ContactORM).filter_by(id=contact_id, user_id=user_id)
-    return db.execute(stmt).first()
+    stmt = _project(CONTACT_BY_ID, fields)
+    return db.scalars(stmt, {"contact_id": contact_id, "user_id": user_id}).first()
 
 
 async def get_upcoming_birthdays(
         db: Session,
         user_id: int,
-        date_list: list[str]
+        date_list: list[str],
+        fields: tuple[str, ...] | None = None
 ) -> list[ContactORM]:
     """
     Retrieves contacts whose birthdays fall on the upcoming dates.
@@ -76,14 +166,72 @@ async def get_upcoming_birthdays(
     :type user_id: int
     :param date_list: List of date strings (formatted as MM-DD) to match birthdays against.
     :type date_list: list[str]
+    :param fields: The columns to load, or None for all of them.
+    :type fields: tuple[str, ...] | None
     :return: A list of matching contact objects.
     :rtype: list[ContactORM]
     """
-    stmt = select(ContactORM).where(
-        ContactORM.user_id == user_id,
-        func.to_char(ContactORM.birth_date, "MM-DD").in_(date_list)
+    stmt = _project(UPCOMING_BIRTHDAYS, fields)
+    return db.scalars(stmt, {"user_id": user_id, "date_list": date_list}).all()
+
+
+async def get_changes(
+        db: Session,
+        user_id: int,
+        since: int,
+        limit: int
+) -> tuple[list[ContactORM], list[ContactTombstoneORM], bool]:
+    """
+    Retrieves the contacts created, changed or deleted after a version, oldest first.
+
+    :param db: The database session.
+    :type db: Session
+    :param user_id: The ID of the user whose contacts to sync.
+    :type user_id: int
+    :param since: The last version the client has seen, 0 for a full sync.
+    :type since: int
+    :param limit: The maximum number of changes to return.
+    :type limit: int
+    :return: The changed contacts, the tombstones of deleted contacts and whether more changes follow.
+    :rtype: tuple[list[ContactORM], list[ContactTombstoneORM], bool]
+    """
+    params = {"user_id": user_id, "since": since, "limit": limit + 1}
+    changed = db.scalars(CHANGED_CONTACTS, params).all()
+    # A full sync has nothing to delete locally
+    deleted = db.scalars(DELETED_CONTACTS, params).all() if since else []
+
+    changes = sorted([*changed, *deleted], key=lambda change: change.version)
+    page = changes[:limit]
+    return (
+        [change for change in page if isinstance(change, ContactORM)],
+        [change for change in page if isinstance(change, ContactTombstoneORM)],
+        len(changes) > limit,
     )
-    return db.scalars(stmt).all()
+
+
+async def get_stats(
+        db: Session,
+        user_id: int
+) -> tuple[dict[str, Any], int]:
+    """
+    Computes a user's contact statistics with one aggregate query.
+
+    :param db: The database session.
+    :type db: Session
+    :param user_id: The ID of the user.
+    :type user_id: int
+    :return: The statistics and the contacts version they reflect.
+    :rtype: tuple[dict[str, Any], int]
+    """
+    row = db.execute(CONTACT_STATS, {"user_id": user_id}).one()
+    filled = sum(getattr(row, f"with_{field}") for field in OPTIONAL_FIELDS)
+    stats = {
+        "total": row.total,
+        **{f"with_{field}": getattr(row, f"with_{field}") for field in OPTIONAL_FIELDS},
+        "completeness": round(filled / (row.total * len(OPTIONAL_FIELDS)), 4) if row.total else 0.0,
+        "birthdays_by_month": {month: getattr(row, f"month_{month}") for month in range(1, 13)},
+    }
+    return stats, row.version or 0
 
 
 async def create_contact(
@@ -109,10 +257,15 @@ async def create_contact(
         email=body.email,
         birth_date=body.birth_date,
         extra=body.extra,
-        user_id=user_id
+        user_id=user_id,
+        version=_next_version(db, user_id),
     )
     db.add(contact_model)
+    db.flush()
+    event, entry = contact_event("created", contact_model), index_entry(contact_model)
     db.commit()
+    await _changed(user_id, event)
+    await autocomplete.index(user_id, entry)
 
 
 async def update_contact(
@@ -135,17 +288,22 @@ async def update_contact(
     :return: The updated contact object, or None if not found.
     :rtype: ContactORM | None
     """
-    stmt = select(ContactORM).filter_by(id=contact_id, user_id=user_id)
-    contact_model = db.execute(stmt).scalar()
+    contact_model = db.scalars(CONTACT_BY_ID, {"contact_id": contact_id, "user_id": user_id}).first()
 
     if contact_model is not None:
+        old_terms = terms(contact_model)
         contact_model.first_name = body.first_name
         contact_model.last_name = body.last_name
         contact_model.email = body.email
         contact_model.phone = body.phone
         contact_model.birth_date = body.birth_date
         contact_model.extra = body.extra
+        contact_model.version = _next_version(db, user_id)
+        db.flush()
+        event, entry = contact_event("updated", contact_model), index_entry(contact_model)
         db.commit()
+        await _changed(user_id, event)
+        await autocomplete.index(user_id, entry, old_terms)
 
     return contact_model
 
@@ -170,12 +328,15 @@ async def update_birth_date(
     :return: The updated contact object, or None if not found.
     :rtype: ContactORM | None
     """
-    stmt = select(ContactORM).filter_by(id=contact_id, user_id=user_id)
-    contact_model = db.execute(stmt).scalar()
+    contact_model = db.scalars(CONTACT_BY_ID, {"contact_id": contact_id, "user_id": user_id}).first()
 
     if contact_model is not None:
         contact_model.birth_date = body.birth_date
+        contact_model.version = _next_version(db, user_id)
+        db.flush()
+        event = contact_event("updated", contact_model)
         db.commit()
+        await _changed(user_id, event)
 
     return contact_model
 
@@ -197,11 +358,18 @@ async def delete_contact(
     :return: The deleted contact object, or None if not found.
     :rtype: ContactORM | None
     """
-    stmt = select(ContactORM).filter_by(id=contact_id, user_id=user_id)
-    contact_model = db.execute(stmt).scalar()
+    contact_model = db.scalars(CONTACT_BY_ID, {"contact_id": contact_id, "user_id": user_id}).first()
 
     if contact_model is not None:
         db.delete(contact_model)
+        tombstone = ContactTombstoneORM(
+            user_id=user_id, contact_id=contact_model.id, version=_next_version(db, user_id),
+        )
+        db.add(tombstone)
+        event = {"type": "deleted", "id": tombstone.contact_id, "version": tombstone.version}
+        old_terms = terms(contact_model)
         db.commit()
+        await _changed(user_id, event)
+        await autocomplete.remove(user_id, event["id"], old_terms)
 
     return contact_model
@@ -1,9 +1,51 @@
-from sqlalchemy import select
+from functools import cache
+
+from sqlalchemy import Insert, Update, bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
 from src.database.models import UserORM
 from src.schemas.users import UserCreateSchema
 
+USER_BY_EMAIL = select(UserORM).where(UserORM.email == bindparam("email"))
+
+CLAIM_REFRESH_TOKEN = (
+    update(UserORM)
+    .where(UserORM.id == bindparam("user_id"), UserORM.refresh_token == bindparam("token"))
+    .values(refresh_token=None)
+    .returning(UserORM)
+)
+
+CONFIRM_EMAIL = (
+    update(UserORM)
+    .where(UserORM.email == bindparam("verified_email"), UserORM.confirmed.is_not(True))
+    .values(confirmed=True)
+    .returning(UserORM)
+)
+
+NEW_USER_COLUMNS = ("email", "hashed_password", "first_name", "last_name")
+
+
+@cache
+def _create_user_statement(dialect_name: str) -> Insert:
+    dialect = sqlite if dialect_name == "sqlite" else postgresql
+    return (
+        dialect.insert(UserORM)
+        .values({column: bindparam(column) for column in NEW_USER_COLUMNS})
+        .on_conflict_do_nothing(index_elements=[UserORM.email])
+        .returning(UserORM)
+    )
+
+
+@cache
+def _update_user_statement(columns: tuple[str, ...]) -> Update:
+    return (
+        update(UserORM)
+        .where(UserORM.id == bindparam("user_id"))
+        .values({column: bindparam(column) for column in columns})
+        .returning(UserORM)
+    )
+
 
 async def get_user_by_email(
         db: Session,
@@ -19,95 +61,147 @@ async def get_user_by_email(
     :return: The user object if found, otherwise None.
     :rtype: UserORM | None
     """
-    stmt = select(UserORM).filter_by(email=email)
-    return db.scalars(stmt).first()
+    return db.scalars(USER_BY_EMAIL, {"email": email}).first()
+
+
+async def get_user_by_id(
+        db: Session,
+        user_id: int,
+) -> UserORM | None:
+    """
+    Retrieves a user object by its primary key.
+
+    :param db: The database session.
+    :type db: Session
+    :param user_id: The ID of the user.
+    :type user_id: int
+    :return: The user object if found, otherwise None.
+    :rtype: UserORM | None
+    """
+    return db.get(UserORM, user_id)
 
 
 async def create_user(
         db: Session,
         body: UserCreateSchema,
-) -> UserORM:
+) -> UserORM | None:
     """
-    Creates a new user in the system.
+    Creates a new user in a single ``INSERT ... ON CONFLICT (email) DO NOTHING RETURNING``.
 
     :param db: The database session.
     :type db: Session
-    :param body: The user data to create.
+    :param body: The user data to create, with the password already hashed.
     :type body: UserCreateSchema
-    :return: The created user object.
-    :rtype: UserORM
+    :return: The created user object, or None if the email is already taken.
+    :rtype: UserORM | None
     """
-    user_model = UserORM(
-        email=body.email,
-        hashed_password=body.password,
-        first_name=body.first_name,
-        last_name=body.last_name,
-    )
-    db.add(user_model)
+    stmt = _create_user_statement(db.get_bind().dialect.name)
+    params = {
+        "email": body.email,
+        "hashed_password": body.password,
+        "first_name": body.first_name,
+        "last_name": body.last_name,
+    }
+    user_model = db.scalars(stmt, params).first()
+    if user_model is not None:
+        db.expunge(user_model)
+    db.commit()
+    return user_model
+
+
+async def _update_user(db: Session, user_id: int, **values) -> UserORM | None:
+    stmt = _update_user_statement(tuple(values))
+    user_model = db.scalars(stmt, {"user_id": user_id, **values}).first()
+    if user_model is not None:
+        # Keep the returned values instead of reloading them after commit.
+        db.expunge(user_model)
     db.commit()
-    db.refresh(user_model)
     return user_model
 
 
 async def update_refresh_token(
         db: Session,
-        email: str,
-        token: str,
-):
+        user_id: int,
+        token: str | None,
+) -> UserORM | None:
     """
-    Updates the refresh token for a user with the specified email.
+    Updates the refresh token of a user in a single ``UPDATE ... RETURNING``.
 
     :param db: The database session.
     :type db: Session
-    :param email: The email of the user whose token is being updated.
-    :type email: str
+    :param user_id: The ID of the user whose token is being updated.
+    :type user_id: int
     :param token: The new refresh token.
-    :type token: str
-    :return: None
+    :type token: str | None
+    :return: The updated user object, or None if it does not exist.
+    :rtype: UserORM | None
     """
-    user_model = await get_user_by_email(db, email)
+    return await _update_user(db, user_id, refresh_token=token)
 
-    user_model.refresh_token = token
+
+async def claim_refresh_token(
+        db: Session,
+        user_id: int,
+        token: str,
+) -> UserORM | None:
+    """
+    Clears the stored refresh token of a user if it is the given one, in a single
+    ``UPDATE ... RETURNING``, so the token can be exchanged only once.
+
+    :param db: The database session.
+    :type db: Session
+    :param user_id: The ID of the user.
+    :type user_id: int
+    :param token: The refresh token presented.
+    :type token: str
+    :return: The user object, or None if the token is not the stored one.
+    :rtype: UserORM | None
+    """
+    user_model = db.scalars(CLAIM_REFRESH_TOKEN, {"user_id": user_id, "token": token}).first()
+    if user_model is not None:
+        db.expunge(user_model)
     db.commit()
+    return user_model
 
 
 async def confirmed_email(
         db: Session,
         email: str,
-):
+) -> UserORM | None:
     """
-    Marks the email of a user as confirmed.
+    Marks an email as confirmed in a single ``UPDATE ... RETURNING``, keyed by
+    the email from the verification token.
 
     :param db: The database session.
     :type db: Session
-    :param email: The email of the user to confirm.
+    :param email: The email to confirm.
     :type email: str
-    :return: None
+    :return: The confirmed user object, or None if there is no user with the
+        email or it was confirmed already.
+    :rtype: UserORM | None
     """
-    user_model = await get_user_by_email(db, email)
-    user_model.confirmed = True
+    user_model = db.scalars(CONFIRM_EMAIL, {"verified_email": email}).first()
+    if user_model is not None:
+        db.expunge(user_model)
     db.commit()
+    return user_model
 
 
 async def update_avatar(
         db: Session,
-        email: str,
+        user_id: int,
         url: str,
-) -> UserORM:
+) -> UserORM | None:
     """
-    Updates the avatar URL of a user.
+    Updates the avatar URL of a user in a single ``UPDATE ... RETURNING``.
 
     :param db: The database session.
     :type db: Session
-    :param email: The email of the user to update.
-    :type email: str
+    :param user_id: The ID of the user to update.
+    :type user_id: int
     :param url: The new avatar URL.
     :type url: str
-    :return: The updated user object.
-    :rtype: UserORM
+    :return: The updated user object, or None if it does not exist.
+    :rtype: UserORM | None
     """
-    user_model = await get_user_by_email(db, email)
-    user_model.avatar = url
-    db.commit()
-    db.refresh(user_model)
-    return user_model
+    return await _update_user(db, user_id, avatar=url)
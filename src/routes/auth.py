@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Any
 
 from fastapi import (
     APIRouter,
@@ -14,43 +14,49 @@ from fastapi.security import (
 )
 from starlette import status
 
-from src.dependency import db_dependency
+from src.dependency import db_dependency, redis_dependency, user_dependency
 from src.repository import users as user_repository
 from src.schemas.auth import TokenSchema, RequestEmailSchema
 from src.schemas.users import UserCreateSchema
 from src.services import auth as auth_service
 from src.services import email as email_service
+from src.services import sessions as session_service
+from src.services.auth_throttle import throttle, throttle_login, throttle_signup
+from src.services.revocation import revocations
+from src.settings import settings
+from src.utils.jwt_backend import get_jwt_backend
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 security = HTTPBearer()
 
 
-@router.post("/signup", status_code=status.HTTP_201_CREATED)
+@router.post("/signup", status_code=status.HTTP_201_CREATED, dependencies=[Depends(throttle_signup)])
 async def create_account_via_email(
         body: UserCreateSchema,
         db: db_dependency,
         request: Request,
         background_tasks: BackgroundTasks,
 ):
-    user_model = await user_repository.get_user_by_email(db, body.email)
-    if user_model is not None:
+    body.password = await auth_service.hash_password_async(body.password)
+    user_model = await user_repository.create_user(db, body)
+    if user_model is None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Account already exists.",
         )
-    body.password = auth_service.hash_password(body.password)
-    user_model = await user_repository.create_user(db, body)
-    background_tasks.add_task(email_service.send_email, user_model, request.base_url)
+    await email_service.queue_verification_email(user_model, request.base_url, background_tasks)
 
 
-@router.post("/login", response_model=TokenSchema)
+@router.post("/login", response_model=TokenSchema, dependencies=[Depends(throttle_login)])
 async def login_via_email_for_access_token(
         form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
         db: db_dependency,
+        r: redis_dependency,
 ):
     user_model = await auth_service.authenticate_user(db, form_data.username, form_data.password)
     if user_model is None:
+        await throttle.login_failed(form_data.username.lower())
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password.",
@@ -61,10 +67,14 @@ async def login_via_email_for_access_token(
             detail="Email not confirmed.",
         )
 
-    access_token = auth_service.create_access_token(user_model)
-    refresh_token = auth_service.create_refresh_token(user_model)
+    await throttle.login_succeeded(form_data.username.lower())
 
-    await user_repository.update_refresh_token(db, user_model.email, refresh_token)
+    subject = auth_service.token_subject(user_model)
+    sid = session_service.new_session_id()
+    access_token = auth_service.create_access_token(subject, sid)
+    refresh_token = auth_service.create_refresh_token(subject, sid)
+
+    await session_service.create_session(r, subject, sid, refresh_token)
 
     return TokenSchema(
         access_token=access_token,
@@ -76,24 +86,81 @@ async def login_via_email_for_access_token(
 async def refresh_access_token(
         credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
         db: db_dependency,
+        r: redis_dependency,
 ):
     token = credentials.credentials
-    email = auth_service.decode_refresh_token(token)
-
-    user_model = await user_repository.get_user_by_email(db, email)
-    if user_model is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate user."
+    payload = auth_service.decode_refresh_token(token)
+    subject, sid = payload["sub"], payload.get("sid")
+
+    if sid is None:
+        # Token issued before sessions existed: exchange it, once, for a session.
+        user_model = await auth_service.get_user_by_subject(db, subject)
+        if user_model is not None:
+            user_model = await user_repository.claim_refresh_token(db, user_model.id, token)
+        if user_model is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token."
+            )
+        subject = auth_service.token_subject(user_model)
+        sid = session_service.new_session_id()
+        refresh_token = auth_service.create_refresh_token(subject, sid)
+        await session_service.create_session(r, subject, sid, refresh_token)
+        return TokenSchema(
+            access_token=auth_service.create_access_token(subject, sid),
+            refresh_token=refresh_token,
         )
-    if user_model.refresh_token != token:
+
+    refresh_token = None
+    if settings.jwt.rotate_refresh_tokens:
+        refresh_token = auth_service.create_refresh_token(subject, sid)
+        is_valid = await session_service.rotate_session(r, subject, sid, token, refresh_token)
+    else:
+        is_valid = await session_service.verify_session(r, subject, sid, token)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token."
         )
-    access_token = auth_service.create_access_token(user_model)
 
-    return TokenSchema(access_token=access_token)
+    return TokenSchema(
+        access_token=auth_service.create_access_token(subject, sid),
+        refresh_token=refresh_token,
+    )
+
+
+@router.post("/logout")
+async def logout(
+        payload: Annotated[dict[str, Any], Depends(auth_service.get_access_token_payload)],
+        r: redis_dependency,
+):
+    if payload.get("sid") is not None:
+        await session_service.revoke_session(r, payload["sub"], payload["sid"])
+    await revocations.revoke(r, revocations.items(payload))
+    return {"message": "Logged out."}
+
+
+@router.post("/logout_all")
+async def logout_all_sessions(
+        payload: Annotated[dict[str, Any], Depends(auth_service.get_access_token_payload)],
+        current_user: user_dependency,
+        db: db_dependency,
+        r: redis_dependency,
+):
+    # A refresh token issued before sessions existed is stored on the users row.
+    await user_repository.update_refresh_token(db, current_user.id, None)
+    # Sessions created before subjects were user ids are keyed by email.
+    sids = []
+    for subject in (auth_service.token_subject(current_user), current_user.email):
+        sids += await session_service.revoke_all_sessions(r, subject)
+    await revocations.revoke(r, revocations.items(payload) + [f"sid:{sid}" for sid in sids])
+    return {"message": "Logged out of all sessions."}
+
+
+@router.get("/jwks.json")
+async def json_web_key_set():
+    public_jwk = get_jwt_backend().public_jwk()
+    return {"keys": [public_jwk] if public_jwk else []}
 
 
 @router.post("/verify_email")
@@ -112,7 +179,7 @@ async def request_verify_email(
     if user_model.confirmed:
         return {"message": "Your email is already confirmed."}
 
-    background_tasks.add_task(email_service.send_email, user_model, request.base_url)
+    await email_service.queue_verification_email(user_model, request.base_url, background_tasks)
     return {"message": "Check your email for confirmation."}
 
 
@@ -122,14 +189,13 @@ async def confirmed_email(
         token: str,
 ):
     email = auth_service.decode_verify_token(token)
-    user_model = await user_repository.get_user_by_email(db, email)
-    if user_model is None:
+    if await user_repository.confirmed_email(db, email) is not None:
+        return {"message": "Email confirmed."}
+
+    # Nothing updated: only a link opened again, or for a deleted user, gets here
+    if await user_repository.get_user_by_email(db, email) is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate user."
         )
-    if user_model.confirmed:
-        return {"message": "Your email is already confirmed."}
-
-    await user_repository.confirmed_email(db, email)
-    return {"message": "Email confirmed."}
+    return {"message": "Your email is already confirmed."}
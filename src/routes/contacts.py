@@ -1,91 +1,220 @@
+import re
 from datetime import date, timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi_limiter.depends import RateLimiter
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from starlette import status
 
-from src.dependency import db_dependency, user_dependency
+from src.database.models import ContactORM
+from src.dependency import db_dependency, read_db_dependency, redis_dependency, user_dependency
 from src.repository import contacts as contacts_repository
 from src.schemas.contacts import (
+    CONTACT_FIELDS,
+    contact_projection,
     ContactSchema,
+    ContactChangesSchema,
     ContactCreateSchema,
+    ContactStatsSchema,
+    ContactSuggestionSchema,
     ContactUpdateSchema,
     ContactBirthDateUpdateSchema,
 )
 from src.schemas.filters import FilterParams
+from src.services.autocomplete import autocomplete
+from src.services.contact_events import contact_events
+from src.services.contact_stats import contact_stats
+from src.services.rate_limit import RateLimiter, describe
+from src.settings import settings
+from src.utils.responses import NegotiatedResponse
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
 
+def sparse_fields(
+        fields: Annotated[str | None, Query(
+            description=f"Comma-separated fields to return, of: {', '.join(CONTACT_FIELDS)}. "
+                        "`id` is always returned.",
+        )] = None,
+) -> tuple[str, ...] | None:
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(CONTACT_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}.",
+        )
+    # Canonical order, so each fieldset maps to one cached statement and serializer
+    return tuple(field for field in CONTACT_FIELDS if field in requested or field == "id")
+
+
+fields_dependency = Annotated[tuple[str, ...] | None, Depends(sparse_fields)]
+
+
+def project(contacts: ContactORM | list[ContactORM], fields: tuple[str, ...] | None):
+    """
+    Returns the contacts as they are, or serialized to the requested fieldset.
+
+    :param contacts: A contact or a list of contacts.
+    :type contacts: ContactORM | list[ContactORM]
+    :param fields: The requested fields, or None for the full schema.
+    :type fields: tuple[str, ...] | None
+    :return: The contacts, or a response of the fieldset.
+    """
+    if fields is None:
+        return contacts
+    adapter = contact_projection(fields)
+    return NegotiatedResponse(adapter.dump_python(adapter.validate_python(contacts, from_attributes=True), mode="json"))
+
+
 @router.get(
     "",
     response_model=list[ContactSchema],
-    dependencies=[Depends(RateLimiter(times=20, seconds=60))],
-    description="No more than 20 requests per minute.",
+    dependencies=[Depends(RateLimiter("contacts:list"))],
+    description=describe("contacts:list"),
 )
 async def read_all_contacts(
         user: user_dependency,
-        db: db_dependency,
+        db: read_db_dependency,
         filter_params: Annotated[FilterParams, Query()],
+        fields: fields_dependency,
 ):
-    contact_models = await contacts_repository.get_contacts(db, user.id, filter_params)
+    contact_models = await contacts_repository.get_contacts(db, user.id, filter_params, fields)
     if not contact_models:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contacts not found.",
         )
-    return contact_models
+    return project(contact_models, fields)
 
 
 @router.get(
     "/upcoming-birthdays",
     response_model=list[ContactSchema],
-    dependencies=[Depends(RateLimiter(times=5, seconds=60))],
-    description="No more than 5 requests per minute.",
+    dependencies=[Depends(RateLimiter("contacts:birthdays"))],
+    description=describe("contacts:birthdays"),
 )
 async def get_upcoming_birthdays(
         user: user_dependency,
-        db: db_dependency,
+        db: read_db_dependency,
+        fields: fields_dependency,
         days: Annotated[int, Query(gt=0)] = 7,
 ):
     today = date.today()
     date_list = [(today + timedelta(days=i)).strftime("%m-%d") for i in range(days + 1)]
 
-    contact_models = await contacts_repository.get_upcoming_birthdays(db, user.id, date_list)
+    contact_models = await contacts_repository.get_upcoming_birthdays(db, user.id, date_list, fields)
     if not contact_models:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No contacts have birthdays in the next {days} day(s).",
         )
-    return contact_models
+    return project(contact_models, fields)
+
+
+@router.get(
+    "/changes",
+    response_model=ContactChangesSchema,
+    dependencies=[Depends(RateLimiter("contacts:changes"))],
+    description=describe("contacts:changes"),
+)
+async def read_contact_changes(
+        user: user_dependency,
+        db: read_db_dependency,
+        since: Annotated[int, Query(ge=0)] = 0,
+        limit: Annotated[int, Query(gt=0, le=1000)] = 500,
+):
+    changed, deleted, has_more = await contacts_repository.get_changes(db, user.id, since, limit)
+    return {
+        "changed": changed,
+        "deleted": [tombstone.contact_id for tombstone in deleted],
+        "cursor": max((change.version for change in [*changed, *deleted]), default=since),
+        "has_more": has_more,
+    }
+
+
+@router.get(
+    "/stats",
+    response_model=ContactStatsSchema,
+    dependencies=[Depends(RateLimiter("contacts:stats"))],
+    description=describe("contacts:stats"),
+)
+async def read_contact_stats(
+        user: user_dependency,
+        db: read_db_dependency,
+        r: redis_dependency,
+):
+    return await contact_stats.get(r, user.id, lambda: contacts_repository.get_stats(db, user.id))
+
+
+@router.get(
+    "/autocomplete",
+    response_model=list[ContactSuggestionSchema],
+    dependencies=[Depends(RateLimiter("contacts:autocomplete"))],
+    description=describe("contacts:autocomplete"),
+)
+async def autocomplete_contacts(
+        user: user_dependency,
+        db: read_db_dependency,
+        r: redis_dependency,
+        prefix: Annotated[str, Query(min_length=1, max_length=50)],
+        limit: Annotated[int, Query(gt=0, le=settings.autocomplete.max_results)] = settings.autocomplete.max_results,
+):
+    return await autocomplete.search(r, db, user.id, prefix, limit)
+
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+    dependencies=[Depends(RateLimiter("contacts:events"))],
+    description=describe("contacts:events"),
+)
+async def stream_contact_events(
+        user: user_dependency,
+        db: read_db_dependency,
+        r: redis_dependency,
+        last_event_id: Annotated[str | None, Header()] = None,
+):
+    # The stream may stay open for hours: give the pooled connection back now
+    db.close()
+    if last_event_id is not None and not re.fullmatch(r"\d+-\d+", last_event_id):
+        last_event_id = None
+    return StreamingResponse(
+        contact_events.stream(r, user.id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get(
     "/{contact_id}",
     response_model=ContactSchema,
-    dependencies=[Depends(RateLimiter(times=30, seconds=60))],
-    description="No more than 30 requests per minute.",
+    dependencies=[Depends(RateLimiter("contacts:read"))],
+    description=describe("contacts:read"),
 )
 async def read_contact_by_id(
         user: user_dependency,
-        db: db_dependency,
-        contact_id: int
+        db: read_db_dependency,
+        contact_id: int,
+        fields: fields_dependency,
 ):
-    contact_model = await contacts_repository.get_contact_by_id(db, user.id, contact_id)
+    contact_model = await contacts_repository.get_contact_by_id(db, user.id, contact_id, fields)
     if contact_model is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Contact '{contact_id}' not found.",
         )
-    return contact_model
+    return project(contact_model, fields)
 
 
 @router.post(
     "",
     status_code=status.HTTP_201_CREATED,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
-    description="No more than 10 requests per minute.",
+    dependencies=[Depends(RateLimiter("contacts:create"))],
+    description=describe("contacts:create"),
 )
 async def create_contact(
         user: user_dependency,
@@ -98,8 +227,8 @@ async def create_contact(
 @router.put(
     "/{contact_id}",
     response_model=ContactSchema,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
-    description="No more than 10 requests per minute.",
+    dependencies=[Depends(RateLimiter("contacts:update"))],
+    description=describe("contacts:update"),
 )
 async def update_contact(
         user: user_dependency,
@@ -119,8 +248,8 @@ async def update_contact(
 @router.patch(
     "/{contact_id}",
     response_model=ContactSchema,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
-    description="No more than 10 requests per minute.",
+    dependencies=[Depends(RateLimiter("contacts:update"))],
+    description=describe("contacts:update"),
 )
 async def update_birth_date(
         user: user_dependency,
@@ -140,8 +269,8 @@ async def update_birth_date(
 @router.delete(
     "/{contact_id}",
     status_code=status.HTTP_204_NO_CONTENT,
-    dependencies=[Depends(RateLimiter(times=5, seconds=60))],
-    description="No more than 5 requests per minute.",
+    dependencies=[Depends(RateLimiter("contacts:delete"))],
+    description=describe("contacts:delete"),
 )
 async def delete_contact(
         user: user_dependency,
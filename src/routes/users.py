@@ -2,9 +2,10 @@ import cloudinary
 import cloudinary.uploader
 from fastapi import APIRouter, UploadFile
 
-from src.dependency import user_dependency, db_dependency
+from src.dependency import user_dependency, db_dependency, redis_dependency
 from src.repository import users as user_repository
 from src.schemas.users import UserSchema
+from src.services.auth import user_cache_key
 from src.settings import settings
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -20,6 +21,7 @@ async def update_user_avatar(
         file: UploadFile,
         current_user: user_dependency,
         db: db_dependency,
+        r: redis_dependency,
 ):
     cloudinary.config(
         cloud_name=settings.cloudinary.name,
@@ -33,5 +35,6 @@ async def update_user_avatar(
     src_url = cloudinary.CloudinaryImage(f"AddressBookApp/user/{current_user.id}").build_url(
         width=250, height=250, crop="fill",
     )
-    user_model = await user_repository.update_avatar(db, current_user.email, src_url)
+    user_model = await user_repository.update_avatar(db, current_user.id, src_url)
+    await r.delete(user_cache_key(current_user.id), user_cache_key(current_user.email))
     return user_model
@@ -1,6 +1,7 @@
-from datetime import date
+from datetime import date, datetime
+from functools import cache
 
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, TypeAdapter, create_model
 
 
 class ContactBaseSchema(BaseModel):
@@ -18,6 +19,58 @@ class ContactSchema(ContactBaseSchema):
     id: int
 
 
+CONTACT_FIELDS = tuple(ContactSchema.model_fields)
+
+
+@cache
+def contact_projection(fields: tuple[str, ...]) -> TypeAdapter:
+    """
+    Builds the serializer of a sparse fieldset of :class:`ContactSchema`.
+    It reads only the requested attributes, so columns left unloaded stay unloaded.
+
+    :param fields: The fields to serialize, in :data:`CONTACT_FIELDS` order.
+    :type fields: tuple[str, ...]
+    :return: An adapter for a contact or a list of contacts of that shape.
+    :rtype: TypeAdapter
+    """
+    model = create_model(
+        "ContactProjection",
+        __config__=ConfigDict(from_attributes=True),
+        **{field: (ContactSchema.model_fields[field].annotation, ...) for field in fields},
+    )
+    return TypeAdapter(model | list[model])
+
+
+class ContactSyncSchema(ContactSchema):
+    version:    int
+    updated_at: datetime | None = None
+
+
+class ContactChangesSchema(BaseModel):
+    changed:  list[ContactSyncSchema]
+    deleted:  list[int]
+    cursor:   int
+    has_more: bool
+
+
+class ContactSuggestionSchema(BaseModel):
+    id:         int
+    first_name: str
+    last_name:  str | None = None
+    email:      str | None = None
+    phone:      str
+
+
+class ContactStatsSchema(BaseModel):
+    total:              int
+    with_last_name:     int
+    with_email:         int
+    with_birth_date:    int
+    with_extra:         int
+    completeness:       float
+    birthdays_by_month: dict[int, int]
+
+
 class ContactCreateSchema(ContactBaseSchema):
     pass
 
@@ -1,6 +1,8 @@
+import asyncio
 import pickle
+import secrets
 from datetime import timedelta
-from typing import Annotated
+from typing import Annotated, Any
 
 from fastapi import HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
@@ -8,6 +10,7 @@ from jose import JWTError
 from redis import Redis
 from sqlalchemy.orm import Session
 from starlette import status
+from starlette.concurrency import run_in_threadpool
 from passlib.context import CryptContext
 
 from src.config import (
@@ -21,12 +24,35 @@ from src.database.db import get_db
 from src.database.models import UserORM
 from src.database.redis import get_redis
 from src.repository import users as user_repository
+from src.services.revocation import revocations
 from src.utils import auth as auth_utils
+from src.utils.singleflight import StaleWhileRevalidateCache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+hash_semaphore = asyncio.Semaphore(settings.auth_throttle.max_concurrent_hashes)
+
+user_cache = StaleWhileRevalidateCache("user", settings.cache, settings.cache.user_ttl_seconds)
+
+
+def user_cache_key(subject: str | int) -> str:
+    """
+    Returns the cache key of a user.
+
+    Versioned, bumped whenever the cached user changes shape: releases before
+    the stale-while-revalidate cache stored plain strings under
+    ``user:{subject}``, which the hash reads cannot handle, and ``v2`` users
+    predate the ``tier`` column.
+
+    :param subject: The token subject, the user ID or email.
+    :type subject: str | int
+    :return: The cache key.
+    :rtype: str
+    """
+    return f"user:v3:{subject}"
+
 
 def hash_password(password: str) -> str:
     """
@@ -54,52 +80,142 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(user_model: UserORM) -> str:
+async def _run_hash(func, *args):
+    # Released whenever it was acquired, even if the timeout fires right after
+    acquired = False
+    try:
+        try:
+            async with asyncio.timeout(settings.auth_throttle.hash_queue_timeout):
+                await hash_semaphore.acquire()
+                acquired = True
+        except TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again later.",
+                headers={"Retry-After": "1"},
+            )
+        return await run_in_threadpool(func, *args)
+    finally:
+        if acquired:
+            hash_semaphore.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hashes a password in a worker thread, capped by the in-flight hash limit.
+
+    :param password: The plain text password.
+    :type password: str
+    :return: The hashed password.
+    :rtype: str
+    :raises HTTPException: If no hashing slot frees up within the queue timeout.
+    """
+    return await _run_hash(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
     """
-    Creates a JWT access token for a given user.
+    Verifies a password in a worker thread, capped by the in-flight hash limit.
 
-    :param user_model: The user model to generate a token for.
+    :param plain_password: The plain text password.
+    :type plain_password: str
+    :param hashed_password: The hashed password.
+    :type hashed_password: str
+    :return: True if the password matches, otherwise False.
+    :rtype: bool
+    :raises HTTPException: If no hashing slot frees up within the queue timeout.
+    """
+    return await _run_hash(verify_password, plain_password, hashed_password)
+
+
+def token_subject(user_model: UserORM) -> str:
+    """
+    Returns the value identifying a user in the ``sub`` claim of its tokens.
+
+    :param user_model: The user model.
     :type user_model: UserORM
+    :return: The token subject.
+    :rtype: str
+    """
+    return str(user_model.id)
+
+
+async def get_user_by_subject(db: Session, subject: str) -> UserORM | None:
+    """
+    Looks up the user a token subject refers to. Subjects containing ``@`` come
+    from tokens issued before subjects were user ids and are looked up by email.
+
+    :param db: The database session.
+    :type db: Session
+    :param subject: The token subject.
+    :type subject: str
+    :return: The user object if found, otherwise None.
+    :rtype: UserORM | None
+    """
+    if "@" in subject:
+        return await user_repository.get_user_by_email(db, subject)
+    if not subject.isdigit():
+        return None
+    return await user_repository.get_user_by_id(db, int(subject))
+
+
+def create_access_token(subject: str, sid: str | None = None) -> str:
+    """
+    Creates a JWT access token for a given subject.
+
+    :param subject: The token subject, see :func:`token_subject`.
+    :type subject: str
+    :param sid: The session the token was issued for, if any.
+    :type sid: str | None
     :return: A JWT access token.
     :rtype: str
     """
     payload = {
-        "sub": user_model.email,
+        "sub": subject,
+        "jti": secrets.token_urlsafe(16),
     }
+    if sid is not None:
+        payload["sid"] = sid
     return auth_utils.create_jwt(ACCESS_TOKEN_TYPE, payload)
 
 
-def create_refresh_token(user_model: UserORM) -> str:
+def create_refresh_token(subject: str, sid: str) -> str:
     """
-    Creates a JWT refresh token for a given user.
+    Creates a JWT refresh token for a session of a given subject.
 
-    :param user_model: The user model to generate a token for.
-    :type user_model: UserORM
+    :param subject: The token subject, see :func:`token_subject`.
+    :type subject: str
+    :param sid: The session (device) id the token belongs to.
+    :type sid: str
     :return: A JWT refresh token.
     :rtype: str
     """
     payload = {
-        "sub": user_model.email,
+        "sub": subject,
+        "sid": sid,
+        # Unique per token, so tokens rotated within the same second still differ.
+        "jti": secrets.token_urlsafe(16),
     }
     expire_delta = timedelta(days=settings.jwt.refresh_token_expire_days)
     return auth_utils.create_jwt(REFRESH_TOKEN_TYPE, payload, expire_delta)
 
 
-def decode_refresh_token(token: str) -> str:
+def decode_refresh_token(token: str) -> dict[str, Any]:
     """
-    Decodes and validates a refresh token, returning the user's email.
+    Decodes and validates a refresh token.
 
     :param token: The refresh token to decode.
     :type token: str
-    :return: The email of the user encoded in the token.
-    :rtype: str
+    :return: The token payload, with the subject in ``sub`` and the session id in
+        ``sid`` (absent on tokens issued before sessions existed).
+    :rtype: dict[str, Any]
     :raises HTTPException: If the token is invalid or not a refresh token.
     """
     try:
         payload = auth_utils.decode_jwt(token)
         token_type = payload[TOKEN_TYPE_FIELD]
         if token_type == REFRESH_TOKEN_TYPE:
-            return payload["sub"]
+            return payload
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token type.")
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials.")
@@ -157,52 +273,73 @@ async def authenticate_user(db: Session, email: str, password: str) -> UserORM |
     user_model = await user_repository.get_user_by_email(db, email)
     if user_model is None:
         return None
-    if not verify_password(password, user_model.hashed_password):
+    if not await verify_password_async(password, user_model.hashed_password):
         return None
     return user_model
 
 
+def get_access_token_payload(token: Annotated[str, Depends(oauth2_scheme)]) -> dict[str, Any]:
+    """
+    Decodes and validates the access token of the request.
+
+    :param token: The access token from the request.
+    :type token: str
+    :return: The token payload.
+    :rtype: dict[str, Any]
+    :raises HTTPException: If the token is invalid or not an access token.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials.",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = auth_utils.decode_jwt(token)
+    except JWTError:
+        raise credentials_exception
+    if payload.get(TOKEN_TYPE_FIELD) != ACCESS_TOKEN_TYPE or payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+
 async def get_current_user(
-        token: Annotated[str, Depends(oauth2_scheme)],
+        payload: Annotated[dict[str, Any], Depends(get_access_token_payload)],
         db: Annotated[Session, Depends(get_db)],
         r: Annotated[Redis, Depends(get_redis)],
 ):
     """
     Retrieves the current user based on the access token.
 
-    :param token: The access token from the request.
-    :type token: str
+    A cache miss loads the user from the primary: a lagging replica could
+    return a row from before an avatar change or email confirmation, which
+    would then stay cached. The session is shared with write endpoints and
+    connects only on a miss.
+
+    :param payload: The validated access token payload.
+    :type payload: dict[str, Any]
     :param db: The database session.
     :type db: Session
     :param r: The Redis cache instance.
     :type r: Redis
     :return: The authenticated user object.
     :rtype: UserORM
-    :raises HTTPException: If the token is invalid or user cannot be found.
+    :raises HTTPException: If the token was revoked or the user cannot be found.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials.",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = auth_utils.decode_jwt(token)
-        if payload[TOKEN_TYPE_FIELD] == ACCESS_TOKEN_TYPE:
-            email = payload["sub"]
-            if email is None:
-                raise credentials_exception
-        else:
-            raise credentials_exception
-    except JWTError:
+    if await revocations.is_revoked(r, payload):
         raise credentials_exception
+    subject = payload["sub"]
+
+    async def load() -> bytes | None:
+        user_model = await get_user_by_subject(db, subject)
+        return None if user_model is None else pickle.dumps(user_model)
 
-    cached_user_model = await r.get(f"user:{email}")
+    # Concurrent requests of a user share one load; each gets its own copy
+    cached_user_model = await user_cache.get(r, user_cache_key(subject), load)
     if cached_user_model is None:
-        user_model = await user_repository.get_user_by_email(db, email)
-        if user_model is None:
-            raise credentials_exception
-        await r.set(f"user:{email}", pickle.dumps(user_model))
-        await r.expire(f"user:{email}", 900)
-    else:
-        user_model = pickle.loads(cached_user_model)
-    return user_model
+        raise credentials_exception
+    return pickle.loads(cached_user_model)
@@ -0,0 +1,144 @@
+import math
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordRequestForm
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from starlette import status
+
+from src.services.rate_limit import RateLimiterEngine, limiter
+from src.settings import AuthThrottleSettings, settings
+
+
+def _too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, try again later.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AuthThrottler:
+    """
+    Throttles the CPU-heavy auth actions.
+
+    Every action draws its estimated CPU cost from a per-IP bucket, and logins
+    also from a per-account bucket, through the shared rate limiter engine.
+    Failed logins put the account into an exponentially growing backoff that
+    is checked before any password hashing happens.
+    """
+
+    def __init__(self, config: AuthThrottleSettings, engine: RateLimiterEngine):
+        self.config = config
+        self.engine = engine
+        self.redis: Redis | None = None
+
+    def init(self, redis: Redis | None):
+        """
+        Binds the throttler to a Redis client. Without one, backoff is disabled.
+
+        :param redis: The Redis client, or None.
+        :type redis: Redis | None
+        :return: None
+        """
+        self.redis = redis
+
+    async def check(self, action: str, ip: str, account: str | None = None):
+        """
+        Charges an action to the caller's IP (and account) budgets.
+
+        :param action: The throttled action, e.g. ``login``.
+        :type action: str
+        :param ip: The client IP address.
+        :type ip: str
+        :param account: The account the action targets, if any.
+        :type account: str | None
+        :return: None
+        :raises HTTPException: If a budget is exhausted or the account is backing off.
+        """
+        cost = self.config.costs.get(action, 1)
+        retry_after = await self.engine.hit(f"auth:ip:{ip}", self.config.ip_limit, cost)
+        if retry_after is not None:
+            raise _too_many_requests(retry_after)
+        if account is None:
+            return
+
+        retry_after = await self.engine.hit(f"auth:account:{account}", self.config.account_limit, cost)
+        if retry_after is not None:
+            raise _too_many_requests(retry_after)
+
+        if self.redis is not None:
+            try:
+                locked_ms = await self.redis.pttl(f"auth:lock:{account}")
+            except RedisError:
+                return
+            if locked_ms > 0:
+                raise _too_many_requests(locked_ms / 1000)
+
+    def backoff_seconds(self, failures: int) -> float:
+        """
+        Computes the backoff after ``failures`` consecutive failed logins.
+
+        :param failures: The number of failures inside the failure window.
+        :type failures: int
+        :return: The backoff in seconds, 0 while under the threshold.
+        :rtype: float
+        """
+        excess = failures - self.config.failures_before_backoff
+        if excess < 0:
+            return 0.0
+        return min(self.config.backoff_max_seconds, self.config.backoff_base_seconds * 2 ** excess)
+
+    async def login_failed(self, account: str):
+        """
+        Records a failed login and starts the account's backoff once over the threshold.
+
+        :param account: The account that failed to log in.
+        :type account: str
+        :return: None
+        """
+        if self.redis is None:
+            return
+        key = f"auth:fail:{account}"
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                failures, _ = await pipe.incr(key).expire(key, self.config.failure_window_seconds).execute()
+            backoff = self.backoff_seconds(failures)
+            if backoff:
+                await self.redis.set(f"auth:lock:{account}", failures, px=int(backoff * 1000))
+        except RedisError:
+            pass
+
+    async def login_succeeded(self, account: str):
+        """
+        Clears the failure count and backoff of an account.
+
+        :param account: The account that logged in.
+        :type account: str
+        :return: None
+        """
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(f"auth:fail:{account}", f"auth:lock:{account}")
+        except RedisError:
+            pass
+
+
+throttle = AuthThrottler(settings.auth_throttle, limiter)
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+async def throttle_signup(request: Request):
+    await throttle.check("signup", client_ip(request))
+
+
+async def throttle_login(
+        request: Request,
+        form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+):
+    await throttle.check("login", client_ip(request), form_data.username.lower())
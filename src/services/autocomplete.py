@@ -0,0 +1,350 @@
+import asyncio
+import itertools
+import json
+import logging
+import re
+import unicodedata
+from typing import Any, Iterable, NamedTuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from src.database import redis as redis_db
+from src.database.models import ContactORM
+from src.settings import AutocompleteSettings, settings
+
+logger = logging.getLogger(__name__)
+
+BUILT = "_"
+
+# Reads the matching terms and the contacts they point to in one round trip.
+# Returns nil when the index has not been built.
+SEARCH_SCRIPT = """
+if redis.call("HEXISTS", KEYS[2], ARGV[5]) == 0 then return false end
+local members = redis.call("ZRANGEBYLEX", KEYS[1], ARGV[1], ARGV[2], "LIMIT", 0, ARGV[3])
+local ids, seen = {}, {}
+for _, member in ipairs(members) do
+    local id = string.match(member, "|(%d+)$")
+    if not seen[id] then
+        seen[id] = true
+        ids[#ids + 1] = id
+        if #ids == tonumber(ARGV[4]) then break end
+    end
+end
+if #ids == 0 then return {} end
+return redis.call("HMGET", KEYS[2], unpack(ids))
+"""
+
+
+def _terms_key(user_id: int) -> str:
+    return f"contacts:ac:{user_id}"
+
+
+def _contacts_key(user_id: int) -> str:
+    return f"contacts:ac:{user_id}:contacts"
+
+
+def normalize(value: str) -> str:
+    """
+    Folds text for prefix matching: no accents, case-folded, punctuation
+    other than ``@ . + - _`` turned into single spaces.
+
+    :param value: The text.
+    :type value: str
+    :return: The normalised text.
+    :rtype: str
+    """
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(char for char in value if not unicodedata.combining(char)).casefold()
+    return re.sub(r"[^\w@.+-]+", " ", value).strip()
+
+
+def normalize_prefix(prefix: str) -> str:
+    """
+    Normalises a typed prefix; phone-like input is reduced to its digits.
+
+    :param prefix: The typed prefix.
+    :type prefix: str
+    :return: The normalised prefix.
+    :rtype: str
+    """
+    if re.fullmatch(r"[\d\s()+-]+", prefix) and re.search(r"\d", prefix):
+        return re.sub(r"\D", "", prefix)
+    return normalize(prefix)
+
+
+def terms(contact_model: ContactORM) -> set[str]:
+    """
+    Returns the normalised prefixes a contact can be found by: first and last
+    name, full name, email and phone digits.
+
+    :param contact_model: The contact.
+    :type contact_model: ContactORM
+    :return: The index terms.
+    :rtype: set[str]
+    """
+    values = [
+        contact_model.first_name,
+        contact_model.last_name,
+        f"{contact_model.first_name or ''} {contact_model.last_name or ''}",
+        contact_model.email,
+    ]
+    found = {normalize(value) for value in values if value}
+    if contact_model.phone:
+        found.add(re.sub(r"\D", "", contact_model.phone))
+    return {term for term in found if term}
+
+
+def _members(contact_id: int, contact_terms: Iterable[str]) -> list[str]:
+    return [f"{term}|{contact_id}" for term in contact_terms]
+
+
+def _suggestion(contact_model: ContactORM) -> dict[str, Any]:
+    return {
+        "id": contact_model.id,
+        "first_name": contact_model.first_name,
+        "last_name": contact_model.last_name,
+        "email": contact_model.email,
+        "phone": contact_model.phone,
+    }
+
+
+def _document(contact_model: ContactORM) -> str:
+    return json.dumps(_suggestion(contact_model), separators=(",", ":"))
+
+
+class IndexEntry(NamedTuple):
+    contact_id: int
+    terms: set[str]
+    document: str
+
+
+def index_entry(contact_model: ContactORM) -> IndexEntry:
+    """
+    Captures what the index stores for a contact. Call it before the commit
+    expires the contact, so building it does not reload the row.
+
+    :param contact_model: The contact.
+    :type contact_model: ContactORM
+    :return: The index entry.
+    :rtype: IndexEntry
+    """
+    return IndexEntry(contact_model.id, terms(contact_model), _document(contact_model))
+
+
+class AutocompleteIndex:
+    """
+    Per-user type-ahead index of contacts in Redis.
+
+    A sorted set with every score 0 holds ``<term>|<contact id>`` members, so
+    ``ZRANGEBYLEX`` returns the terms starting with a prefix in O(log n); a
+    hash holds what the suggestions show. The repository keeps the index up
+    to date on every change. An index that is missing (a new deploy, evicted
+    keys) is rebuilt from the database on the next search; while Redis fails,
+    searches fall back to a bounded prefix query.
+    """
+
+    def __init__(self, config: AutocompleteSettings):
+        self.config = config
+
+    async def index(self, user_id: int, entry: IndexEntry, old_terms: set[str] | None = None):
+        """
+        Adds or re-indexes a contact. Failures are logged: the index is rebuilt once it goes missing.
+
+        :param user_id: The ID of the user owning the contact.
+        :type user_id: int
+        :param entry: The contact as saved, see :func:`index_entry`.
+        :type entry: IndexEntry
+        :param old_terms: The terms of the contact before an update.
+        :type old_terms: set[str] | None
+        :return: None
+        """
+        r = redis_db.redis_client
+        if r is None:
+            return
+        try:
+            async with r.pipeline(transaction=True) as pipe:
+                stale = _members(entry.contact_id, (old_terms or set()) - entry.terms)
+                if stale:
+                    pipe.zrem(_terms_key(user_id), *stale)
+                if entry.terms:
+                    pipe.zadd(_terms_key(user_id), dict.fromkeys(_members(entry.contact_id, entry.terms), 0))
+                pipe.hset(_contacts_key(user_id), str(entry.contact_id), entry.document)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Updating the autocomplete index failed: %s", e)
+
+    async def remove(self, user_id: int, contact_id: int, old_terms: set[str]):
+        """
+        Removes a deleted contact from the index.
+
+        :param user_id: The ID of the user owning the contact.
+        :type user_id: int
+        :param contact_id: The ID of the deleted contact.
+        :type contact_id: int
+        :param old_terms: The terms of the contact.
+        :type old_terms: set[str]
+        :return: None
+        """
+        r = redis_db.redis_client
+        if r is None:
+            return
+        try:
+            async with r.pipeline(transaction=True) as pipe:
+                if old_terms:
+                    pipe.zrem(_terms_key(user_id), *_members(contact_id, old_terms))
+                pipe.hdel(_contacts_key(user_id), str(contact_id))
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Updating the autocomplete index failed: %s", e)
+
+    async def rebuild(self, r: Redis, user_id: int, contact_models: Iterable[ContactORM]):
+        """
+        Replaces a user's index with one built from ``contact_models``.
+        The new index is written under temporary keys and swapped in atomically.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param contact_models: All contacts of the user.
+        :type contact_models: Iterable[ContactORM]
+        :return: None
+        """
+        terms_key, contacts_key = _terms_key(user_id), _contacts_key(user_id)
+        members, documents = {}, {BUILT: "1"}
+        for contact_model in contact_models:
+            members.update(dict.fromkeys(_members(contact_model.id, terms(contact_model)), 0))
+            documents[str(contact_model.id)] = _document(contact_model)
+
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.delete(f"{terms_key}:new", f"{contacts_key}:new")
+            if members:
+                pipe.zadd(f"{terms_key}:new", members)
+                pipe.rename(f"{terms_key}:new", terms_key)
+            else:
+                pipe.delete(terms_key)
+            pipe.hset(f"{contacts_key}:new", mapping=documents)
+            pipe.rename(f"{contacts_key}:new", contacts_key)
+            await pipe.execute()
+
+    async def rebuild_from_db(self, r: Redis, db: Session, user_id: int):
+        """
+        Rebuilds a user's index from the database.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param db: The database session.
+        :type db: Session
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :return: None
+        """
+        contact_models = db.scalars(select(ContactORM).where(ContactORM.user_id == user_id)).all()
+        await self.rebuild(r, user_id, contact_models)
+
+    async def rebuild_all(self, r: Redis, db: Session) -> int:
+        """
+        Rebuilds the index of every user having contacts, streaming the contacts in user order.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param db: The database session.
+        :type db: Session
+        :return: The number of indexes rebuilt.
+        :rtype: int
+        """
+        stmt = select(ContactORM).order_by(ContactORM.user_id).execution_options(yield_per=1000)
+        rebuilt = 0
+        for user_id, contact_models in itertools.groupby(db.scalars(stmt), key=lambda contact: contact.user_id):
+            await self.rebuild(r, user_id, contact_models)
+            rebuilt += 1
+        return rebuilt
+
+    async def search(self, r: Redis, db: Session, user_id: int, prefix: str, limit: int) -> list[dict[str, Any]]:
+        """
+        Suggests the contacts having a name, email or phone starting with ``prefix``.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param db: The database session, used only to rebuild a missing index.
+        :type db: Session
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param prefix: The typed prefix.
+        :type prefix: str
+        :param limit: The maximum number of suggestions.
+        :type limit: int
+        :return: The suggested contacts, by matching term.
+        :rtype: list[dict[str, Any]]
+        """
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+        keys = (_terms_key(user_id), _contacts_key(user_id))
+        # The byte bounds select every term starting with the prefix
+        args = (b"[" + prefix.encode(), b"[" + prefix.encode() + b"\xff", limit * self.config.scan_factor, limit, BUILT)
+        try:
+            documents = await r.eval(SEARCH_SCRIPT, 2, *keys, *args)
+            if documents is None:
+                await self.rebuild_from_db(r, db, user_id)
+                documents = await r.eval(SEARCH_SCRIPT, 2, *keys, *args)
+        except RedisError as e:
+            logger.warning("Autocomplete search failed, querying the database: %s", e)
+            return self.search_db(db, user_id, prefix, limit)
+        return [json.loads(document) for document in documents if document is not None]
+
+    @staticmethod
+    def search_db(db: Session, user_id: int, prefix: str, limit: int) -> list[dict[str, Any]]:
+        """
+        Suggests contacts with a prefix query, for when the index is unavailable.
+        Names are matched case-insensitively but, unlike the index, not accent-folded.
+
+        :param db: The database session.
+        :type db: Session
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param prefix: The normalised prefix, see :func:`normalize_prefix`.
+        :type prefix: str
+        :param limit: The maximum number of suggestions.
+        :type limit: int
+        :return: The suggested contacts, by ID.
+        :rtype: list[dict[str, Any]]
+        """
+        pattern = re.sub(r"([\\%_])", r"\\\1", prefix) + "%"
+        conditions = [
+            ContactORM.first_name.ilike(pattern, escape="\\"),
+            ContactORM.last_name.ilike(pattern, escape="\\"),
+            ContactORM.email_normalized.like(pattern, escape="\\"),
+        ]
+        if prefix.isdigit():
+            conditions.append(ContactORM.phone_normalized.like(f"+{pattern}", escape="\\"))
+        stmt = (
+            select(ContactORM)
+            .where(ContactORM.user_id == user_id, or_(*conditions))
+            .order_by(ContactORM.id)
+            .limit(limit)
+        )
+        return [_suggestion(contact_model) for contact_model in db.scalars(stmt)]
+
+
+autocomplete = AutocompleteIndex(settings.autocomplete)
+
+
+async def _rebuild_all():
+    from src.database.db import SessionLocal
+
+    r = await redis_db.init_redis()
+    try:
+        with SessionLocal() as db:
+            rebuilt = await autocomplete.rebuild_all(r, db)
+    finally:
+        await redis_db.close_redis()
+    print(f"Rebuilt the autocomplete index of {rebuilt} users.")
+
+
+if __name__ == "__main__":
+    # python -m src.services.autocomplete
+    asyncio.run(_rebuild_all())
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.database import redis as redis_db
+from src.database.models import ContactORM
+from src.schemas.contacts import ContactSyncSchema
+from src.settings import ContactEventSettings, settings
+from src.utils.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "contacts:events"
+# Sent when the events after Last-Event-ID cannot be replayed
+RESET_DATA = json.dumps({"type": "reset", "changes": "/contacts/changes"}, separators=(",", ":"))
+
+subscribers_gauge = Gauge("contact_events_subscribers", "Open contact event streams of this worker.")
+
+# Appends the event to the user's stream (kept for Last-Event-ID resumes) and
+# publishes it with its stream id to every worker in the same round trip.
+PUBLISH_SCRIPT = """
+local id = redis.call("XADD", KEYS[1], "MAXLEN", "~", ARGV[1], "*", "data", ARGV[2])
+redis.call("EXPIRE", KEYS[1], ARGV[3])
+redis.call("PUBLISH", KEYS[2], ARGV[4] .. "|" .. id .. "|" .. ARGV[2])
+return id
+"""
+
+
+def _stream_key(user_id: int) -> str:
+    return f"contacts:events:{user_id}"
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _parse_id(event_id: str) -> tuple[int, int]:
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def contact_event(event_type: str, contact_model: ContactORM) -> dict[str, Any]:
+    """
+    Builds the event describing a contact change. Call it before the commit
+    expires the contact, so building it does not reload the row.
+
+    :param event_type: ``created``, ``updated`` or ``deleted``.
+    :type event_type: str
+    :param contact_model: The changed contact.
+    :type contact_model: ContactORM
+    :return: The event; ``contact`` is omitted for deletes.
+    :rtype: dict[str, Any]
+    """
+    event = {"type": event_type, "id": contact_model.id, "version": contact_model.version}
+    if event_type != "deleted":
+        event["contact"] = ContactSyncSchema.model_validate(contact_model).model_dump(mode="json")
+    return event
+
+
+def format_event(event_id: str | None, data: str, event: str = "contact") -> str:
+    """
+    Formats a server-sent event.
+
+    :param event_id: The event id sent back by the client as ``Last-Event-ID``.
+    :type event_id: str | None
+    :param data: The event data (single line JSON).
+    :type data: str
+    :param event: The event name.
+    :type event: str
+    :return: The event in the ``text/event-stream`` format.
+    :rtype: str
+    """
+    lines = [f"event: {event}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+class ContactEventHub:
+    """
+    Fans contact change events out to the open event streams of a worker.
+
+    Every change is appended to a capped per-user Redis stream and published
+    on one channel. Each worker holds a single subscription for that channel
+    and routes the events to the in-process queues of the user's streams, so
+    idle streams cost a queue each rather than a Redis connection. Streams are
+    replayed from the per-user Redis stream on reconnect. A stream whose queue
+    overflows, or every stream when the subscription drops, is closed; the
+    client reconnects with ``Last-Event-ID``. When the events after it cannot
+    be replayed (trimmed, expired, or Redis failed) the stream sends a
+    ``reset`` event instead, and the client catches up through
+    ``/contacts/changes``.
+    """
+
+    def __init__(self, config: ContactEventSettings):
+        self.config = config
+        self.subscribers: dict[int, set[asyncio.Queue]] = {}
+
+    async def publish(self, user_id: int, event: dict[str, Any]):
+        """
+        Publishes a contact change. Failures are logged and ignored: the change
+        is committed and clients catch up through ``/contacts/changes``.
+
+        :param user_id: The ID of the user owning the contact.
+        :type user_id: int
+        :param event: The event, see :func:`contact_event`.
+        :type event: dict[str, Any]
+        :return: None
+        """
+        r = redis_db.redis_client
+        if r is None:
+            return
+        try:
+            await r.eval(
+                PUBLISH_SCRIPT, 2, _stream_key(user_id), EVENTS_CHANNEL,
+                self.config.stream_maxlen, json.dumps(event, separators=(",", ":")),
+                self.config.stream_ttl_seconds, user_id,
+            )
+        except RedisError as e:
+            logger.warning("Publishing a contact event failed: %s", e)
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(self.config.queue_size)
+        self.subscribers.setdefault(user_id, set()).add(queue)
+        subscribers_gauge.set(sum(map(len, self.subscribers.values())))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self.subscribers.get(user_id, set())
+        queues.discard(queue)
+        if not queues:
+            self.subscribers.pop(user_id, None)
+        subscribers_gauge.set(sum(map(len, self.subscribers.values())))
+
+    @staticmethod
+    def _close(queue: asyncio.Queue):
+        # None tells the stream to end; make room for it in a full queue
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def dispatch(self, message: bytes | str):
+        """
+        Routes a published event to the streams of its user. Malformed
+        messages are logged and dropped, so they do not end the subscription.
+
+        :param message: The ``<user_id>|<event id>|<data>`` channel message.
+        :type message: bytes | str
+        :return: None
+        """
+        try:
+            user_id, event_id, data = _decode(message).split("|", 2)
+            user_id = int(user_id)
+        except ValueError:
+            logger.warning("Dropping a malformed contact event message: %r", message[:100])
+            return
+        for queue in list(self.subscribers.get(user_id, ())):
+            if queue.full():
+                self.unsubscribe(user_id, queue)
+                self._close(queue)
+            else:
+                queue.put_nowait((event_id, data))
+
+    def close_all(self):
+        for user_id, queues in list(self.subscribers.items()):
+            for queue in list(queues):
+                self.unsubscribe(user_id, queue)
+                self._close(queue)
+
+    async def run(self, r: Redis):
+        """
+        Dispatches the published events until cancelled, resubscribing after errors.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :return: None
+        """
+        while True:
+            try:
+                async with r.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(EVENTS_CHANNEL)
+                    async for message in pubsub.listen():
+                        self.dispatch(message["data"])
+            except RedisError as e:
+                logger.warning("Contact event subscription failed: %s", e)
+            self.close_all()
+            await asyncio.sleep(1)
+
+    @staticmethod
+    async def _replay(r: Redis, user_id: int, last_event_id: str) -> list[tuple[str, str]] | None:
+        # The retained events after last_event_id, None if some may be gone
+        try:
+            last = _parse_id(last_event_id)
+        except ValueError:
+            return None
+        key = _stream_key(user_id)
+        oldest = await r.xrange(key, count=1)
+        if not oldest or _parse_id(_decode(oldest[0][0])) > last:
+            # Trimmed past it, or expired
+            return None
+        return [
+            (_decode(event_id), _decode(fields[b"data"] if b"data" in fields else fields["data"]))
+            for event_id, fields in await r.xrange(key, min=f"({last_event_id}")
+        ]
+
+    async def stream(self, r: Redis, user_id: int, last_event_id: str | None = None) -> AsyncIterator[str]:
+        """
+        Yields the server-sent events of a user's contact changes, starting
+        after ``last_event_id`` if given, with a comment as heartbeat.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param last_event_id: The ``Last-Event-ID`` the client reconnected with.
+        :type last_event_id: str | None
+        :return: An iterator of formatted events.
+        :rtype: AsyncIterator[str]
+        """
+        queue = self.subscribe(user_id)
+        try:
+            yield f"retry: {self.config.retry_ms}\n\n"
+            last = None
+            if last_event_id:
+                # Subscribed first, so events published during the replay are queued, not lost
+                try:
+                    replay = await self._replay(r, user_id, last_event_id)
+                except RedisError as e:
+                    logger.warning("Replaying contact events failed: %s", e)
+                    replay = None
+                if replay is None:
+                    yield format_event(None, RESET_DATA, event="reset")
+                else:
+                    last = _parse_id(last_event_id)
+                    for event_id, data in replay:
+                        last = _parse_id(event_id)
+                        yield format_event(event_id, data)
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), self.config.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if item is None:
+                    return
+                event_id, data = item
+                if last is not None and _parse_id(event_id) <= last:
+                    continue
+                yield format_event(event_id, data)
+        finally:
+            self.unsubscribe(user_id, queue)
+
+
+contact_events = ContactEventHub(settings.contact_events)
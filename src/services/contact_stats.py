@@ -0,0 +1,111 @@
+import json
+import logging
+from typing import Any, Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.database import redis as redis_db
+from src.settings import ContactSettings, settings
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Keeps the stats only if they were computed at or after the last invalidation,
+# so stats read before a concurrent change (or from a lagging replica) are not cached.
+STORE_SCRIPT = """
+local invalidated = tonumber(redis.call("HGET", KEYS[1], "version") or "-1")
+if tonumber(ARGV[1]) < invalidated then return 0 end
+redis.call("HSET", KEYS[1], "version", ARGV[1], "stats", ARGV[2])
+redis.call("EXPIRE", KEYS[1], ARGV[3])
+return 1
+"""
+
+# Drops the stats and records the version they must be at least as new as.
+INVALIDATE_SCRIPT = """
+local invalidated = tonumber(redis.call("HGET", KEYS[1], "version") or "-1")
+if tonumber(ARGV[1]) > invalidated then
+    redis.call("HSET", KEYS[1], "version", ARGV[1])
+end
+redis.call("HDEL", KEYS[1], "stats")
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+return 1
+"""
+
+
+def _stats_key(user_id: int) -> str:
+    return f"contacts:stats:{user_id}"
+
+
+class ContactStatsCache:
+    """
+    Per-user contact statistics cached in Redis.
+
+    The statistics are computed by one aggregate query and cached until the
+    user's contacts change: every change drops them and records the new
+    contacts version, and statistics older than that version are never cached.
+    """
+
+    def __init__(self, config: ContactSettings):
+        self.config = config
+        self.flight = SingleFlight("contact_stats")
+
+    async def get(
+            self,
+            r: Redis,
+            user_id: int,
+            compute: Callable[[], Awaitable[tuple[dict[str, Any], int]]],
+    ) -> dict[str, Any]:
+        """
+        Returns a user's contact statistics, from the cache when possible.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param compute: Computes the statistics and the contacts version they
+            reflect, see :func:`src.repository.contacts.get_stats`.
+        :type compute: Callable[[], Awaitable[tuple[dict[str, Any], int]]]
+        :return: The statistics.
+        :rtype: dict[str, Any]
+        """
+        key = _stats_key(user_id)
+        try:
+            cached = await r.hget(key, "stats")
+        except RedisError as e:
+            logger.warning("Reading cached contact stats failed: %s", e)
+            cached = None
+        if cached is not None:
+            return json.loads(cached)
+
+        # Concurrent misses of a user share one aggregate query
+        return await self.flight.do(user_id, lambda: self._compute(r, key, compute))
+
+    async def _compute(self, r: Redis, key: str, compute: Callable[[], Awaitable[tuple[dict[str, Any], int]]]):
+        stats, version = await compute()
+        try:
+            await r.eval(STORE_SCRIPT, 1, key, version, json.dumps(stats), self.config.stats_ttl_seconds)
+        except RedisError as e:
+            logger.warning("Caching contact stats failed: %s", e)
+        return stats
+
+    async def invalidate(self, user_id: int, version: int):
+        """
+        Drops a user's cached statistics after a change of their contacts.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param version: The contacts version of the change.
+        :type version: int
+        :return: None
+        """
+        r = redis_db.redis_client
+        if r is None:
+            return
+        try:
+            await r.eval(INVALIDATE_SCRIPT, 1, _stats_key(user_id), version, self.config.stats_ttl_seconds)
+        except RedisError as e:
+            logger.warning("Invalidating contact stats failed: %s", e)
+
+
+contact_stats = ContactStatsCache(settings.contacts)
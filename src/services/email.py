@@ -1,10 +1,12 @@
 from pathlib import Path
 
+from fastapi import BackgroundTasks
 from fastapi_mail import FastMail, ConnectionConfig, MessageSchema, MessageType
-from fastapi_mail.connection import ConnectionErrors
+from pydantic import BaseModel
 
 from src.database.models import UserORM
 from src.services import auth as auth_service
+from src.services.jobs import jobs
 from src.settings import settings
 
 conf = ConnectionConfig(
@@ -31,21 +33,60 @@ async def send_email(user_model: UserORM, host: str):
     :param host: The host domain used to construct the verification URL.
     :type host: str
     :return: None
-    :raises ConnectionErrors: If email could not be sent due to connection issues.
+    :raises ConnectionErrors: If email could not be sent due to connection issues,
+        the job queue then retries it.
     """
-    try:
-        verification_token = auth_service.create_verify_token(user_model)
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[user_model.email],
-            template_body={
-                "host": host,
-                "username": f"{user_model.first_name} {user_model.last_name}",
-                "token": verification_token
-            },
-            subtype=MessageType.html,
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_template.html")
-    except ConnectionErrors as e:
-        print(e)
+    verification_token = auth_service.create_verify_token(user_model)
+    message = MessageSchema(
+        subject="Confirm your email ",
+        recipients=[user_model.email],
+        template_body={
+            "host": host,
+            "username": f"{user_model.first_name} {user_model.last_name}",
+            "token": verification_token
+        },
+        subtype=MessageType.html,
+    )
+    fm = FastMail(conf)
+    await fm.send_message(message, template_name="email_template.html")
+
+
+class VerificationEmailJob(BaseModel):
+    email:      str
+    first_name: str
+    last_name:  str | None = None
+    host:       str
+
+
+@jobs.handler("send_verification_email", VerificationEmailJob)
+async def send_verification_email(job: VerificationEmailJob):
+    """
+    Sends a verification email from a background job.
+
+    :param job: The recipient and the host of the confirmation link.
+    :type job: VerificationEmailJob
+    :return: None
+    """
+    user_model = UserORM(email=job.email, first_name=job.first_name, last_name=job.last_name)
+    await send_email(user_model, job.host)
+
+
+async def queue_verification_email(user_model: UserORM, host: str, fallback: BackgroundTasks | None = None):
+    """
+    Queues a verification email to a user.
+
+    :param user_model: The user to whom the email should be sent.
+    :type user_model: UserORM
+    :param host: The host domain used to construct the verification URL.
+    :type host: str
+    :param fallback: Where to send the email when the job queue is unavailable.
+    :type fallback: BackgroundTasks | None
+    :return: None
+    """
+    job = VerificationEmailJob(
+        email=user_model.email,
+        first_name=user_model.first_name,
+        last_name=user_model.last_name,
+        host=str(host),
+    )
+    await jobs.enqueue("send_verification_email", job, fallback)
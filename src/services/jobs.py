@@ -0,0 +1,304 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, NamedTuple
+
+from fastapi import BackgroundTasks
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+
+from src.database import redis as redis_db
+from src.settings import JobSettings, settings
+from src.utils.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+jobs_processed = Counter(
+    "jobs_processed_total", "Background jobs run by the workers, by outcome.", ["name", "outcome"],
+)
+
+# Acknowledges a failed job and schedules its next attempt, atomically so a
+# crash in between neither loses nor duplicates it.
+RETRY_SCRIPT = """
+redis.call("ZADD", KEYS[2], ARGV[3], ARGV[4])
+redis.call("XACK", KEYS[1], ARGV[1], ARGV[2])
+return 1
+"""
+
+# Acknowledges a job that ran out of attempts and moves it to the dead letters.
+DEAD_LETTER_SCRIPT = """
+redis.call("XADD", KEYS[2], "MAXLEN", "~", ARGV[3], "*",
+    "name", ARGV[4], "payload", ARGV[5], "attempt", ARGV[6], "error", ARGV[7])
+redis.call("XACK", KEYS[1], ARGV[1], ARGV[2])
+return 1
+"""
+
+# Moves the retries that are due back to the stream.
+PROMOTE_SCRIPT = """
+local due = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, ARGV[2])
+for _, member in ipairs(due) do
+    local job = cjson.decode(member)
+    redis.call("XADD", KEYS[2], "MAXLEN", "~", ARGV[3], "*",
+        "name", job.name, "payload", job.payload, "attempt", job.attempt)
+    redis.call("ZREM", KEYS[1], member)
+end
+return #due
+"""
+
+
+class Handler(NamedTuple):
+    func: Callable[[BaseModel], Awaitable[None]]
+    model: type[BaseModel]
+
+
+def _decode(fields: dict) -> dict[str, str]:
+    return {
+        (key.decode() if isinstance(key, bytes) else key): (value.decode() if isinstance(value, bytes) else value)
+        for key, value in fields.items()
+    }
+
+
+class JobQueue:
+    """
+    Durable background jobs on a Redis stream, run by separate worker processes.
+
+    Jobs are read through a consumer group, so each job goes to one worker and
+    stays pending until it is acknowledged: the jobs of a worker that dies are
+    taken over by another one. A failed job is retried with exponential backoff
+    and moved to the dead letter stream after ``max_attempts``.
+
+    Without Redis (in tests or during an outage) a job runs in the web process,
+    after the response, as FastAPI background tasks did.
+    """
+
+    def __init__(self, config: JobSettings):
+        self.config = config
+        self.handlers: dict[str, Handler] = {}
+        self.delayed = f"{config.stream}:delayed"
+        self.dead = f"{config.stream}:dead"
+
+    def handler(self, name: str, model: type[BaseModel]):
+        """
+        Registers the handler of a job type.
+
+        :param name: The job name.
+        :type name: str
+        :param model: The model the job payload is validated with.
+        :type model: type[BaseModel]
+        :return: The decorator.
+        """
+        def register(func: Callable[[BaseModel], Awaitable[None]]):
+            self.handlers[name] = Handler(func, model)
+            return func
+        return register
+
+    async def enqueue(self, name: str, payload: BaseModel, fallback: BackgroundTasks | None = None) -> str | None:
+        """
+        Queues a job for the workers.
+
+        :param name: The job name.
+        :type name: str
+        :param payload: The job payload.
+        :type payload: BaseModel
+        :param fallback: Where to run the job when Redis is unavailable, the
+            job runs right away without it.
+        :type fallback: BackgroundTasks | None
+        :return: The ID of the queued job, or None if it runs in process.
+        :rtype: str | None
+        """
+        if name not in self.handlers:
+            raise KeyError(f"Unknown job {name!r}")
+        data = payload.model_dump_json()
+        r = redis_db.redis_client
+        if r is not None:
+            try:
+                job_id = await r.xadd(
+                    self.config.stream, {"name": name, "payload": data, "attempt": 1},
+                    maxlen=self.config.maxlen, approximate=True,
+                )
+                return job_id.decode() if isinstance(job_id, bytes) else job_id
+            except RedisError as e:
+                logger.warning("Queueing job %s failed, running it in process: %s", name, e)
+        if fallback is not None:
+            fallback.add_task(self.run_inline, name, data)
+        else:
+            await self.run_inline(name, data)
+        return None
+
+    async def run_inline(self, name: str, data: str):
+        """
+        Runs a job once in the current process, logging a failure.
+
+        :param name: The job name.
+        :type name: str
+        :param data: The JSON payload.
+        :type data: str
+        :return: None
+        """
+        handler = self.handlers[name]
+        try:
+            await handler.func(handler.model.model_validate_json(data))
+        except Exception:
+            logger.exception("Job %s failed", name)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Returns the delay before the next attempt of a job, with jitter.
+
+        :param attempt: The attempt that failed, from 1.
+        :type attempt: int
+        :return: The delay in seconds.
+        :rtype: float
+        """
+        delay = min(self.config.backoff_max_seconds, self.config.backoff_base_seconds * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def ensure_group(self, r: Redis):
+        """
+        Creates the consumer group, with the stream, if it does not exist.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :return: None
+        """
+        try:
+            await r.xgroup_create(self.config.stream, self.config.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def promote(self, r: Redis) -> int:
+        """
+        Queues the retries that are due again.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :return: The number of jobs queued.
+        :rtype: int
+        """
+        return await r.eval(
+            PROMOTE_SCRIPT, 2, self.delayed, self.config.stream,
+            int(time.time() * 1000), self.config.concurrency * 10, self.config.maxlen,
+        )
+
+    async def process(self, r: Redis, entry_id: str, fields: dict):
+        """
+        Runs a job read from the stream, then acknowledges, retries or dead-letters it.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param entry_id: The stream entry ID.
+        :type entry_id: str
+        :param fields: The stream entry.
+        :type fields: dict
+        :return: None
+        """
+        job = _decode(fields)
+        name, data, attempt = job["name"], job["payload"], int(job["attempt"])
+        stream, group = self.config.stream, self.config.group
+        try:
+            handler = self.handlers[name]
+            await asyncio.wait_for(
+                handler.func(handler.model.model_validate_json(data)), self.config.timeout_seconds,
+            )
+        except Exception as e:
+            if attempt >= self.config.max_attempts or name not in self.handlers:
+                logger.exception("Job %s %s failed for good", name, entry_id)
+                await r.eval(
+                    DEAD_LETTER_SCRIPT, 2, stream, self.dead, group, entry_id, self.config.maxlen,
+                    name, data, attempt, repr(e),
+                )
+                jobs_processed.inc(name=name, outcome="dead")
+            else:
+                delay = self.backoff(attempt)
+                logger.warning("Job %s %s failed, retrying in %.1fs: %r", name, entry_id, delay, e)
+                # A unique member, so equal retries are not merged
+                member = json.dumps({"name": name, "payload": data, "attempt": attempt + 1, "id": uuid.uuid4().hex})
+                await r.eval(
+                    RETRY_SCRIPT, 2, stream, self.delayed, group, entry_id,
+                    int((time.time() + delay) * 1000), member,
+                )
+                jobs_processed.inc(name=name, outcome="retried")
+            return
+        await r.xack(stream, group, entry_id)
+        jobs_processed.inc(name=name, outcome="done")
+
+    async def _read_claimed(self, r: Redis, entry_ids: list) -> list:
+        # Claimed by id, as Redis < 7 returns no id for entries trimmed from the
+        # stream since; those stay pending until acknowledged here
+        async with r.pipeline(transaction=False) as pipe:
+            for entry_id in entry_ids:
+                pipe.xrange(self.config.stream, entry_id, entry_id)
+            found = await pipe.execute()
+        gone = [entry_id for entry_id, entries in zip(entry_ids, found) if not entries]
+        if gone:
+            logger.warning("Acknowledging %d claimed jobs no longer in the stream", len(gone))
+            await r.xack(self.config.stream, self.config.group, *gone)
+        return [entries[0] for entries in found if entries]
+
+    async def run_worker(self, r: Redis, consumer: str, stop: asyncio.Event | None = None):
+        """
+        Runs jobs until stopped, up to ``concurrency`` at a time.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param consumer: The name of this worker in the consumer group.
+        :type consumer: str
+        :param stop: Set to stop once the running jobs finish.
+        :type stop: asyncio.Event | None
+        :return: None
+        """
+        stop = stop or asyncio.Event()
+        stream, group, count = self.config.stream, self.config.group, self.config.concurrency
+        await self.ensure_group(r)
+        while not stop.is_set():
+            try:
+                await self.promote(r)
+                # Jobs left pending by a worker that died
+                claimed = await r.xautoclaim(
+                    stream, group, consumer, min_idle_time=self.config.claim_idle_ms, start_id="0-0", count=count,
+                    justid=True,
+                )
+                entries = await self._read_claimed(r, claimed) if claimed else []
+                if not entries:
+                    response = await r.xreadgroup(group, consumer, {stream: ">"}, count=count, block=self.config.block_ms)
+                    entries = response[0][1] if response else []
+            except RedisError as e:
+                logger.warning("Reading jobs failed: %s", e)
+                await asyncio.sleep(1)
+                continue
+            await asyncio.gather(*(
+                self.process(r, entry_id.decode() if isinstance(entry_id, bytes) else entry_id, fields)
+                for entry_id, fields in entries
+            ), return_exceptions=True)
+
+
+jobs = JobQueue(settings.jobs)
+
+
+async def _run_worker():
+    # Registers the job handlers
+    import src.services.email  # noqa: F401
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    r = await redis_db.init_redis()
+    try:
+        await jobs.run_worker(r, f"{socket.gethostname()}-{os.getpid()}", stop)
+    finally:
+        await redis_db.close_redis()
+
+
+if __name__ == "__main__":
+    # python -m src.services.jobs
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_worker())
@@ -0,0 +1,178 @@
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import Annotated
+
+from fastapi import Depends, HTTPException
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from starlette import status
+
+from src.database.models import UserORM
+from src.services.auth import get_current_user
+from src.settings import RateLimit as RateLimitConfig, RateLimitSettings, settings
+
+# Generic cell rate algorithm. Grants up to ARGV[3] tokens at once (at least
+# ARGV[4], otherwise none) and returns {granted, retry_after_ms}. The clock is
+# Redis' own, so every worker shares one notion of time.
+GCRA_LEASE_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local minimum = tonumber(ARGV[4])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local tat = tonumber(redis.call("GET", KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local available = math.floor((now + burst - tat) / interval)
+if available < minimum then
+    return {0, tat - burst + minimum * interval - now}
+end
+local granted = math.min(wanted, available)
+tat = tat + granted * interval
+redis.call("SET", KEYS[1], tat, "PX", math.ceil(tat - now))
+return {granted, 0}
+"""
+
+
+@dataclass(slots=True)
+class Lease:
+    tokens:     int
+    expires_at: float
+
+
+class RateLimiterEngine:
+    """
+    GCRA rate limiter that leases tokens from Redis in batches.
+
+    Each worker keeps the tokens it leased in a local bucket per key and only
+    goes to Redis when the bucket is empty or its lease has expired, so most
+    requests are admitted without a network round trip. A lease is a fraction
+    (``lease_fraction``) of the limit, which bounds how many tokens a worker can
+    hold back from the others.
+    """
+
+    def __init__(self, config: RateLimitSettings):
+        self.config = config
+        self.redis: Redis | None = None
+        self._script = None
+        self._leases: dict[str, Lease] = {}
+
+    def init(self, redis: Redis | None):
+        """
+        Binds the engine to a Redis client. Without one, every request is allowed.
+
+        :param redis: The Redis client, or None to disable limiting.
+        :type redis: Redis | None
+        :return: None
+        """
+        self.redis = redis
+        self._script = redis.register_script(GCRA_LEASE_SCRIPT) if redis is not None else None
+        self._leases.clear()
+
+    def limit_for(self, route: str, tier: str | None = None) -> RateLimitConfig:
+        """
+        Resolves the configured limit of a route for a user tier.
+
+        :param route: The route name, e.g. ``contacts:list``.
+        :type route: str
+        :param tier: The user tier, or None for the default tier.
+        :type tier: str | None
+        :return: The effective limit.
+        :rtype: RateLimit
+        """
+        limit = self.config.routes[route]
+        multiplier = self.config.tiers.get(tier or self.config.default_tier, 1.0)
+        return RateLimitConfig(times=max(1, int(limit.times * multiplier)), seconds=limit.seconds)
+
+    def _evict_expired(self, now: float):
+        if len(self._leases) >= self.config.max_local_keys:
+            self._leases = {key: lease for key, lease in self._leases.items() if lease.expires_at > now}
+
+    async def hit(self, key: str, limit: RateLimitConfig, cost: int = 1) -> float | None:
+        """
+        Consumes ``cost`` tokens for ``key``.
+
+        :param key: The bucket key.
+        :type key: str
+        :param limit: The limit to enforce.
+        :type limit: RateLimit
+        :param cost: The number of tokens the request costs.
+        :type cost: int
+        :return: None if the request is allowed, otherwise seconds until it would be.
+        :rtype: float | None
+        :raises HTTPException: If Redis is unavailable and the limiter fails closed.
+        """
+        if self._script is None or not self.config.enabled:
+            return None
+
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease is not None and lease.expires_at > now and lease.tokens >= cost:
+            lease.tokens -= cost
+            return None
+
+        interval_ms = limit.seconds * 1000 / limit.times
+        batch = max(cost, math.ceil(limit.times * self.config.lease_fraction))
+        try:
+            granted, retry_after_ms = await asyncio.wait_for(
+                self._script(keys=[key], args=[interval_ms, limit.seconds * 1000, batch, cost]),
+                timeout=self.config.redis_timeout_ms / 1000,
+            )
+        except (RedisError, OSError, asyncio.TimeoutError):
+            if self.config.fail_open:
+                return None
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Rate limiter unavailable.",
+                headers={"Retry-After": "1"},
+            )
+
+        granted = int(granted)
+        if granted < cost:
+            return max(float(retry_after_ms), 0.0) / 1000
+
+        self._evict_expired(now)
+        self._leases[key] = Lease(tokens=granted - cost, expires_at=now + limit.seconds)
+        return None
+
+
+limiter = RateLimiterEngine(settings.rate_limit)
+
+
+def describe(route: str) -> str:
+    """
+    Builds a route description from its configured default-tier limit.
+
+    :param route: The route name.
+    :type route: str
+    :return: A human-readable description of the limit.
+    :rtype: str
+    """
+    limit = limiter.limit_for(route)
+    if limit.seconds == 60:
+        return f"No more than {limit.times} requests per minute."
+    return f"No more than {limit.times} requests per {limit.seconds} seconds."
+
+
+class RateLimiter:
+    """
+    Route dependency enforcing the limit configured for ``route``, per user and user tier.
+    """
+
+    def __init__(self, route: str, cost: int = 1):
+        self.route = route
+        self.cost = cost
+
+    async def __call__(self, user: Annotated[UserORM, Depends(get_current_user)]):
+        limit = limiter.limit_for(self.route, user.tier)
+        retry_after = await limiter.hit(f"rl:{self.route}:user:{user.id}", limit, self.cost)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too Many Requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
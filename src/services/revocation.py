@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Any, Iterable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.settings import RevocationSettings, settings
+
+logger = logging.getLogger(__name__)
+
+REVOKED_LOG = "revoked:log"
+
+
+def _revoked_key(item: str) -> str:
+    return f"revoked:{item}"
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter over strings (double hashing on one BLAKE2b digest).
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    Revoked token ids (``jti``) and sessions (``sid``).
+
+    Redis holds the authoritative ``revoked:<item>`` keys plus a stream of
+    revocations. Every worker mirrors the stream into a bloom filter, so a
+    token is only checked against Redis when the filter reports a possible
+    hit; valid tokens are accepted without a round trip.
+    """
+
+    def __init__(self, config: RevocationSettings):
+        self.config = config
+        self.filter = BloomFilter(config.capacity, config.error_rate)
+        self.last_id = "0-0"
+
+    @staticmethod
+    def items(payload: dict[str, Any]) -> list[str]:
+        """
+        Returns the revocable items identifying a token.
+
+        :param payload: The decoded token payload.
+        :type payload: dict[str, Any]
+        :return: The ``jti:`` and ``sid:`` items of the token.
+        :rtype: list[str]
+        """
+        items = []
+        if payload.get("jti"):
+            items.append(f"jti:{payload['jti']}")
+        if payload.get("sid"):
+            items.append(f"sid:{payload['sid']}")
+        return items
+
+    async def revoke(self, r: Redis, items: list[str], ttl: int | None = None):
+        """
+        Revokes items for ``ttl`` seconds (by default the access token lifetime).
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param items: The items to revoke, e.g. ``["sid:..."]``.
+        :type items: list[str]
+        :param ttl: How long the revocation must be remembered.
+        :type ttl: int | None
+        :return: None
+        """
+        ttl = ttl or settings.jwt.access_token_expire_minutes * 60
+        min_id = int((time.time() - settings.jwt.access_token_expire_minutes * 60) * 1000)
+        async with r.pipeline(transaction=True) as pipe:
+            for item in items:
+                pipe.set(_revoked_key(item), 1, ex=max(1, ttl))
+                pipe.xadd(REVOKED_LOG, {"item": item}, minid=min_id, approximate=True)
+            await pipe.execute()
+        for item in items:
+            self.filter.add(item)
+
+    async def is_revoked(self, r: Redis, payload: dict[str, Any]) -> bool:
+        """
+        Checks whether a token was revoked. Only filter hits reach Redis.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param payload: The decoded token payload.
+        :type payload: dict[str, Any]
+        :return: True if the token or its session was revoked.
+        :rtype: bool
+        """
+        candidates = [item for item in self.items(payload) if item in self.filter]
+        if not candidates:
+            return False
+        return await r.exists(*(_revoked_key(item) for item in candidates)) > 0
+
+    async def sync(self, r: Redis):
+        """
+        Adds revocations published by other workers since the last sync to the filter.
+        The filter is rebuilt from the stream once it holds more than its capacity;
+        the current one keeps answering until the new one is loaded.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :return: None
+        """
+        if self.filter.count >= self.config.capacity:
+            bloom = BloomFilter(self.config.capacity, self.config.error_rate)
+            last_id = await self._load(r, bloom, "0-0")
+            self.filter, self.last_id = bloom, last_id
+        else:
+            self.last_id = await self._load(r, self.filter, self.last_id)
+
+    async def _load(self, r: Redis, bloom: BloomFilter, last_id: str) -> str:
+        # Adds the stream entries after last_id to the filter, returns the last one read
+        while True:
+            entries = await r.xrange(REVOKED_LOG, min=f"({last_id}", count=self.config.sync_batch)
+            for entry_id, fields in entries:
+                item = fields.get(b"item") or fields.get("item")
+                bloom.add(item.decode() if isinstance(item, bytes) else item)
+                last_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+            if len(entries) < self.config.sync_batch:
+                return last_id
+
+    async def run_sync(self, r: Redis):
+        """
+        Keeps the filter in sync until cancelled.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :return: None
+        """
+        while True:
+            try:
+                await self.sync(r)
+            except RedisError as e:
+                logger.warning("Revocation sync failed: %s", e)
+            await asyncio.sleep(self.config.sync_interval_seconds)
+
+
+revocations = RevocationList(settings.revocation)
@@ -0,0 +1,160 @@
+import hashlib
+import secrets
+
+from redis.asyncio import Redis
+
+from src.settings import settings
+
+# Replaces the stored hash only if it still matches the presented token.
+# A mismatch means an already-rotated token was replayed, so the session is
+# revoked. Returns 1 on success, 0 otherwise.
+ROTATE_SCRIPT = """
+local current = redis.call("GET", KEYS[1])
+if current == ARGV[1] then
+    redis.call("SET", KEYS[1], ARGV[2], "EX", ARGV[3])
+    return 1
+end
+if current then
+    redis.call("DEL", KEYS[1])
+    redis.call("SREM", KEYS[2], ARGV[4])
+end
+return 0
+"""
+
+
+def _session_key(subject: str, sid: str) -> str:
+    return f"session:{subject}:{sid}"
+
+
+def _index_key(subject: str) -> str:
+    return f"sessions:{subject}"
+
+
+def _ttl() -> int:
+    return settings.jwt.refresh_token_expire_days * 24 * 60 * 60
+
+
+def hash_token(token: str) -> str:
+    """
+    Hashes a refresh token for storage.
+
+    :param token: The refresh token.
+    :type token: str
+    :return: The hex SHA-256 digest of the token.
+    :rtype: str
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def new_session_id() -> str:
+    """
+    Generates a new random session (device) id.
+
+    :return: The session id.
+    :rtype: str
+    """
+    return secrets.token_urlsafe(16)
+
+
+async def create_session(r: Redis, subject: str, sid: str, token: str):
+    """
+    Stores the hash of a refresh token for a new session.
+
+    :param r: The Redis client.
+    :type r: Redis
+    :param subject: The token subject the session belongs to.
+    :type subject: str
+    :param sid: The session id.
+    :type sid: str
+    :param token: The refresh token issued for the session.
+    :type token: str
+    :return: None
+    """
+    ttl = _ttl()
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.set(_session_key(subject, sid), hash_token(token), ex=ttl)
+        pipe.sadd(_index_key(subject), sid)
+        pipe.expire(_index_key(subject), ttl)
+        await pipe.execute()
+
+
+async def verify_session(r: Redis, subject: str, sid: str, token: str) -> bool:
+    """
+    Checks a refresh token against its session with a single GET.
+
+    :param r: The Redis client.
+    :type r: Redis
+    :param subject: The token subject.
+    :type subject: str
+    :param sid: The session id.
+    :type sid: str
+    :param token: The presented refresh token.
+    :type token: str
+    :return: True if the session exists and the token is its current one.
+    :rtype: bool
+    """
+    stored = await r.get(_session_key(subject, sid))
+    if stored is None:
+        return False
+    if isinstance(stored, bytes):
+        stored = stored.decode()
+    return secrets.compare_digest(stored, hash_token(token))
+
+
+async def rotate_session(r: Redis, subject: str, sid: str, old_token: str, new_token: str) -> bool:
+    """
+    Atomically replaces a session's refresh token. Replaying an already
+    rotated token revokes the session.
+
+    :param r: The Redis client.
+    :type r: Redis
+    :param subject: The token subject.
+    :type subject: str
+    :param sid: The session id.
+    :type sid: str
+    :param old_token: The presented refresh token.
+    :type old_token: str
+    :param new_token: The refresh token replacing it.
+    :type new_token: str
+    :return: True if the session was rotated.
+    :rtype: bool
+    """
+    rotated = await r.eval(
+        ROTATE_SCRIPT, 2, _session_key(subject, sid), _index_key(subject),
+        hash_token(old_token), hash_token(new_token), _ttl(), sid,
+    )
+    return bool(rotated)
+
+
+async def revoke_session(r: Redis, subject: str, sid: str):
+    """
+    Revokes one session.
+
+    :param r: The Redis client.
+    :type r: Redis
+    :param subject: The token subject.
+    :type subject: str
+    :param sid: The session id.
+    :type sid: str
+    :return: None
+    """
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.delete(_session_key(subject, sid))
+        pipe.srem(_index_key(subject), sid)
+        await pipe.execute()
+
+
+async def revoke_all_sessions(r: Redis, subject: str) -> list[str]:
+    """
+    Revokes every session of a subject.
+
+    :param r: The Redis client.
+    :type r: Redis
+    :param subject: The token subject.
+    :type subject: str
+    :return: The ids of the revoked sessions.
+    :rtype: list[str]
+    """
+    sids = [sid.decode() if isinstance(sid, bytes) else sid for sid in await r.smembers(_index_key(subject))]
+    await r.delete(_index_key(subject), *(_session_key(subject, sid) for sid in sids))
+    return sids
@@ -1,3 +1,4 @@
+from pydantic import BaseModel, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -14,9 +15,30 @@ class PostgresSettings(BaseSettingsWithConfig):
     passwd: str
     name:   str
 
+    driver:            str        = "psycopg2"
+    prepare_threshold: int | None = 5
+    prepared_max:      int        = 100
+    query_cache_size:  int        = 500
+
+    pool_size:            int        = 5
+    max_overflow:         int        = 10
+    pool_timeout:         float      = 5.0
+    pool_recycle:         int        = 1800
+    pool_pre_ping:        bool       = True
+    pool_warm_up:         int | None = None
+    statement_timeout_ms: int        = 0
+    pgbouncer:            bool       = False
+
+    contacts_partitions: int = 16
+
+    replica_dsns:                    list[str] = []
+    replica_health_interval_seconds: float     = 5.0
+    replica_max_lag_seconds:         float     = 10.0
+    read_your_writes_seconds:        int       = 5
+
     @property
     def dsn(self) -> str:
-        return f"postgresql+psycopg2://{self.user}:{self.passwd}@{self.host}:{self.port}"
+        return f"postgresql+{self.driver}://{self.user}:{self.passwd}@{self.host}:{self.port}"
 
 
 class JWTSettings(BaseSettingsWithConfig):
@@ -25,8 +47,13 @@ class JWTSettings(BaseSettingsWithConfig):
     algorithm:  str
     secret_key: str
 
-    access_token_expire_minutes: int = 15
-    refresh_token_expire_days:   int = 30
+    backend:          str        = "jose"
+    private_key_path: str | None = None
+    public_key_path:  str | None = None
+
+    access_token_expire_minutes: int  = 15
+    refresh_token_expire_days:   int  = 30
+    rotate_refresh_tokens:       bool = True
 
 
 class MailSettings(BaseSettingsWithConfig):
@@ -53,12 +80,207 @@ class CloudinarySettings(BaseSettingsWithConfig):
     api_secret: str
 
 
+class ContactSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="contacts_")
+
+    # Country calling code given to national phone numbers (``0...``), e.g. "380"
+    default_country_code: str | None = None
+    stats_ttl_seconds:    int        = 86_400
+
+
+class ProfilerSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="sql_profiler_")
+
+    enabled:          bool  = False
+    allow_header:     bool  = False
+    header:           str   = "X-SQL-Profile"
+    slow_query_ms:    float = 100.0
+    repeat_threshold: int   = 3
+
+
+class RateLimit(BaseModel):
+    times:   int
+    seconds: int
+
+
+DEFAULT_ROUTE_LIMITS: dict[str, RateLimit] = {
+    "contacts:list":         RateLimit(times=20, seconds=60),
+    "contacts:birthdays":    RateLimit(times=5, seconds=60),
+    "contacts:read":         RateLimit(times=30, seconds=60),
+    "contacts:changes":      RateLimit(times=30, seconds=60),
+    "contacts:stats":        RateLimit(times=30, seconds=60),
+    "contacts:autocomplete": RateLimit(times=120, seconds=60),
+    "contacts:events":       RateLimit(times=10, seconds=60),
+    "contacts:create":       RateLimit(times=10, seconds=60),
+    "contacts:update":       RateLimit(times=10, seconds=60),
+    "contacts:delete":       RateLimit(times=5, seconds=60),
+}
+
+
+class RateLimitSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="rate_limit_")
+
+    enabled:          bool  = True
+    fail_open:        bool  = True
+    redis_timeout_ms: float = 50.0
+    lease_fraction:   float = 0.1
+    max_local_keys:   int   = 10_000
+    default_tier:     str   = "default"
+
+    # Merged into the defaults, so an override of some routes keeps the others
+    routes: dict[str, RateLimit] = DEFAULT_ROUTE_LIMITS
+    tiers: dict[str, float] = {"default": 1.0}
+
+    @field_validator("routes")
+    @classmethod
+    def merge_default_routes(cls, routes: dict[str, RateLimit]) -> dict[str, RateLimit]:
+        return {**DEFAULT_ROUTE_LIMITS, **routes}
+
+
+class AuthThrottleSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="auth_throttle_")
+
+    ip_limit:      RateLimit = RateLimit(times=100, seconds=60)
+    account_limit: RateLimit = RateLimit(times=50, seconds=60)
+    # Estimated CPU cost per action, in units where one bcrypt operation is 10.
+    costs: dict[str, int] = {"login": 10, "signup": 10}
+
+    failures_before_backoff: int   = 3
+    failure_window_seconds:  int   = 900
+    backoff_base_seconds:    float = 1.0
+    backoff_max_seconds:     float = 900.0
+
+    max_concurrent_hashes: int   = 4
+    hash_queue_timeout:    float = 2.0
+
+
+class RevocationSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="revocation_")
+
+    capacity:              int   = 100_000
+    error_rate:            float = 0.001
+    sync_interval_seconds: float = 1.0
+    sync_batch:            int   = 1000
+
+
+class ContactEventSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="contact_events_")
+
+    stream_maxlen:      int   = 1000
+    stream_ttl_seconds: int   = 86_400
+    heartbeat_seconds:  float = 15.0
+    retry_ms:           int   = 3000
+    queue_size:         int   = 100
+
+
+class AutocompleteSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="autocomplete_")
+
+    max_results: int = 10
+    # Terms read per suggestion, as a contact matches a prefix through several terms
+    scan_factor: int = 4
+
+
+class CompressionSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="compression_")
+
+    enabled:        bool = True
+    min_size:       int  = 1024
+    offload_size:   int  = 64 * 1024
+    gzip_level:     int  = 6
+    brotli_quality: int  = 5
+    zstd_level:     int  = 3
+
+
+class JobSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="jobs_")
+
+    stream:               str   = "jobs"
+    group:                str   = "workers"
+    maxlen:               int   = 100_000
+    concurrency:          int   = 8
+    block_ms:             int   = 5000
+    timeout_seconds:      float = 30.0
+    # Pending jobs of a worker that died are taken over after this long
+    claim_idle_ms:        int   = 60_000
+    max_attempts:         int   = 5
+    backoff_base_seconds: float = 1.0
+    backoff_max_seconds:  float = 300.0
+
+
+class CacheSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="cache_")
+
+    user_ttl_seconds: int   = 900
+    # How long an expired entry is still served while one request refreshes it
+    stale_seconds:    int   = 60
+    ttl_jitter:       float = 0.1
+    redis_lock:       bool  = True
+    lock_timeout_ms:  int   = 2000
+    lock_poll_ms:     int   = 20
+
+
+class IdempotencySettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="idempotency_")
+
+    enabled:        bool  = True
+    ttl_seconds:    int   = 86_400
+    # How long a request may run before a duplicate is allowed to run it again
+    lock_seconds:   int   = 30
+    wait_seconds:   float = 10.0
+    poll_ms:        int   = 50
+    max_key_length: int   = 255
+
+
+class MetricsSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="metrics_")
+
+    # Bearer token the scraper sends, /metrics is not served without one
+    token: str | None = None
+
+
+class AdmissionClass(BaseModel):
+    # Lower goes first when a slot frees up
+    priority:        int
+    limit:           int
+    queue_size:      int
+    timeout_seconds: float
+
+
+class AdmissionSettings(BaseSettingsWithConfig):
+    model_config = SettingsConfigDict(env_prefix="admission_")
+
+    enabled:             bool = True
+    max_concurrent:      int  = 64
+    retry_after_seconds: int  = 1
+
+    classes: dict[str, AdmissionClass] = {
+        "read":   AdmissionClass(priority=0, limit=48, queue_size=256, timeout_seconds=1.0),
+        "write":  AdmissionClass(priority=1, limit=16, queue_size=64,  timeout_seconds=2.0),
+        "auth":   AdmissionClass(priority=2, limit=8,  queue_size=32,  timeout_seconds=2.0),
+        "upload": AdmissionClass(priority=3, limit=4,  queue_size=8,   timeout_seconds=5.0),
+    }
+
+
 class Settings(BaseSettingsWithConfig):
     jwt: JWTSettings = JWTSettings()
     mail: MailSettings = MailSettings()
     postgres: PostgresSettings = PostgresSettings()
     redis: RedisSettings = RedisSettings()
     cloudinary: CloudinarySettings = CloudinarySettings()
+    contacts: ContactSettings = ContactSettings()
+    sql_profiler: ProfilerSettings = ProfilerSettings()
+    rate_limit: RateLimitSettings = RateLimitSettings()
+    auth_throttle: AuthThrottleSettings = AuthThrottleSettings()
+    revocation: RevocationSettings = RevocationSettings()
+    contact_events: ContactEventSettings = ContactEventSettings()
+    autocomplete: AutocompleteSettings = AutocompleteSettings()
+    compression: CompressionSettings = CompressionSettings()
+    jobs: JobSettings = JobSettings()
+    admission: AdmissionSettings = AdmissionSettings()
+    cache: CacheSettings = CacheSettings()
+    idempotency: IdempotencySettings = IdempotencySettings()
+    metrics: MetricsSettings = MetricsSettings()
 
 
 settings = Settings()
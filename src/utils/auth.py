@@ -1,10 +1,9 @@
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
-from jose import jwt
-
 from src.config import TOKEN_TYPE_FIELD
 from src.settings import settings
+from src.utils.jwt_backend import get_jwt_backend
 
 
 def create_jwt(
@@ -49,12 +48,7 @@ def encode_jwt(
     else:
         expire = now + timedelta(minutes=settings.jwt.access_token_expire_minutes)
     to_encode.update(exp=expire, iat=now)
-    encoded = jwt.encode(
-        to_encode,
-        settings.jwt.secret_key,
-        algorithm=settings.jwt.algorithm
-    )
-    return encoded
+    return get_jwt_backend().encode(to_encode)
 
 
 def decode_jwt(token: str) -> dict[str, Any]:
@@ -67,9 +61,4 @@ def decode_jwt(token: str) -> dict[str, Any]:
     :rtype: dict[str, Any]
     :raises JWTError: If the token is invalid or has expired.
     """
-    decoded = jwt.decode(
-        token,
-        settings.jwt.secret_key,
-        algorithms=[settings.jwt.algorithm],
-    )
-    return decoded
+    return get_jwt_backend().decode(token)
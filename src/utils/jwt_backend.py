@@ -0,0 +1,193 @@
+import abc
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+from jose import JWTError, jwk
+from jose import jwt as jose_jwt
+from jose.exceptions import JOSEError
+
+from src.settings import settings
+
+ASYMMETRIC_PREFIXES = ("RS", "PS", "ES", "EdDSA")
+
+
+def is_asymmetric(algorithm: str) -> bool:
+    """
+    Tells whether an algorithm signs with a private key and verifies with a public one.
+
+    :param algorithm: The JWS algorithm, e.g. ``HS256`` or ``EdDSA``.
+    :type algorithm: str
+    :return: True for RSA, ECDSA and EdDSA algorithms.
+    :rtype: bool
+    """
+    return algorithm.startswith(ASYMMETRIC_PREFIXES)
+
+
+class JWTBackend(abc.ABC):
+    """
+    Signs and verifies tokens with key material parsed once, on construction.
+
+    :param algorithm: The JWS algorithm.
+    :type algorithm: str
+    :param signing_key: The HMAC secret or PEM private key.
+    :type signing_key: str | bytes
+    :param verifying_key: The HMAC secret or PEM public key.
+    :type verifying_key: str | bytes
+    """
+    name: str
+
+    def __init__(self, algorithm: str, signing_key: str | bytes, verifying_key: str | bytes):
+        self.algorithm = algorithm
+
+    @abc.abstractmethod
+    def encode(self, payload: dict[str, Any]) -> str:
+        """
+        Signs a payload.
+
+        :param payload: The claims to sign.
+        :type payload: dict[str, Any]
+        :return: The encoded JWT.
+        :rtype: str
+        """
+
+    @abc.abstractmethod
+    def decode(self, token: str) -> dict[str, Any]:
+        """
+        Verifies a token and returns its claims.
+
+        :param token: The encoded JWT.
+        :type token: str
+        :return: The decoded claims.
+        :rtype: dict[str, Any]
+        :raises JWTError: If the token is invalid or has expired.
+        """
+
+    @abc.abstractmethod
+    def public_jwk(self) -> dict[str, Any] | None:
+        """
+        Returns the public verification key as a JWK, for asymmetric algorithms only.
+
+        :return: The JWK, or None for HMAC algorithms.
+        :rtype: dict[str, Any] | None
+        """
+
+
+class JoseBackend(JWTBackend):
+    """
+    python-jose backend. Supports HMAC, RSA and ECDSA algorithms.
+    """
+    name = "jose"
+
+    def __init__(self, algorithm: str, signing_key: str | bytes, verifying_key: str | bytes):
+        super().__init__(algorithm, signing_key, verifying_key)
+        self.signing_key = jwk.construct(signing_key, algorithm)
+        self.verifying_key = jwk.construct(verifying_key, algorithm)
+
+    def encode(self, payload: dict[str, Any]) -> str:
+        return jose_jwt.encode(payload, self.signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict[str, Any]:
+        return jose_jwt.decode(token, self.verifying_key, algorithms=[self.algorithm])
+
+    def public_jwk(self) -> dict[str, Any] | None:
+        if not is_asymmetric(self.algorithm):
+            return None
+        return {**self.verifying_key.to_dict(), "use": "sig"}
+
+
+class PyJWTBackend(JWTBackend):
+    """
+    PyJWT backend (optional dependency). Adds EdDSA, and reports failures as
+    :class:`jose.JWTError` so callers handle both backends the same way.
+    """
+    name = "pyjwt"
+
+    def __init__(self, algorithm: str, signing_key: str | bytes, verifying_key: str | bytes):
+        super().__init__(algorithm, signing_key, verifying_key)
+        try:
+            import jwt
+        except ImportError as e:
+            raise RuntimeError("The pyjwt JWT backend requires the 'pyjwt' extra.") from e
+
+        self._jwt = jwt.PyJWT()
+        self._errors = jwt.PyJWTError
+        try:
+            self._algorithm = jwt.get_algorithm_by_name(algorithm)
+        except NotImplementedError as e:
+            raise JWTError(str(e)) from e
+        self.signing_key = self._algorithm.prepare_key(signing_key)
+        self.verifying_key = self._algorithm.prepare_key(verifying_key)
+
+    def encode(self, payload: dict[str, Any]) -> str:
+        return self._jwt.encode(payload, self.signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict[str, Any]:
+        try:
+            return self._jwt.decode(token, self.verifying_key, algorithms=[self.algorithm])
+        except self._errors as e:
+            raise JWTError(str(e)) from e
+
+    def public_jwk(self) -> dict[str, Any] | None:
+        if not is_asymmetric(self.algorithm):
+            return None
+        return {**self._algorithm.to_jwk(self.verifying_key, as_dict=True), "alg": self.algorithm, "use": "sig"}
+
+
+BACKENDS: dict[str, type[JWTBackend]] = {
+    JoseBackend.name: JoseBackend,
+    PyJWTBackend.name: PyJWTBackend,
+}
+
+
+def create_backend(
+        name: str,
+        algorithm: str,
+        signing_key: str | bytes,
+        verifying_key: str | bytes | None = None,
+) -> JWTBackend:
+    """
+    Creates a JWT backend by name.
+
+    :param name: The backend name, ``jose`` or ``pyjwt``.
+    :type name: str
+    :param algorithm: The JWS algorithm.
+    :type algorithm: str
+    :param signing_key: The HMAC secret or PEM private key.
+    :type signing_key: str | bytes
+    :param verifying_key: The PEM public key; defaults to ``signing_key`` for HMAC.
+    :type verifying_key: str | bytes | None
+    :return: The backend.
+    :rtype: JWTBackend
+    :raises ValueError: If the backend is unknown or the algorithm unsupported by it.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JWT backend {name!r}, expected one of {sorted(BACKENDS)}.")
+    try:
+        return BACKENDS[name](algorithm, signing_key, verifying_key or signing_key)
+    except JOSEError as e:
+        raise ValueError(f"JWT backend {name!r} does not support {algorithm}: {e}") from e
+
+
+@cache
+def get_jwt_backend() -> JWTBackend:
+    """
+    Returns the backend configured in ``settings.jwt``, built on first use.
+
+    Asymmetric algorithms read their keys from ``JWT_PRIVATE_KEY_PATH`` and
+    ``JWT_PUBLIC_KEY_PATH``; HMAC algorithms use ``JWT_SECRET_KEY``.
+
+    :return: The configured backend.
+    :rtype: JWTBackend
+    """
+    config = settings.jwt
+    if not is_asymmetric(config.algorithm):
+        return create_backend(config.backend, config.algorithm, config.secret_key)
+    if not config.private_key_path or not config.public_key_path:
+        raise ValueError(f"{config.algorithm} requires JWT_PRIVATE_KEY_PATH and JWT_PUBLIC_KEY_PATH.")
+    return create_backend(
+        config.backend,
+        config.algorithm,
+        Path(config.private_key_path).read_bytes(),
+        Path(config.public_key_path).read_bytes(),
+    )
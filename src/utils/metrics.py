@@ -0,0 +1,152 @@
+import abc
+import bisect
+import threading
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(abc.ABC):
+    """
+    Base class of the in-process metrics exposed in the Prometheus text format.
+
+    :param name: The metric name.
+    :type name: str
+    :param documentation: The ``# HELP`` line.
+    :type documentation: str
+    :param labelnames: The names of the metric labels.
+    :type labelnames: Iterable[str]
+    """
+    kind: str
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> list[str]:
+        """
+        Returns the sample lines of the metric.
+
+        :return: The sample lines.
+        :rtype: list[str]
+        """
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self.values.items()]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str):
+        self.values[self._key(labels)] = value
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self.values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Iterable[str] = (),
+            buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts: dict[LabelValues, list[int]] = {}
+        self.sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self.counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self.sums[key] = self.sums.get(key, 0.0) + value
+
+    def count(self, **labels: str) -> int:
+        return sum(self.counts.get(self._key(labels), ()))
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {self.sums[key]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Holds the metrics of the process and the collectors refreshing gauges before a scrape.
+    """
+
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self.collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric):
+        self.metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[], None]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        :return: The exposition text.
+        :rtype: str
+        """
+        for collector in self.collectors:
+            collector()
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
@@ -0,0 +1,47 @@
+import re
+
+from src.settings import settings
+
+
+def normalize_phone(phone: str | None, country_code: str | None = None) -> str | None:
+    """
+    Normalises a phone number to E.164 (``+`` and digits only).
+
+    Numbers written with ``+`` or the ``00`` international prefix keep their
+    country code. A national number starting with the trunk prefix ``0`` gets
+    ``country_code`` (``CONTACTS_DEFAULT_COUNTRY_CODE`` by default) instead;
+    other numbers are taken to include their country code.
+
+    :param phone: The phone number as typed, e.g. ``+1 (555) 010``.
+    :type phone: str | None
+    :param country_code: The country calling code for national numbers, e.g. ``380``.
+    :type country_code: str | None
+    :return: The E.164 number, e.g. ``+1555010``, or None if there are no digits.
+    :rtype: str | None
+    """
+    if phone is None:
+        return None
+    digits = re.sub(r"\D", "", phone)
+    if not digits:
+        return None
+    phone = phone.strip()
+    country_code = country_code if country_code is not None else settings.contacts.default_country_code
+    if phone.startswith("00"):
+        digits = digits[2:]
+    elif not phone.startswith("+") and digits.startswith("0") and country_code:
+        digits = country_code + digits[1:]
+    return f"+{digits}"
+
+
+def normalize_email(email: str | None) -> str | None:
+    """
+    Normalises an email for case-insensitive comparison.
+
+    :param email: The email.
+    :type email: str | None
+    :return: The trimmed, lower-cased email, or None.
+    :rtype: str | None
+    """
+    if email is None:
+        return None
+    return email.strip().lower() or None
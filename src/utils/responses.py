@@ -0,0 +1,71 @@
+from contextvars import ContextVar
+from typing import Any, Mapping
+
+from fastapi.responses import JSONResponse
+from starlette.background import BackgroundTask
+
+try:
+    import msgpack
+except ImportError:  # the 'msgpack' extra
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = frozenset({MSGPACK, "application/x-msgpack", "application/vnd.msgpack"})
+
+# The body encoding the client asked for, set per request by ContentNegotiationMiddleware
+response_media_type: ContextVar[str] = ContextVar("response_media_type", default=JSON)
+
+
+def negotiate(accept: str | None) -> str:
+    """
+    Picks the response media type from an ``Accept`` header: MessagePack when
+    the client prefers it and ``msgpack`` is installed, JSON otherwise.
+
+    :param accept: The ``Accept`` header.
+    :type accept: str | None
+    :return: ``application/msgpack`` or ``application/json``.
+    :rtype: str
+    """
+    if not accept or msgpack is None:
+        return JSON
+    best, best_q = JSON, 0.0
+    for item in accept.split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type.lower() in MSGPACK_TYPES and q > best_q:
+            best, best_q = MSGPACK, q
+        elif media_type.lower() in (JSON, "application/*", "*/*") and q > best_q:
+            best, best_q = JSON, q
+    return best
+
+
+class NegotiatedResponse(JSONResponse):
+    """
+    JSON response rendered as MessagePack when the request negotiated it.
+    """
+
+    def __init__(
+            self,
+            content: Any,
+            status_code: int = 200,
+            headers: Mapping[str, str] | None = None,
+            media_type: str | None = None,
+            background: BackgroundTask | None = None,
+    ):
+        if media_type is None and response_media_type.get() == MSGPACK:
+            self.media_type = MSGPACK
+        super().__init__(content, status_code, headers, media_type, background)
+        self.headers.append("vary", "Accept")
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK:
+            return msgpack.packb(content)
+        return super().render(content)
@@ -0,0 +1,188 @@
+import asyncio
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Hashable
+
+from redis.asyncio import Redis
+
+from src.settings import CacheSettings
+from src.utils.metrics import Counter
+
+coalesced_loads = Counter(
+    "cache_coalesced_loads_total", "Loads avoided by sharing another caller's result.", ["cache"],
+)
+
+# Deletes a lock only if it is still ours
+UNLOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def jittered(ttl: float, jitter: float) -> float:
+    """
+    Shortens a TTL by a random fraction, so entries filled together do not expire together.
+
+    :param ttl: The TTL.
+    :type ttl: float
+    :param jitter: The largest fraction taken off.
+    :type jitter: float
+    :return: The jittered TTL.
+    :rtype: float
+    """
+    return ttl * (1 - random.uniform(0, jitter))
+
+
+class SingleFlight:
+    """
+    Runs one load per key at a time in this process: callers arriving while a
+    load is in flight await its result instead of loading again.
+
+    :param name: The name of the cache, for the metrics.
+    :type name: str
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls: dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.calls
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the result of the in-flight load of a key, or runs ``load``.
+
+        :param key: The key.
+        :type key: Hashable
+        :param load: Loads the value.
+        :type load: Callable[[], Awaitable[Any]]
+        :return: The loaded value, shared by all the callers.
+        :rtype: Any
+        """
+        future = self.calls.get(key)
+        if future is not None:
+            coalesced_loads.inc(cache=self.name)
+            return await asyncio.shield(future)
+
+        # Its own task, so a caller that goes away does not cancel the load of the others
+        future = asyncio.ensure_future(load())
+        self.calls[key] = future
+        future.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future):
+        if self.calls.get(key) is future:
+            del self.calls[key]
+        if not future.cancelled():
+            # Retrieved, so a failure nobody waits for any more is not reported as unhandled
+            future.exception()
+
+
+class StaleWhileRevalidateCache:
+    """
+    Byte values cached in Redis hashes, loaded once per key on a miss.
+
+    On a miss, one caller per process loads the value and, with ``redis_lock``,
+    one caller across processes: the others wait for the value to appear. Once
+    an entry is past its (jittered) TTL it is served stale for ``stale_seconds``
+    more while a single caller refreshes it.
+
+    :param name: The name of the cache, for the metrics.
+    :type name: str
+    :param config: The cache settings.
+    :type config: CacheSettings
+    :param ttl: How long values stay fresh, in seconds.
+    :type ttl: float
+    """
+
+    def __init__(self, name: str, config: CacheSettings, ttl: float):
+        self.name = name
+        self.config = config
+        self.ttl = ttl
+        self.flight = SingleFlight(name)
+
+    async def get(self, r: Redis, key: str, load: Callable[[], Awaitable[bytes | None]]) -> bytes | None:
+        """
+        Returns a cached value, loading it on a miss.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param key: The cache key.
+        :type key: str
+        :param load: Loads the value, None is not cached.
+        :type load: Callable[[], Awaitable[bytes | None]]
+        :return: The value.
+        :rtype: bytes | None
+        """
+        value, fresh_until = await r.hmget(key, "v", "t")
+        if value is None:
+            return await self.flight.do(key, lambda: self._load(r, key, load))
+        if int(fresh_until) > time.time() * 1000:
+            return value
+        if key in self.flight:
+            # Being refreshed by another request
+            coalesced_loads.inc(cache=self.name)
+            return value
+        return await self.flight.do(key, lambda: self._load(r, key, load, stale=value))
+
+    async def set(self, r: Redis, key: str, value: bytes):
+        """
+        Caches a value.
+
+        :param r: The Redis client.
+        :type r: Redis
+        :param key: The cache key.
+        :type key: str
+        :param value: The value.
+        :type value: bytes
+        :return: None
+        """
+        ttl = jittered(self.ttl, self.config.ttl_jitter)
+        fresh_until = int((time.time() + ttl) * 1000)
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={"v": value, "t": fresh_until})
+            pipe.pexpire(key, int((ttl + self.config.stale_seconds) * 1000))
+            await pipe.execute()
+
+    async def _load(
+            self,
+            r: Redis,
+            key: str,
+            load: Callable[[], Awaitable[bytes | None]],
+            stale: bytes | None = None,
+    ) -> bytes | None:
+        lock, token = None, uuid.uuid4().hex
+        if self.config.redis_lock:
+            lock = f"{key}:lock"
+            if not await r.set(lock, token, nx=True, px=self.config.lock_timeout_ms):
+                lock = None
+                if stale is not None:
+                    # Another process refreshes it
+                    coalesced_loads.inc(cache=self.name)
+                    return stale
+                value = await self._wait(r, key)
+                if value is not None:
+                    coalesced_loads.inc(cache=self.name)
+                    return value
+        try:
+            value = await load()
+            if value is not None:
+                await self.set(r, key, value)
+            return value
+        finally:
+            if lock is not None:
+                await r.eval(UNLOCK_SCRIPT, 1, lock, token)
+
+    async def _wait(self, r: Redis, key: str) -> bytes | None:
+        # Until the lock holder stores the value, or its lock would have expired
+        deadline = time.monotonic() + self.config.lock_timeout_ms / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.config.lock_poll_ms / 1000)
+            value = await r.hget(key, "v")
+            if value is not None:
+                return value
+        return None
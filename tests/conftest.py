@@ -1,11 +1,15 @@
 import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from main import app
 from src.database.models import Base
-from src.database.db import get_db
+from src.database.db import get_db, get_read_db
+from src.database.profiler import parse_summary
+from src.database.redis import get_redis
+from src.settings import settings
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -44,6 +48,10 @@ def client(session):
             session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    # A client per request (each TestClient call runs its own event loop), one shared server
+    redis_server = FakeServer()
+    app.dependency_overrides[get_redis] = lambda: FakeAsyncRedis(server=redis_server)
 
     yield TestClient(app)
 
@@ -56,3 +64,21 @@ def user():
         "email": "test@example.com",
         "password": "TestPass123"
     }
+
+
+@pytest.fixture
+def query_budget(client, monkeypatch):
+    # Sends a profiled request and asserts the endpoint stays within its SQL budget
+
+    monkeypatch.setattr(settings.sql_profiler, "allow_header", True)
+    header = settings.sql_profiler.header
+
+    def request(method, url, max_queries, max_repeated=0, **kwargs):
+        headers = {**kwargs.pop("headers", {}), header: "1"}
+        response = client.request(method, url, headers=headers, **kwargs)
+        summary = parse_summary(response.headers[header])
+        assert summary["queries"] <= max_queries, f"{method} {url}: {response.headers[header]}"
+        assert summary["repeated"] <= max_repeated, f"{method} {url}: {response.headers[header]}"
+        return response
+
+    return request
@@ -1,16 +1,23 @@
+from datetime import timedelta
+
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock
 from sqlalchemy.orm import Session
 
+from src.config import ACCESS_TOKEN_TYPE, REFRESH_TOKEN_TYPE
 from src.database.models import UserORM
+from src.services.auth import create_verify_token
+from src.utils.auth import create_jwt, decode_jwt
 
 
 def test_signup_user(client, user, monkeypatch):
-    mock_send_email = MagicMock()
+    mock_send_email = AsyncMock()
     monkeypatch.setattr("src.services.email.send_email", mock_send_email)
 
     response = client.post("/auth/signup", json=user)
     assert response.status_code == 201, response.text
+    mock_send_email.assert_awaited_once()
+    assert mock_send_email.await_args.args[0].email == user["email"]
 
 
 def test_signup_user_conflict(client, user):
@@ -62,7 +69,7 @@ def test_login_wrong_email(client, user):
 
 
 def test_request_verify_email(client, user, monkeypatch):
-    mock_send_email = MagicMock()
+    mock_send_email = AsyncMock()
     monkeypatch.setattr("src.services.email.send_email", mock_send_email)
 
     response = client.post("/auth/verify_email", json={"email": user["email"]})
@@ -78,3 +85,162 @@ def test_request_verify_email_already_confirmed(client, session, user):
     response = client.post("/auth/verify_email", json={"email": user["email"]})
     assert response.status_code == 200
     assert response.json()["message"] == "Your email is already confirmed."
+
+
+def login(client, user):
+    response = client.post(
+        "/auth/login",
+        data={"username": user["email"], "password": user["password"]},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_refresh_rotates_token(client, user):
+    tokens = login(client, user)
+
+    response = client.post(
+        "/auth/refresh",
+        headers={"Authorization": f"Bearer {tokens['refresh_token']}"},
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["access_token"]
+    assert data["refresh_token"] != tokens["refresh_token"]
+
+    response = client.post(
+        "/auth/refresh",
+        headers={"Authorization": f"Bearer {data['refresh_token']}"},
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_refresh_token_reuse_revokes_session(client, user):
+    tokens = login(client, user)
+    old = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+
+    rotated = client.post("/auth/refresh", headers=old).json()
+    response = client.post("/auth/refresh", headers=old)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid refresh token."
+
+    response = client.post(
+        "/auth/refresh",
+        headers={"Authorization": f"Bearer {rotated['refresh_token']}"},
+    )
+    assert response.status_code == 401
+
+
+def test_sessions_are_per_device(client, user):
+    phone, laptop = login(client, user), login(client, user)
+
+    response = client.post(
+        "/auth/logout",
+        headers={"Authorization": f"Bearer {phone['access_token']}"},
+    )
+    assert response.status_code == 200
+
+    response = client.post("/auth/refresh", headers={"Authorization": f"Bearer {phone['refresh_token']}"})
+    assert response.status_code == 401
+    response = client.post("/auth/refresh", headers={"Authorization": f"Bearer {laptop['refresh_token']}"})
+    assert response.status_code == 200
+
+
+def test_logout_all_sessions(client, user):
+    phone, laptop = login(client, user), login(client, user)
+
+    response = client.post(
+        "/auth/logout_all",
+        headers={"Authorization": f"Bearer {phone['access_token']}"},
+    )
+    assert response.status_code == 200
+
+    for tokens in (phone, laptop):
+        response = client.post("/auth/refresh", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+        assert response.status_code == 401
+
+
+def legacy_refresh_token(session, user):
+    # Issued before sessions existed: no sid, stored on the users row
+    user_model = session.query(UserORM).filter_by(email=user["email"]).first()
+    token = create_jwt(REFRESH_TOKEN_TYPE, {"sub": user["email"]}, timedelta(days=1))
+    user_model.refresh_token = token
+    session.commit()
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_legacy_refresh_token_is_exchanged_once(client, session: Session, user):
+    legacy = legacy_refresh_token(session, user)
+
+    response = client.post("/auth/refresh", headers=legacy)
+    assert response.status_code == 200, response.text
+    response = client.post("/auth/refresh", headers=legacy)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid refresh token."
+
+
+def test_logout_all_revokes_legacy_refresh_token(client, session: Session, user):
+    legacy = legacy_refresh_token(session, user)
+    tokens = login(client, user)
+
+    client.post("/auth/logout_all", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    response = client.post("/auth/refresh", headers=legacy)
+    assert response.status_code == 401
+
+
+def test_login_does_not_write_user_row(client, session: Session, user):
+    login(client, user)
+    user_model = session.query(UserORM).filter_by(email=user["email"]).first()
+    session.refresh(user_model)
+    assert user_model.refresh_token is None
+
+
+def test_logout_revokes_access_token(client, user):
+    phone, laptop = login(client, user), login(client, user)
+
+    client.post("/auth/logout", headers={"Authorization": f"Bearer {phone['access_token']}"})
+
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {phone['access_token']}"})
+    assert response.status_code == 401
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {laptop['access_token']}"})
+    assert response.status_code == 200
+
+
+def test_logout_all_revokes_access_tokens(client, user):
+    phone, laptop = login(client, user), login(client, user)
+
+    client.post("/auth/logout_all", headers={"Authorization": f"Bearer {laptop['access_token']}"})
+
+    for tokens in (phone, laptop):
+        response = client.get("/users/me", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+        assert response.status_code == 401
+
+
+def test_tokens_carry_user_id(client, session: Session, user):
+    tokens = login(client, user)
+    user_model = session.query(UserORM).filter_by(email=user["email"]).first()
+
+    payload = decode_jwt(tokens["access_token"])
+    assert payload["sub"] == str(user_model.id)
+
+
+def test_email_subject_access_token_still_accepted(client, user):
+    token = create_jwt(ACCESS_TOKEN_TYPE, {"sub": user["email"]})
+
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] == user["email"]
+
+
+def test_confirmed_email(client, session: Session):
+    session.add(UserORM(email="confirm@example.com", hashed_password="-", first_name="Confirm"))
+    session.commit()
+    url = f"/auth/confirmed_email/{create_verify_token(UserORM(email='confirm@example.com'))}"
+
+    response = client.get(url)
+    assert response.json() == {"message": "Email confirmed."}
+    response = client.get(url)
+    assert response.json() == {"message": "Your email is already confirmed."}
+
+    response = client.get(f"/auth/confirmed_email/{create_verify_token(UserORM(email='gone@example.com'))}")
+    assert response.status_code == 401
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from main import app
+from src.database.models import UserORM
+from src.database.redis import get_redis
+from src.services.auth import create_access_token
+
+
+@pytest.fixture(scope="module")
+def headers(client, session):
+    user_model = UserORM(email="sync@example.com", hashed_password="-", first_name="Sync", confirmed=True)
+    session.add(user_model)
+    session.commit()
+    return {"Authorization": f"Bearer {create_access_token(str(user_model.id))}"}
+
+
+def create_contacts(client, headers, *phones):
+    for phone in phones:
+        response = client.post("/contacts", headers=headers, json={"first_name": "A", "last_name": "B", "phone": phone})
+        assert response.status_code == 201, response.text
+
+
+def test_changes_full_sync_is_paginated(client, headers):
+    create_contacts(client, headers, "100", "101", "102")
+
+    response = client.get("/contacts/changes", headers=headers, params={"limit": 2})
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert [contact["phone"] for contact in page["changed"]] == ["100", "101"]
+    assert page["has_more"] is True
+
+    response = client.get("/contacts/changes", headers=headers, params={"since": page["cursor"], "limit": 2})
+    page = response.json()
+    assert [contact["phone"] for contact in page["changed"]] == ["102"]
+    assert page["has_more"] is False
+
+
+def test_changes_since_cursor(client, headers):
+    cursor = client.get("/contacts/changes", headers=headers).json()["cursor"]
+    contacts = client.get("/contacts", headers=headers).json()
+
+    client.patch(f"/contacts/{contacts[0]['id']}", headers=headers, json={"birth_date": "2000-01-01"})
+    client.delete(f"/contacts/{contacts[1]['id']}", headers=headers)
+
+    response = client.get("/contacts/changes", headers=headers, params={"since": cursor})
+    page = response.json()
+    assert [contact["id"] for contact in page["changed"]] == [contacts[0]["id"]]
+    assert page["changed"][0]["version"] == cursor + 1
+    assert page["deleted"] == [contacts[1]["id"]]
+    assert page["cursor"] == cursor + 2
+
+    page = client.get("/contacts/changes", headers=headers, params={"since": page["cursor"]}).json()
+    assert page == {"changed": [], "deleted": [], "cursor": cursor + 2, "has_more": False}
+
+
+def test_autocomplete(client, headers):
+    response = client.get("/contacts/autocomplete", headers=headers, params={"prefix": "+10"})
+    assert response.status_code == 200, response.text
+    assert [contact["phone"] for contact in response.json()] == ["100", "102"]
+
+    response = client.get("/contacts/autocomplete", headers=headers, params={"prefix": "a b"})
+    assert len(response.json()) == 2
+
+
+def test_sparse_fieldset(client, headers):
+    response = client.get("/contacts", headers=headers, params={"fields": "phone,first_name"})
+    assert response.status_code == 200, response.text
+    assert response.json() == [
+        {"id": contact["id"], "first_name": "A", "phone": contact["phone"]}
+        for contact in client.get("/contacts", headers=headers).json()
+    ]
+
+    contact_id = response.json()[0]["id"]
+    response = client.get(f"/contacts/{contact_id}", headers=headers, params={"fields": "extra"})
+    assert response.json() == {"id": contact_id, "extra": None}
+
+    response = client.get("/contacts", headers=headers, params={"fields": "phone,password"})
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Unknown fields: password."
+
+
+def test_stats(client, headers, session):
+    response = client.get("/contacts/stats", headers=headers)
+    assert response.status_code == 200, response.text
+    stats = response.json()
+    contacts = client.get("/contacts", headers=headers).json()
+    assert stats["total"] == len(contacts)
+    assert stats["with_last_name"] == len(contacts)
+    assert stats["with_birth_date"] == sum(contact["birth_date"] is not None for contact in contacts)
+    assert stats["birthdays_by_month"]["1"] == stats["with_birth_date"]
+    assert 0 < stats["completeness"] < 1
+
+
+def test_legacy_user_cache_entry_is_ignored(client, headers, session):
+    # Releases before the versioned key cached users as plain strings
+    user_model = session.query(UserORM).filter_by(email="sync@example.com").one()
+    r = app.dependency_overrides[get_redis]()
+    asyncio.run(r.set(f"user:{user_model.id}", b"legacy", ex=900))
+
+    response = client.get("/users/me", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] == "sync@example.com"
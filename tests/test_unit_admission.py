@@ -0,0 +1,103 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+
+from src.middleware.admission import AdmissionControlMiddleware, AdmissionController, classify
+from src.settings import AdmissionClass, AdmissionSettings
+
+
+def settings(max_concurrent=2, **limits):
+    return AdmissionSettings(max_concurrent=max_concurrent, classes={
+        "read": AdmissionClass(priority=0, limit=limits.get("read", 2), queue_size=2, timeout_seconds=0.2),
+        "write": AdmissionClass(priority=1, limit=limits.get("write", 1), queue_size=1, timeout_seconds=0.2),
+    })
+
+
+class TestClassify(unittest.TestCase):
+
+    def test_classify(self):
+        self.assertEqual(classify("POST", "/auth/login"), "auth")
+        self.assertEqual(classify("PATCH", "/users/avatar"), "upload")
+        self.assertEqual(classify("GET", "/contacts"), "read")
+        self.assertEqual(classify("DELETE", "/contacts/1"), "write")
+        self.assertIsNone(classify("GET", "/contacts/events"))
+        self.assertIsNone(classify("GET", "/metrics"))
+
+
+class TestAdmissionController(unittest.IsolatedAsyncioTestCase):
+
+    async def test_class_limit_and_queue(self):
+        controller = AdmissionController(settings(write=1))
+        self.assertIsNone(await controller.acquire("write"))
+
+        waiting = asyncio.create_task(controller.acquire("write"))
+        await asyncio.sleep(0)
+        self.assertEqual(controller.queued["write"], 1)
+        self.assertEqual(await controller.acquire("write"), "queue_full")
+
+        controller.release("write")
+        self.assertIsNone(await waiting)
+        self.assertEqual(controller.active["write"], 1)
+        self.assertEqual(controller.queued["write"], 0)
+
+    async def test_waiting_past_the_deadline_is_shed(self):
+        controller = AdmissionController(settings(write=1))
+        await controller.acquire("write")
+        self.assertEqual(await controller.acquire("write"), "timeout")
+        self.assertEqual(controller.waiters, [])
+
+    async def test_admitted_as_the_deadline_passes(self):
+        controller = AdmissionController(settings(write=1))
+        await controller.acquire("write")
+
+        async def admitted_then_timed_out(future, timeout):
+            # release() resolves the waiter on the same tick the timeout fires
+            controller.release("write")
+            raise asyncio.TimeoutError
+
+        with patch("src.middleware.admission.asyncio.wait_for", admitted_then_timed_out):
+            self.assertIsNone(await controller.acquire("write"))
+        self.assertEqual(controller.active["write"], 1)
+        controller.release("write")
+        self.assertEqual((controller.active["write"], controller.total), (0, 0))
+
+    async def test_reads_go_first(self):
+        controller = AdmissionController(settings(max_concurrent=1))
+        await controller.acquire("write")
+        write = asyncio.create_task(controller.acquire("write"))
+        await asyncio.sleep(0)
+        read = asyncio.create_task(controller.acquire("read"))
+        await asyncio.sleep(0)
+
+        controller.release("write")
+        self.assertIsNone(await read)
+        self.assertFalse(write.done())
+        controller.release("read")
+        self.assertIsNone(await write)
+
+
+class TestAdmissionControlMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    async def test_overload_is_shed_with_retry_after(self):
+        app = FastAPI()
+        release = asyncio.Event()
+
+        @app.post("/slow")
+        async def slow():
+            await release.wait()
+            return {"ok": True}
+
+        app.add_middleware(AdmissionControlMiddleware, settings=settings(write=1))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            requests = [asyncio.create_task(client.post("/slow")) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            release.set()
+            responses = await asyncio.gather(*requests)
+
+        self.assertEqual(sorted(response.status_code for response in responses), [200, 200, 503])
+        [shed] = [response for response in responses if response.status_code == 503]
+        self.assertEqual(shed.headers["retry-after"], "1")
@@ -0,0 +1,88 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from fakeredis import FakeAsyncRedis
+from fastapi import HTTPException
+
+from src.services import auth as auth_service
+from src.services.auth_throttle import AuthThrottler
+from src.services.rate_limit import RateLimiterEngine
+from src.settings import AuthThrottleSettings, RateLimit, RateLimitSettings
+
+
+class TestAuthThrottler(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        redis = FakeAsyncRedis()
+        engine = RateLimiterEngine(RateLimitSettings(lease_fraction=0.0))
+        engine.init(redis)
+        self.config = AuthThrottleSettings(
+            ip_limit=RateLimit(times=20, seconds=60),
+            account_limit=RateLimit(times=100, seconds=60),
+            costs={"login": 10},
+            failures_before_backoff=2,
+        )
+        self.throttle = AuthThrottler(self.config, engine)
+        self.throttle.init(redis)
+
+    async def test_ip_budget_is_weighted_by_cost(self):
+        await self.throttle.check("login", "10.0.0.1", "a@example.com")
+        await self.throttle.check("login", "10.0.0.1", "b@example.com")
+        with self.assertRaises(HTTPException) as ctx:
+            await self.throttle.check("login", "10.0.0.1", "c@example.com")
+        self.assertEqual(ctx.exception.status_code, 429)
+        await self.throttle.check("login", "10.0.0.2", "c@example.com")
+
+    def test_backoff_grows_exponentially(self):
+        self.assertEqual(self.throttle.backoff_seconds(1), 0)
+        self.assertEqual(self.throttle.backoff_seconds(2), 1)
+        self.assertEqual(self.throttle.backoff_seconds(4), 4)
+        self.assertEqual(self.throttle.backoff_seconds(100), self.config.backoff_max_seconds)
+
+    async def test_failed_logins_lock_account(self):
+        await self.throttle.login_failed("a@example.com")
+        await self.throttle.check("login", "10.0.0.1", "a@example.com")
+        await self.throttle.login_failed("a@example.com")
+        with self.assertRaises(HTTPException) as ctx:
+            await self.throttle.check("login", "10.0.0.2", "a@example.com")
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertIn("Retry-After", ctx.exception.headers)
+
+    async def test_successful_login_clears_backoff(self):
+        for _ in range(3):
+            await self.throttle.login_failed("a@example.com")
+        await self.throttle.login_succeeded("a@example.com")
+        await self.throttle.check("login", "10.0.0.1", "a@example.com")
+
+
+class TestHashConcurrency(unittest.IsolatedAsyncioTestCase):
+
+    async def test_hash_queue_timeout(self):
+        with patch.object(auth_service, "hash_semaphore", asyncio.Semaphore(0)), \
+                patch.object(auth_service.settings.auth_throttle, "hash_queue_timeout", 0.01):
+            with self.assertRaises(HTTPException) as ctx:
+                await auth_service.hash_password_async("secret")
+        self.assertEqual(ctx.exception.status_code, 503)
+
+    async def test_hash_slots_are_always_released(self):
+        semaphore = asyncio.Semaphore(1)
+        with patch.object(auth_service, "hash_semaphore", semaphore), \
+                patch.object(auth_service.settings.auth_throttle, "hash_queue_timeout", 0.005), \
+                patch.object(auth_service, "hash_password", lambda password: time.sleep(0.002) or password):
+            results = await asyncio.gather(
+                *(auth_service.hash_password_async("secret") for _ in range(20)), return_exceptions=True,
+            )
+        self.assertIn("secret", results)
+        self.assertTrue(any(isinstance(result, HTTPException) for result in results))
+        self.assertFalse(semaphore.locked())
+
+    async def test_verify_password_async(self):
+        hashed = auth_service.hash_password("secret")
+        self.assertTrue(await auth_service.verify_password_async("secret", hashed))
+        self.assertFalse(await auth_service.verify_password_async("wrong", hashed))
+
+
+if __name__ == "__main__":
+    unittest.main()
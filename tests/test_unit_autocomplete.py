@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fakeredis import FakeAsyncRedis
+from redis.exceptions import ConnectionError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.database.models import Base, ContactORM
+from src.services.autocomplete import AutocompleteIndex, index_entry, normalize_prefix, terms
+from src.settings import AutocompleteSettings
+
+
+def contact(contact_id, first_name, last_name, phone, email=None):
+    return ContactORM(id=contact_id, first_name=first_name, last_name=last_name, phone=phone, email=email)
+
+
+class TestTerms(unittest.TestCase):
+
+    def test_terms_are_normalised(self):
+        self.assertEqual(
+            terms(contact(1, "Zoë", "O'Brien", "+380 (67) 123-45-67", "Zoe@Mail.io")),
+            {"zoe", "o brien", "zoe o brien", "zoe@mail.io", "380671234567"},
+        )
+
+    def test_phone_like_prefix_keeps_digits(self):
+        self.assertEqual(normalize_prefix("+38 (067"), "38067")
+        self.assertEqual(normalize_prefix("ÉMI"), "emi")
+
+
+class TestAutocompleteIndex(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeAsyncRedis()
+        patcher = patch("src.database.redis.redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = AutocompleteIndex(AutocompleteSettings())
+        self.db = MagicMock()
+        await self.index.rebuild(self.redis, 1, [
+            contact(1, "Anna", "Smith", "111", "anna@mail.io"),
+            contact(2, "Andrew", "Anderson", "222"),
+            contact(3, "Bob", "Annis", "333"),
+        ])
+
+    async def search(self, prefix, limit=10, user_id=1):
+        return [suggestion["id"] for suggestion in await self.index.search(self.redis, self.db, user_id, prefix, limit)]
+
+    async def test_prefix_search(self):
+        self.assertEqual(await self.search("an"), [2, 1, 3])
+        self.assertEqual(await self.search("an", limit=1), [2])
+        self.assertEqual(await self.search("bob a"), [3])
+        self.assertEqual(await self.search("22"), [2])
+        self.assertEqual(await self.search("zed"), [])
+
+    async def test_update_replaces_terms(self):
+        old = contact(3, "Bob", "Annis", "333")
+        await self.index.index(1, index_entry(contact(3, "Bob", "Brown", "333")), terms(old))
+        self.assertEqual(await self.search("ann"), [1])
+        self.assertEqual(await self.search("bro"), [3])
+
+    async def test_remove(self):
+        await self.index.remove(1, 1, terms(contact(1, "Anna", "Smith", "111", "anna@mail.io")))
+        self.assertEqual(await self.search("an"), [2, 3])
+
+    async def test_missing_index_is_rebuilt_from_db(self):
+        self.db.scalars().all.return_value = [contact(9, "Carl", "Doe", "999")]
+        self.assertEqual(await self.search("car", user_id=2), [9])
+        self.db.scalars().all.return_value = []
+        self.assertEqual(await self.search("car", user_id=2), [9])
+
+    async def test_redis_failure_falls_back_to_the_db(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.addCleanup(engine.dispose)
+        with Session(engine) as db:
+            db.add_all([
+                ContactORM(user_id=1, first_name="Anna", last_name="Smith", phone="+380671112233", email="x@mail.io"),
+                ContactORM(user_id=1, first_name="Bob", last_name="Annis", phone="222", email="Ann_B@Mail.io"),
+                ContactORM(user_id=2, first_name="Annet", phone="333"),
+            ])
+            db.commit()
+
+            with patch.object(self.redis, "eval", AsyncMock(side_effect=ConnectionError())):
+                suggestions = await self.index.search(self.redis, db, 1, "An", 10)
+                self.assertEqual([suggestion["first_name"] for suggestion in suggestions], ["Anna", "Bob"])
+                self.assertEqual(len(await self.index.search(self.redis, db, 1, "an", 1)), 1)
+                self.assertEqual(len(await self.index.search(self.redis, db, 1, "ann_", 10)), 1)
+                self.assertEqual(len(await self.index.search(self.redis, db, 1, "3806711", 10)), 1)
@@ -0,0 +1,88 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.middleware.compression import CompressionMiddleware, choose_encoding, compression_saved_bytes
+from src.middleware.negotiation import ContentNegotiationMiddleware
+from src.settings import CompressionSettings
+from src.utils.responses import NegotiatedResponse, negotiate
+
+brotli = pytest.importorskip("brotli")
+msgpack = pytest.importorskip("msgpack")
+zstandard = pytest.importorskip("zstandard")
+
+AVAILABLE = {"zstd": None, "br": None, "gzip": None}
+ROWS = [{"id": i, "first_name": "Name", "phone": f"+38067{i:07d}"} for i in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI(default_response_class=NegotiatedResponse)
+
+    @app.get("/rows")
+    async def rows():
+        return ROWS
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"a" * 2000, b"b" * 2000]), media_type="text/plain")
+
+    app.add_middleware(ContentNegotiationMiddleware)
+    app.add_middleware(CompressionMiddleware, settings=CompressionSettings(min_size=100, offload_size=4096))
+    return TestClient(app)
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, br, zstd", AVAILABLE) == "zstd"
+    assert choose_encoding("gzip, br;q=0.5", AVAILABLE) == "gzip"
+    assert choose_encoding("*;q=0.1, gzip;q=0", AVAILABLE) == "zstd"
+    assert choose_encoding("identity", AVAILABLE) is None
+    assert choose_encoding(None, AVAILABLE) is None
+
+
+def test_negotiate():
+    assert negotiate("application/msgpack") == "application/msgpack"
+    assert negotiate("application/json, application/msgpack") == "application/json"
+    assert negotiate("application/json;q=0.5, application/x-msgpack") == "application/msgpack"
+    assert negotiate("*/*") == "application/json"
+    assert negotiate(None) == "application/json"
+
+
+@pytest.mark.parametrize("encoding, decompress", [
+    ("gzip", gzip.decompress),
+    ("br", brotli.decompress),
+    ("zstd", lambda body: zstandard.ZstdDecompressor().decompressobj().decompress(body)),
+])
+def test_compresses_json(client, encoding, decompress):
+    saved_before = compression_saved_bytes.values.get((encoding,), 0)
+    with client.stream("GET", "/rows", headers={"Accept-Encoding": encoding}) as response:
+        raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == encoding
+        assert response.headers["vary"] == "Accept, Accept-Encoding"
+        assert int(response.headers["content-length"]) == len(raw)
+    body = decompress(raw)
+    assert body.startswith(b'[{"id":0')
+    assert compression_saved_bytes.values[(encoding,)] - saved_before == len(body) - len(raw)
+
+
+def test_msgpack_body(client):
+    response = client.get("/rows", headers={"Accept": "application/msgpack", "Accept-Encoding": "gzip"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == ROWS
+
+
+def test_small_and_streamed_bodies_are_not_compressed(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert len(response.content) == 4000
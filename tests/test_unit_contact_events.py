@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fakeredis import FakeAsyncRedis
+from redis.exceptions import ConnectionError
+
+from src.services.contact_events import ContactEventHub
+from src.settings import ContactEventSettings
+
+
+class TestContactEventHub(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeAsyncRedis()
+        patcher = patch("src.database.redis.redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hub = ContactEventHub(ContactEventSettings(heartbeat_seconds=0.05, queue_size=10))
+        self.dispatcher = asyncio.create_task(self.hub.run(self.redis))
+        await asyncio.sleep(0.05)
+
+    async def asyncTearDown(self):
+        self.dispatcher.cancel()
+        await asyncio.gather(self.dispatcher, return_exceptions=True)
+
+    async def test_streams_published_events_to_the_user(self):
+        stream = self.hub.stream(self.redis, user_id=1)
+        self.assertTrue((await anext(stream)).startswith("retry:"))
+        await self.hub.publish(2, {"type": "deleted", "id": 9, "version": 1})
+        await self.hub.publish(1, {"type": "deleted", "id": 7, "version": 3})
+
+        event = await anext(stream)
+        self.assertIn("event: contact\nid: ", event)
+        self.assertIn('data: {"type":"deleted","id":7,"version":3}', event)
+        await stream.aclose()
+        self.assertEqual(self.hub.subscribers, {})
+
+    async def test_malformed_message_does_not_end_the_subscription(self):
+        stream = self.hub.stream(self.redis, user_id=1)
+        await anext(stream)
+        for message in ("garbage", "x|1-0|{}", b"\xff"):
+            await self.redis.publish("contacts:events", message)
+        await self.hub.publish(1, {"type": "deleted", "id": 7, "version": 3})
+
+        self.assertIn('"version":3', await anext(stream))
+        self.assertFalse(self.dispatcher.done())
+        await stream.aclose()
+
+    async def test_heartbeat(self):
+        stream = self.hub.stream(self.redis, user_id=1)
+        await anext(stream)
+        self.assertEqual(await anext(stream), ": heartbeat\n\n")
+        await stream.aclose()
+
+    async def test_resumes_after_last_event_id(self):
+        for version in (1, 2, 3):
+            await self.hub.publish(1, {"type": "deleted", "id": version, "version": version})
+        first_id = (await self.redis.xrange("contacts:events:1"))[0][0].decode()
+
+        stream = self.hub.stream(self.redis, user_id=1, last_event_id=first_id)
+        await anext(stream)
+        replayed = [await anext(stream), await anext(stream)]
+        self.assertIn('"version":2', replayed[0])
+        self.assertIn('"version":3', replayed[1])
+        # The same events arriving live are skipped
+        self.assertEqual(await anext(stream), ": heartbeat\n\n")
+        await stream.aclose()
+
+    async def test_resume_past_trimmed_events_resets(self):
+        for version in (1, 2, 3):
+            await self.hub.publish(1, {"type": "deleted", "id": version, "version": version})
+        first_id = (await self.redis.xrange("contacts:events:1"))[0][0].decode()
+        await self.redis.xtrim("contacts:events:1", maxlen=1, approximate=False)
+        await asyncio.sleep(0.05)
+
+        stream = self.hub.stream(self.redis, user_id=1, last_event_id=first_id)
+        await anext(stream)
+        self.assertEqual(
+            await anext(stream),
+            'event: reset\ndata: {"type":"reset","changes":"/contacts/changes"}\n\n',
+        )
+        await self.hub.publish(1, {"type": "deleted", "id": 4, "version": 4})
+        self.assertIn('"version":4', await anext(stream))
+        await stream.aclose()
+
+    async def test_replay_failure_resets_and_streams_live_events(self):
+        await self.hub.publish(1, {"type": "deleted", "id": 1, "version": 1})
+        first_id = (await self.redis.xrange("contacts:events:1"))[0][0].decode()
+        await asyncio.sleep(0.05)
+
+        with patch.object(self.redis, "xrange", AsyncMock(side_effect=ConnectionError())):
+            stream = self.hub.stream(self.redis, user_id=1, last_event_id=first_id)
+            await anext(stream)
+            self.assertTrue((await anext(stream)).startswith("event: reset\n"))
+        await self.hub.publish(1, {"type": "deleted", "id": 2, "version": 2})
+        self.assertIn('"version":2', await anext(stream))
+        await stream.aclose()
+
+    async def test_slow_stream_is_closed(self):
+        self.hub.config.queue_size = 2
+        stream = self.hub.stream(self.redis, user_id=1)
+        await anext(stream)
+        queue = next(iter(self.hub.subscribers[1]))
+        for version in range(3):
+            self.hub.dispatch(f"1|{version + 1}-0|{{}}")
+        self.assertNotIn(1, self.hub.subscribers)
+        events = [event async for event in stream]
+        self.assertEqual(len(events), 1)
+        self.assertTrue(queue.empty())
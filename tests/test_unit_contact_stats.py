@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fakeredis import FakeAsyncRedis
+
+from src.services.contact_stats import ContactStatsCache
+from src.settings import ContactSettings
+
+
+class TestContactStatsCache(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeAsyncRedis()
+        patcher = patch("src.database.redis.redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = ContactStatsCache(ContactSettings())
+
+    async def test_stats_are_cached(self):
+        compute = AsyncMock(return_value=({"total": 2}, 5))
+        self.assertEqual(await self.cache.get(self.redis, 1, compute), {"total": 2})
+        self.assertEqual(await self.cache.get(self.redis, 1, compute), {"total": 2})
+        compute.assert_awaited_once()
+        self.assertGreater(await self.redis.ttl("contacts:stats:1"), 0)
+
+    async def test_change_invalidates(self):
+        await self.cache.get(self.redis, 1, AsyncMock(return_value=({"total": 2}, 5)))
+        await self.cache.invalidate(1, 6)
+
+        compute = AsyncMock(return_value=({"total": 3}, 6))
+        self.assertEqual(await self.cache.get(self.redis, 1, compute), {"total": 3})
+        compute.assert_awaited_once()
+
+    async def test_stale_stats_are_not_cached(self):
+        # Computed before a change that committed in the meantime
+        await self.cache.invalidate(1, 6)
+        self.assertEqual(await self.cache.get(self.redis, 1, AsyncMock(return_value=({"total": 2}, 5))), {"total": 2})
+        self.assertIsNone(await self.redis.hget("contacts:stats:1", "stats"))
+
+        # A late invalidation does not lower the recorded version
+        await self.cache.invalidate(1, 4)
+        await self.cache.get(self.redis, 1, AsyncMock(return_value=({"total": 2}, 5)))
+        self.assertIsNone(await self.redis.hget("contacts:stats:1", "stats"))
+
+    async def test_without_redis_client_invalidate_is_a_no_op(self):
+        with patch("src.database.redis.redis_client", None):
+            await self.cache.invalidate(1, 6)
+        self.assertFalse(await self.redis.exists("contacts:stats:1"))
+
+    async def test_concurrent_misses_share_one_query(self):
+        async def query():
+            await asyncio.sleep(0.01)
+            return {"total": 2}, 5
+
+        compute = AsyncMock(side_effect=query)
+        results = await asyncio.gather(*(self.cache.get(self.redis, 1, compute) for _ in range(3)))
+        self.assertEqual(results, [{"total": 2}] * 3)
+        compute.assert_awaited_once()
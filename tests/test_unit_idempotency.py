@@ -0,0 +1,111 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+import httpx
+from fakeredis import FakeAsyncRedis
+from fastapi import FastAPI, HTTPException, Request
+
+from src.middleware.idempotency import IdempotencyMiddleware
+from src.services.auth import create_access_token
+from src.settings import IdempotencySettings
+
+
+class TestIdempotencyMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeAsyncRedis()
+        patcher = patch("src.database.redis.redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        app = FastAPI()
+        self.calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+        self.revoked = set()
+
+        @app.post("/contacts", status_code=201)
+        async def create(body: dict, request: Request):
+            if request.headers["authorization"] in self.revoked:
+                raise HTTPException(status_code=401, detail="Could not validate credentials.")
+            self.calls.append(body)
+            await self.release.wait()
+            if body.get("fail"):
+                raise HTTPException(status_code=500, detail="boom")
+            return {"id": len(self.calls)}
+
+        app.add_middleware(IdempotencyMiddleware, settings=IdempotencySettings(wait_seconds=1, poll_ms=5))
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        self.addAsyncCleanup(self.client.aclose)
+
+    async def post(self, key="k1", body=None, subject="1", accept="application/json", token=None):
+        token = token or create_access_token(subject)
+        headers = {"Authorization": f"Bearer {token}", "Accept": accept}
+        if key is not None:
+            headers["Idempotency-Key"] = key
+        return await self.client.post("/contacts", json=body or {"phone": "1"}, headers=headers)
+
+    async def test_retry_replays_the_first_response(self):
+        first = await self.post()
+        retry = await self.post()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.status_code, retry.json()), (201, {"id": 1}))
+        self.assertEqual(retry.headers["idempotent-replayed"], "true")
+        self.assertEqual(len(self.calls), 1)
+        self.assertGreater(await self.redis.ttl(next(iter(await self.redis.keys("idempotency:*")))), 0)
+
+    async def test_concurrent_duplicates_wait_for_the_first(self):
+        self.release.clear()
+        requests = [asyncio.create_task(self.post()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        self.release.set()
+        responses = await asyncio.gather(*requests)
+        self.assertEqual([response.json() for response in responses], [{"id": 1}] * 3)
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_key_is_scoped_to_the_request_and_user(self):
+        await self.post()
+        self.assertEqual((await self.post(body={"phone": "2"})).status_code, 422)
+        self.assertEqual((await self.post(accept="application/msgpack")).status_code, 422)
+        self.assertEqual((await self.post(subject="2")).json(), {"id": 2})
+        self.assertEqual((await self.post(key=None)).json(), {"id": 3})
+
+    async def test_retry_with_a_new_token_replays(self):
+        await self.post(token=create_access_token("1", sid="a"))
+        retry = await self.post(token=create_access_token("1", sid="b"))
+        self.assertEqual(retry.headers["idempotent-replayed"], "true")
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_retry_after_refreshing_a_revoked_token_runs(self):
+        revoked = create_access_token("1", sid="a")
+        self.revoked.add(f"Bearer {revoked}")
+        self.assertEqual((await self.post(token=revoked)).status_code, 401)
+        self.assertEqual(await self.redis.keys("idempotency:*"), [])
+
+        retry = await self.post(token=create_access_token("1", sid="b"))
+        self.assertEqual((retry.status_code, retry.json()), (201, {"id": 1}))
+        self.assertNotIn("idempotent-replayed", retry.headers)
+
+    async def test_requests_without_a_valid_token_are_not_stored(self):
+        self.assertEqual((await self.post(token="invalid")).json(), {"id": 1})
+        self.assertEqual((await self.post(token="invalid")).json(), {"id": 2})
+        self.assertEqual(await self.redis.keys("idempotency:*"), [])
+
+    async def test_server_errors_are_not_stored(self):
+        self.assertEqual((await self.post(body={"fail": True})).status_code, 500)
+        self.assertEqual(await self.redis.keys("idempotency:*"), [])
+        self.assertEqual((await self.post(body={"fail": True})).status_code, 500)
+        self.assertEqual(len(self.calls), 2)
+
+    async def test_request_running_in_another_process(self):
+        await self.post()
+        [key] = await self.redis.keys("idempotency:*")
+        record = json.loads(await self.redis.get(key))
+        await self.redis.set(key, json.dumps({"state": "pending", "request": record["request"], "token": "t"}))
+
+        response = await self.post()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.headers["retry-after"], "1")
+        self.assertEqual(len(self.calls), 1)
@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fakeredis import FakeAsyncRedis
+from fastapi import BackgroundTasks
+from pydantic import BaseModel
+
+from src.services.jobs import JobQueue
+from src.settings import JobSettings
+
+
+class Payload(BaseModel):
+    value: int
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeAsyncRedis()
+        patcher = patch("src.database.redis.redis_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = JobQueue(JobSettings(max_attempts=2, backoff_base_seconds=0, block_ms=10))
+        self.handler = AsyncMock()
+        self.queue.handler("test", Payload)(self.handler)
+        await self.queue.ensure_group(self.redis)
+
+    async def work(self):
+        # One pass over the queued jobs
+        response = await self.redis.xreadgroup("workers", "w1", {"jobs": ">"}, count=10)
+        for entry_id, fields in (response[0][1] if response else []):
+            await self.queue.process(self.redis, entry_id.decode(), fields)
+
+    async def test_job_runs_once_and_is_acknowledged(self):
+        await self.queue.enqueue("test", Payload(value=1))
+        await self.work()
+        self.handler.assert_awaited_once_with(Payload(value=1))
+        self.assertEqual((await self.redis.xpending("jobs", "workers"))["pending"], 0)
+
+    async def test_failed_job_is_retried_then_dead_lettered(self):
+        self.handler.side_effect = RuntimeError("boom")
+        await self.queue.enqueue("test", Payload(value=1))
+        await self.work()
+        self.assertEqual((await self.redis.xpending("jobs", "workers"))["pending"], 0)
+        self.assertEqual(await self.redis.zcard("jobs:delayed"), 1)
+
+        self.assertEqual(await self.queue.promote(self.redis), 1)
+        await self.work()
+        self.assertEqual(self.handler.await_count, 2)
+        self.assertEqual(await self.redis.zcard("jobs:delayed"), 0)
+        [(_, dead)] = await self.redis.xrange("jobs:dead")
+        self.assertEqual(dead[b"attempt"], b"2")
+        self.assertIn(b"boom", dead[b"error"])
+
+    async def test_jobs_of_a_dead_worker_are_taken_over(self):
+        await self.queue.enqueue("test", Payload(value=1))
+        await self.redis.xreadgroup("workers", "dead", {"jobs": ">"}, count=10)
+
+        self.queue.config.claim_idle_ms = 0
+        stop = asyncio.Event()
+        self.handler.side_effect = lambda payload: stop.set()
+        await asyncio.wait_for(self.queue.run_worker(self.redis, "w2", stop), 1)
+        self.handler.assert_awaited_once()
+        self.assertEqual((await self.redis.xpending("jobs", "workers"))["pending"], 0)
+
+    async def test_claimed_jobs_trimmed_from_the_stream_are_acknowledged(self):
+        for value in (1, 2):
+            await self.queue.enqueue("test", Payload(value=value))
+        [(_, [(trimmed, _), _])] = await self.redis.xreadgroup("workers", "dead", {"jobs": ">"}, count=10)
+        await self.redis.xdel("jobs", trimmed)
+        # Redis < 7 keeps the ids of deleted entries pending and claims them too
+        pending = [entry["message_id"] for entry in await self.redis.xpending_range("jobs", "workers", "-", "+", 10)]
+        self.redis.xautoclaim = AsyncMock(side_effect=[pending, []])
+
+        self.queue.config.claim_idle_ms = 0
+        stop = asyncio.Event()
+        self.handler.side_effect = lambda payload: stop.set()
+        await asyncio.wait_for(self.queue.run_worker(self.redis, "w2", stop), 1)
+        self.handler.assert_awaited_once_with(Payload(value=2))
+        self.assertEqual((await self.redis.xpending("jobs", "workers"))["pending"], 0)
+
+    async def test_without_redis_job_runs_in_process(self):
+        tasks = BackgroundTasks()
+        with patch("src.database.redis.redis_client", None):
+            self.assertIsNone(await self.queue.enqueue("test", Payload(value=1), tasks))
+        self.handler.assert_not_awaited()
+        await tasks()
+        self.handler.assert_awaited_once_with(Payload(value=1))
+
+    async def test_unknown_job(self):
+        with self.assertRaises(KeyError):
+            await self.queue.enqueue("missing", Payload(value=1))
@@ -0,0 +1,97 @@
+import importlib.util
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jose import JWTError
+
+from src.utils.jwt_backend import JWTBackend, create_backend
+
+# The pyjwt backend is an optional extra
+HAS_PYJWT = importlib.util.find_spec("jwt") is not None
+requires_pyjwt = pytest.mark.skipif(not HAS_PYJWT, reason="requires the pyjwt extra")
+BACKENDS = ("jose", "pyjwt") if HAS_PYJWT else ("jose",)
+
+SECRET = "0123456789abcdef0123456789abcdef"
+
+
+def pem_pair(private_key) -> tuple[bytes, bytes]:
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return private_pem, public_pem
+
+
+class TestJWTBackends(unittest.TestCase):
+
+    def setUp(self):
+        now = datetime.now(timezone.utc)
+        self.payload = {"sub": "1", "iat": now, "exp": now + timedelta(minutes=5)}
+
+    def test_hmac_round_trip(self):
+        for name in BACKENDS:
+            with self.subTest(backend=name):
+                backend = create_backend(name, "HS256", SECRET)
+                self.assertEqual(backend.decode(backend.encode(self.payload))["sub"], "1")
+                self.assertIsNone(backend.public_jwk())
+
+    @requires_pyjwt
+    def test_backends_are_interchangeable(self):
+        jose_backend = create_backend("jose", "HS256", SECRET)
+        pyjwt_backend = create_backend("pyjwt", "HS256", SECRET)
+        self.assertEqual(pyjwt_backend.decode(jose_backend.encode(self.payload))["sub"], "1")
+        self.assertEqual(jose_backend.decode(pyjwt_backend.encode(self.payload))["sub"], "1")
+
+    def test_es256(self):
+        private_pem, public_pem = pem_pair(ec.generate_private_key(ec.SECP256R1()))
+        for name in BACKENDS:
+            with self.subTest(backend=name):
+                backend = create_backend(name, "ES256", private_pem, public_pem)
+                self.assertEqual(backend.decode(backend.encode(self.payload))["sub"], "1")
+                self.assertEqual(backend.public_jwk()["kty"], "EC")
+
+    @requires_pyjwt
+    def test_eddsa(self):
+        private_pem, public_pem = pem_pair(ed25519.Ed25519PrivateKey.generate())
+        backend = create_backend("pyjwt", "EdDSA", private_pem, public_pem)
+        self.assertEqual(backend.decode(backend.encode(self.payload))["sub"], "1")
+        self.assertEqual(backend.public_jwk()["crv"], "Ed25519")
+
+    def test_jose_rejects_eddsa(self):
+        private_pem, public_pem = pem_pair(ed25519.Ed25519PrivateKey.generate())
+        with self.assertRaises(ValueError):
+            create_backend("jose", "EdDSA", private_pem, public_pem)
+
+    @requires_pyjwt
+    def test_pyjwt_errors_are_jose_errors(self):
+        backend = create_backend("pyjwt", "HS256", SECRET)
+        token = create_backend("pyjwt", "HS256", SECRET[::-1]).encode(self.payload)
+        with self.assertRaises(JWTError):
+            backend.decode(token)
+
+        self.payload["exp"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+        with self.assertRaises(JWTError):
+            backend.decode(backend.encode(self.payload))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_backend("nope", "HS256", SECRET)
+
+    def test_unsupported_algorithm(self):
+        for name in BACKENDS:
+            with self.subTest(backend=name):
+                with self.assertRaises(ValueError):
+                    create_backend(name, "HS999", SECRET)
+
+    def test_backend_methods_are_abstract(self):
+        with self.assertRaises(TypeError):
+            JWTBackend("HS256", SECRET, SECRET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from src.database.models import ContactORM
+from src.utils.normalize import normalize_email, normalize_phone
+
+
+class TestNormalize(unittest.TestCase):
+
+    def test_phone_formats_match(self):
+        self.assertEqual(normalize_phone("+1 (555) 010"), "+1555010")
+        self.assertEqual(normalize_phone("1555010"), "+1555010")
+        self.assertEqual(normalize_phone("001 555 010"), "+1555010")
+
+    def test_national_phone_gets_country_code(self):
+        self.assertEqual(normalize_phone("067 123-45-67", country_code="380"), "+380671234567")
+        self.assertEqual(normalize_phone("067 123-45-67", country_code=""), "+0671234567")
+
+    def test_no_digits(self):
+        self.assertIsNone(normalize_phone("n/a"))
+        self.assertIsNone(normalize_phone(None))
+
+    def test_email(self):
+        self.assertEqual(normalize_email(" John@Example.COM "), "john@example.com")
+        self.assertIsNone(normalize_email(None))
+
+    def test_model_fills_normalized_columns_on_write(self):
+        contact_model = ContactORM(phone="+1 (555) 010", email="A@B.io")
+        self.assertEqual((contact_model.phone_normalized, contact_model.email_normalized), ("+1555010", "a@b.io"))
+        contact_model.phone = "(555) 011"
+        self.assertEqual(contact_model.phone_normalized, "+555011")
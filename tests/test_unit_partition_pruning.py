@@ -0,0 +1,59 @@
+import asyncio
+import re
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from src.database.models import Base, UserORM
+from src.repository import contacts as contacts_repository
+from src.schemas.contacts import ContactBirthDateUpdateSchema, ContactCreateSchema, ContactUpdateSchema
+from src.schemas.filters import FilterParams
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def add_to_char(dbapi_connection, connection_record):
+        dbapi_connection.create_function("to_char", 2, lambda value, fmt: value and value[5:10])
+
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([UserORM(id=1, email="a@b.io", hashed_password="-", first_name="A"),
+                         UserORM(id=2, email="b@b.io", hashed_password="-", first_name="B")])
+        session.commit()
+        yield session
+
+
+def test_contacts_statements_prune_to_user_partition(db):
+    # On Postgres contacts are hash-partitioned by user_id: every statement
+    # touching the table must filter on it to hit a single partition.
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    body = ContactCreateSchema(first_name="Ann", last_name="Lee", phone="123", birth_date=date(2000, 5, 1))
+    for user_id in (1, 2):
+        # Phone uniqueness is per user, so both users may store the same number
+        asyncio.run(contacts_repository.create_contact(db, user_id, body))
+    contact_id = asyncio.run(contacts_repository.get_contacts(db, 1, FilterParams()))[0].id
+
+    asyncio.run(contacts_repository.get_contacts(db, 1, FilterParams(phone="123", last_name="Lee")))
+    asyncio.run(contacts_repository.get_contact_by_id(db, 1, contact_id))
+    asyncio.run(contacts_repository.get_upcoming_birthdays(db, 1, ["05-01"]))
+    update = ContactUpdateSchema(first_name="Ann", last_name="Li", phone="124")
+    asyncio.run(contacts_repository.update_contact(db, 1, contact_id, update))
+    birth_date = ContactBirthDateUpdateSchema(birth_date=date(2000, 5, 2))
+    asyncio.run(contacts_repository.update_birth_date(db, 1, contact_id, birth_date))
+    assert asyncio.run(contacts_repository.delete_contact(db, 1, contact_id)) is not None
+    asyncio.run(contacts_repository.get_changes(db, 1, since=1, limit=10))
+    asyncio.run(contacts_repository.get_stats(db, 1))
+
+    touching = [s for s in statements if re.search(r"\bcontacts\b", s) and not s.startswith("INSERT")]
+    assert {s.split()[0] for s in touching} == {"SELECT", "UPDATE", "DELETE"}
+    for statement in touching:
+        where = statement[statement.index("WHERE"):]
+        assert re.search(r"contacts\.user_id = \?|\buser_id = \?", where), statement
@@ -0,0 +1,96 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+
+from main import app
+from src.database.pool import (
+    TimedQueuePool,
+    checkout_timeouts,
+    checkout_wait,
+    create_pooled_engine,
+    engine_options,
+    warm_up,
+)
+from src.settings import PostgresSettings, settings
+from src.utils.metrics import Metric
+
+
+class TestPool(unittest.TestCase):
+
+    def setUp(self):
+        self.config = PostgresSettings(pool_size=2, max_overflow=0, pool_timeout=0.01)
+        self.engine = create_pooled_engine("sqlite://", self.config, "test")
+        self.addCleanup(self.engine.dispose)
+
+    def test_engine_options(self):
+        self.assertIsInstance(self.engine.pool, TimedQueuePool)
+        self.assertEqual(self.engine.pool.size(), 2)
+
+        options = engine_options(PostgresSettings(statement_timeout_ms=500))
+        self.assertEqual(options["connect_args"], {"options": "-c statement_timeout=500"})
+
+    def test_prepared_statements(self):
+        options = engine_options(PostgresSettings(driver="psycopg", prepare_threshold=2, query_cache_size=50))
+        self.assertEqual(options["connect_args"], {"prepare_threshold": 2})
+        self.assertEqual(options["query_cache_size"], 50)
+
+        engine = create_pooled_engine(
+            "postgresql+psycopg://u:p@localhost/db", PostgresSettings(driver="psycopg"), "test-psycopg",
+        )
+        self.assertEqual(engine.dialect.driver, "psycopg")
+
+    def test_pgbouncer_mode(self):
+        options = engine_options(PostgresSettings(pgbouncer=True, statement_timeout_ms=500, driver="psycopg"))
+        self.assertIs(options["poolclass"], NullPool)
+        self.assertEqual(options["connect_args"], {"prepare_threshold": None})
+
+    def test_warm_up(self):
+        self.assertEqual(warm_up(self.engine, 2), 2)
+        self.assertEqual(self.engine.pool.checkedin(), 2)
+        self.assertEqual(self.engine.pool.checkedout(), 0)
+
+    def test_checkout_wait_and_timeouts(self):
+        waits = checkout_wait.count(pool="test")
+        held = [self.engine.raw_connection() for _ in range(2)]
+        with self.assertRaises(PoolTimeoutError):
+            self.engine.raw_connection()
+        for connection in held:
+            connection.close()
+
+        self.assertEqual(checkout_wait.count(pool="test"), waits + 3)
+        self.assertEqual(checkout_timeouts.values[("test",)], 1)
+
+    def test_checkout_wait_leaves_out_connecting(self):
+        engine = create_pooled_engine("sqlite://", self.config, "test-connect")
+        self.addCleanup(engine.dispose)
+        event.listen(engine, "connect", lambda *args: time.sleep(0.2))
+
+        engine.raw_connection().close()
+        self.assertEqual(checkout_wait.count(pool="test-connect"), 1)
+        self.assertLess(checkout_wait.sums[("test-connect",)], 0.1)
+
+    def test_metric_samples_are_abstract(self):
+        with self.assertRaises(TypeError):
+            Metric("test_metric", "Not a concrete metric.")
+
+    def test_metrics_endpoint(self):
+        warm_up(self.engine, 1)
+        client = TestClient(app)
+        self.assertEqual(client.get("/metrics").status_code, 404)
+
+        with patch.object(settings.metrics, "token", "secret"):
+            self.assertEqual(client.get("/metrics").status_code, 401)
+            self.assertEqual(client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code, 401)
+            response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db_pool_connections{pool="test",state="idle"} 1', response.text)
+        self.assertIn("db_pool_checkout_wait_seconds_bucket", response.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fakeredis import FakeAsyncRedis
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError
+
+from src.database.models import UserORM
+from src.services.rate_limit import RateLimiter, RateLimiterEngine
+from src.settings import DEFAULT_ROUTE_LIMITS, RateLimit, RateLimitSettings
+
+
+class TestRateLimitSettings(unittest.TestCase):
+
+    def test_route_overrides_keep_the_defaults(self):
+        with patch.dict(os.environ, {"RATE_LIMIT_ROUTES": '{"contacts:list": {"times": 50, "seconds": 60}}'}):
+            config = RateLimitSettings()
+        self.assertEqual(config.routes["contacts:list"], RateLimit(times=50, seconds=60))
+        self.assertEqual(config.routes["contacts:birthdays"], DEFAULT_ROUTE_LIMITS["contacts:birthdays"])
+
+
+class TestRateLimiterEngine(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.config = RateLimitSettings(lease_fraction=0.5, tiers={"default": 1.0, "pro": 3.0})
+        self.engine = RateLimiterEngine(self.config)
+        self.engine.init(FakeAsyncRedis())
+        self.limit = RateLimit(times=4, seconds=60)
+
+    async def test_allows_up_to_limit_then_rejects(self):
+        for _ in range(4):
+            self.assertIsNone(await self.engine.hit("rl:test:user:1", self.limit))
+        retry_after = await self.engine.hit("rl:test:user:1", self.limit)
+        self.assertIsNotNone(retry_after)
+        self.assertGreater(retry_after, 0)
+
+    async def test_leases_tokens_in_batches(self):
+        script = AsyncMock(return_value=[2, 0])
+        self.engine._script = script
+        for _ in range(4):
+            self.assertIsNone(await self.engine.hit("rl:test:user:1", self.limit))
+        self.assertEqual(script.await_count, 2)
+
+    async def test_keys_are_independent(self):
+        for _ in range(4):
+            await self.engine.hit("rl:test:user:1", self.limit)
+        self.assertIsNone(await self.engine.hit("rl:test:user:2", self.limit))
+
+    async def test_fail_open(self):
+        self.engine._script = AsyncMock(side_effect=ConnectionError())
+        self.assertIsNone(await self.engine.hit("rl:test:user:1", self.limit))
+
+    async def test_fail_closed(self):
+        self.engine.config = RateLimitSettings(fail_open=False)
+        self.engine._script = AsyncMock(side_effect=ConnectionError())
+        with self.assertRaises(HTTPException) as ctx:
+            await self.engine.hit("rl:test:user:1", self.limit)
+        self.assertEqual(ctx.exception.status_code, 503)
+
+    async def test_disabled_without_redis(self):
+        self.engine.init(None)
+        for _ in range(10):
+            self.assertIsNone(await self.engine.hit("rl:test:user:1", self.limit))
+
+    def test_limit_for_tier(self):
+        self.config.routes["test"] = self.limit
+        self.assertEqual(self.engine.limit_for("test").times, 4)
+        self.assertEqual(self.engine.limit_for("test", "pro").times, 12)
+        self.assertEqual(self.engine.limit_for("test", "unknown").times, 4)
+
+    async def test_dependency_scales_the_limit_by_user_tier(self):
+        self.config.routes["test"] = self.limit
+        dependency = RateLimiter("test")
+        with patch("src.services.rate_limit.limiter", self.engine):
+            for _ in range(12):
+                await dependency(UserORM(id=1, tier="pro"))
+            with self.assertRaises(HTTPException) as ctx:
+                await dependency(UserORM(id=1, tier="pro"))
+            self.assertEqual(ctx.exception.status_code, 429)
+
+            for _ in range(4):
+                await dependency(UserORM(id=2))
+            with self.assertRaises(HTTPException):
+                await dependency(UserORM(id=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import time
+import unittest
+from typing import Annotated
+from unittest.mock import AsyncMock, patch
+
+from fakeredis import FakeAsyncRedis
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.database import db as db_module
+from src.database.models import Base, UserORM
+from src.database.redis import get_redis
+from src.database.replicas import READ_YOUR_WRITES_COOKIE, ReplicaSet
+from src.middleware.read_your_writes import ReadYourWritesMiddleware
+from src.services.auth import get_access_token_payload, get_current_user
+from src.settings import settings
+
+
+def make_request(cookie: str | None = None) -> Request:
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class TestReplicaSet(unittest.TestCase):
+
+    def setUp(self):
+        self.first = create_engine("sqlite://")
+        self.second = create_engine("sqlite://")
+        self.broken = create_engine("sqlite:////nonexistent/dir/replica.db")
+        self.replicas = ReplicaSet(settings.postgres, [self.first, self.second, self.broken])
+
+    def test_round_robin(self):
+        self.replicas.check()
+        chosen = [self.replicas.choose() for _ in range(4)]
+        self.assertEqual(chosen, [self.first, self.second, self.first, self.second])
+
+    def test_eject_and_readmit(self):
+        self.replicas.eject(self.first)
+        self.assertEqual({self.replicas.choose() for _ in range(3)}, {self.second, self.broken})
+
+        self.replicas.check()
+        self.assertEqual(self.replicas.healthy, [self.first, self.second])
+
+    def test_no_healthy_replica(self):
+        replicas = ReplicaSet(settings.postgres, [self.broken])
+        replicas.check()
+        self.assertIsNone(replicas.choose())
+
+
+class TestGetReadDb(unittest.TestCase):
+
+    def setUp(self):
+        self.replica = create_engine("sqlite://")
+        self.replicas = ReplicaSet(settings.postgres, [self.replica])
+        patcher = patch.object(db_module, "replicas", self.replicas)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_db(self, request: Request):
+        dependency = db_module.get_read_db(request)
+        return dependency, next(dependency)
+
+    def test_reads_from_replica(self):
+        _, db = self.read_db(make_request())
+        self.assertIs(db.get_bind(), self.replica)
+
+    def test_recent_write_reads_from_primary(self):
+        _, db = self.read_db(make_request(f"{READ_YOUR_WRITES_COOKIE}={time.time() + 5}"))
+        self.assertIs(db.get_bind(), db_module.engine)
+
+        _, db = self.read_db(make_request(f"{READ_YOUR_WRITES_COOKIE}={time.time() - 5}"))
+        self.assertIs(db.get_bind(), self.replica)
+
+    def test_connection_error_ejects_replica(self):
+        dependency, _ = self.read_db(make_request())
+        with self.assertRaises(OperationalError):
+            dependency.throw(OperationalError("SELECT 1", {}, Exception("connection refused")))
+        self.assertEqual(self.replicas.healthy, [])
+
+    def test_without_replicas_reads_from_primary(self):
+        self.replicas.eject(self.replica)
+        _, db = self.read_db(make_request())
+        self.assertIs(db.get_bind(), db_module.engine)
+
+
+class TestReadYourWritesMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+
+        @app.get("/item")
+        async def read_item():
+            return {}
+
+        @app.post("/item")
+        async def create_item():
+            return {}
+
+        @app.delete("/item")
+        async def delete_item():
+            return {}
+
+        @app.put("/item")
+        async def replace_item():
+            raise ValueError
+
+        app.add_middleware(ReadYourWritesMiddleware, seconds=5)
+        self.client = TestClient(app, raise_server_exceptions=False)
+
+    def test_write_sets_cookie(self):
+        response = self.client.post("/item")
+        until = float(response.cookies[READ_YOUR_WRITES_COOKIE])
+        self.assertAlmostEqual(until, time.time() + 5, delta=1)
+
+    def test_read_and_failed_write_do_not_set_cookie(self):
+        self.assertNotIn(READ_YOUR_WRITES_COOKIE, self.client.get("/item").cookies)
+        self.assertNotIn(READ_YOUR_WRITES_COOKIE, self.client.put("/item").cookies)
+
+
+class TestCurrentUserSource(unittest.TestCase):
+
+    def test_cache_miss_reads_the_primary(self):
+        primary, replica = (
+            create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+            for _ in range(2)
+        )
+        for engine in (primary, replica):
+            Base.metadata.create_all(engine)
+        with Session(primary) as db:
+            db.add(UserORM(id=1, email="fresh@example.com", hashed_password="-", first_name="A", confirmed=True))
+            db.commit()
+        with Session(replica) as db:
+            # The replica has not caught up with the confirmation yet
+            db.add(UserORM(id=1, email="fresh@example.com", hashed_password="-", first_name="A", confirmed=False))
+            db.commit()
+
+        app = FastAPI()
+
+        @app.get("/me")
+        async def me(user: Annotated[UserORM, Depends(get_current_user)]):
+            return {"confirmed": user.confirmed}
+
+        app.dependency_overrides[get_access_token_payload] = lambda: {"sub": "1"}
+        app.dependency_overrides[db_module.get_db] = lambda: Session(primary)
+        app.dependency_overrides[db_module.get_read_db] = lambda: Session(replica)
+        app.dependency_overrides[get_redis] = lambda: FakeAsyncRedis()
+        with patch("src.services.auth.revocations.is_revoked", AsyncMock(return_value=False)):
+            self.assertEqual(TestClient(app).get("/me").json(), {"confirmed": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,9 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from sqlalchemy.orm import Session
 
-from src.database.models import ContactORM, UserORM
+from src.database.models import ContactORM, ContactTombstoneORM, UserORM
 from src.repository import contacts as contacts_repository
 from src.schemas.contacts import (
     ContactSchema,
@@ -19,6 +19,9 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.session = MagicMock(spec=Session)
         self.user_model = UserORM(id=1)
+        patcher = patch.object(contacts_repository, "contact_event", MagicMock(return_value={"version": 1}))
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     async def test_get_contacts(self):
         contact_models = [ContactORM(), ContactORM(), ContactORM()]
@@ -28,16 +31,45 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         )
         self.assertEqual(result, contact_models)
 
+    async def test_get_contacts_reuses_statements(self):
+        filter_params = FilterParams(last_name="Doe", phone="123")
+        await contacts_repository.get_contacts(self.session, self.user_model.id, filter_params)
+        first_stmt, params = self.session.scalars.call_args.args
+        self.assertEqual(params, {"user_id": 1, "last_name": "Doe", "phone": "+123"})
+
+        await contacts_repository.get_contacts(self.session, 2, FilterParams(last_name="Roe", phone="456"))
+        second_stmt, params = self.session.scalars.call_args.args
+        self.assertIs(first_stmt, second_stmt)
+        self.assertEqual(params, {"user_id": 2, "last_name": "Roe", "phone": "+456"})
+
+    async def test_get_contacts_filters_on_normalized_columns(self):
+        filter_params = FilterParams(email="John@Example.com", phone="+1 (555) 010")
+        await contacts_repository.get_contacts(self.session, self.user_model.id, filter_params)
+        stmt, params = self.session.scalars.call_args.args
+        self.assertEqual(params, {"user_id": 1, "email": "john@example.com", "phone": "+1555010"})
+        self.assertIn("contacts.phone_normalized = :phone", str(stmt))
+        self.assertIn("contacts.email_normalized = :email", str(stmt))
+
+    async def test_get_contacts_loads_only_requested_fields(self):
+        await contacts_repository.get_contacts(self.session, self.user_model.id, FilterParams(), ("id", "phone"))
+        stmt, _ = self.session.scalars.call_args.args
+        columns = str(stmt).split("FROM")[0]
+        self.assertIn("contacts.phone", columns)
+        self.assertNotIn("contacts.extra", columns)
+
+        await contacts_repository.get_contacts(self.session, 2, FilterParams(), ("id", "phone"))
+        self.assertIs(self.session.scalars.call_args.args[0], stmt)
+
     async def test_get_contact_by_id_found(self):
         contact = ContactORM()
-        self.session.execute().first.return_value = contact
+        self.session.scalars().first.return_value = contact
         result = await contacts_repository.get_contact_by_id(
             self.session, self.user_model.id, contact_id=1
         )
         self.assertEqual(result, contact)
 
     async def test_get_contact_by_id_not_found(self):
-        self.session.execute().first.return_value = None
+        self.session.scalars().first.return_value = None
         result = await contacts_repository.get_contact_by_id(
             self.session, self.user_model.id, contact_id=1
         )
@@ -66,7 +98,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     async def test_update_contact_found(self):
         contact = ContactORM()
-        self.session.execute().scalar.return_value = contact
+        self.session.scalars().first.return_value = contact
         self.session.commit.return_value = None
         body = ContactUpdateSchema(
             first_name="Jane", last_name="Smith", phone="987654321",
@@ -78,7 +110,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result, contact)
 
     async def test_update_contact_not_found(self):
-        self.session.execute().scalar.return_value = None
+        self.session.scalars().first.return_value = None
         body = ContactUpdateSchema(
             first_name="Jane", last_name="Smith", phone="987654321",
             email="jane@example.com", birth_date=None, extra="Updated"
@@ -90,7 +122,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     async def test_update_birth_date_found(self):
         contact = ContactORM()
-        self.session.execute().scalar.return_value = contact
+        self.session.scalars().first.return_value = contact
         self.session.commit.return_value = None
         body = ContactBirthDateUpdateSchema(birth_date="2000-01-01")
         result = await contacts_repository.update_birth_date(
@@ -99,7 +131,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result, contact)
 
     async def test_update_birth_date_not_found(self):
-        self.session.execute().scalar.return_value = None
+        self.session.scalars().first.return_value = None
         body = ContactBirthDateUpdateSchema(birth_date="2000-01-01")
         result = await contacts_repository.update_birth_date(
             self.session, self.user_model.id, contact_id=1, body=body
@@ -108,7 +140,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     async def test_delete_contact_found(self):
         contact = ContactORM()
-        self.session.execute().scalar.return_value = contact
+        self.session.scalars().first.return_value = contact
         self.session.commit.return_value = None
         result = await contacts_repository.delete_contact(
             self.session, self.user_model.id, contact_id=1
@@ -116,8 +148,28 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.session.delete.assert_called_with(contact)
         self.assertEqual(result, contact)
 
+    async def test_delete_contact_leaves_tombstone(self):
+        self.session.scalars().first.return_value = ContactORM(id=5, user_id=1)
+        self.session.execute().scalar_one.return_value = 8
+        await contacts_repository.delete_contact(self.session, self.user_model.id, contact_id=5)
+        tombstone = self.session.add.call_args.args[0]
+        self.assertIsInstance(tombstone, ContactTombstoneORM)
+        self.assertEqual((tombstone.user_id, tombstone.contact_id, tombstone.version), (1, 5, 8))
+
+    async def test_get_changes_merges_pages_by_version(self):
+        self.session.scalars().all.side_effect = [
+            [ContactORM(id=1, version=2), ContactORM(id=2, version=4)],
+            [ContactTombstoneORM(contact_id=3, version=3)],
+        ]
+        changed, deleted, has_more = await contacts_repository.get_changes(
+            self.session, self.user_model.id, since=1, limit=2
+        )
+        self.assertEqual([contact.id for contact in changed], [1])
+        self.assertEqual([tombstone.contact_id for tombstone in deleted], [3])
+        self.assertTrue(has_more)
+
     async def test_delete_contact_not_found(self):
-        self.session.execute().scalar.return_value = None
+        self.session.scalars().first.return_value = None
         result = await contacts_repository.delete_contact(
             self.session, self.user_model.id, contact_id=1
         )
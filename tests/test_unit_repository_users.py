@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import MagicMock
 
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
 
 from src.database.models import UserORM
@@ -35,48 +36,97 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
             first_name="John",
             last_name="Doe"
         )
-        user_model = await users_repository.create_user(self.session, body)
-        self.session.add.assert_called()
+        user = UserORM()
+        self.session.get_bind().dialect.name = "postgresql"
+        self.session.scalars().first.return_value = user
+
+        result = await users_repository.create_user(self.session, body)
+        stmt, params = self.session.scalars.call_args.args
+        self.assertIn("ON CONFLICT (email) DO NOTHING RETURNING", str(stmt.compile(dialect=postgresql.dialect())))
+        self.assertEqual(params["email"], body.email)
+        self.assertEqual(params["hashed_password"], body.password)
         self.session.commit.assert_called()
-        self.session.refresh.assert_called_with(user_model)
-        self.assertEqual(user_model.email, body.email)
-        self.assertEqual(user_model.hashed_password, body.password)
+        self.assertEqual(result, user)
+
+    async def test_create_user_conflict(self):
+        body = UserCreateSchema(
+            email="test@example.com",
+            password="hashed_pw",
+            first_name="John",
+        )
+        self.session.get_bind().dialect.name = "sqlite"
+        self.session.scalars().first.return_value = None
+
+        result = await users_repository.create_user(self.session, body)
+        self.session.expunge.assert_not_called()
+        self.assertIsNone(result)
+
+    async def test_get_user_by_id(self):
+        user = UserORM()
+        self.session.get.return_value = user
+        result = await users_repository.get_user_by_id(self.session, user_id=1)
+        self.session.get.assert_called_with(UserORM, 1)
+        self.assertEqual(result, user)
 
     async def test_update_refresh_token(self):
         user = UserORM()
         self.session.scalars().first.return_value = user
-        self.session.commit.return_value = None
 
-        await users_repository.update_refresh_token(
-            self.session, email="test@example.com", token="new_refresh_token"
+        result = await users_repository.update_refresh_token(
+            self.session, user_id=1, token="new_refresh_token"
         )
-        self.assertEqual(user.refresh_token, "new_refresh_token")
+        stmt, params = self.session.scalars.call_args.args
+        self.assertIn("UPDATE users", str(stmt))
+        self.assertIn("RETURNING", str(stmt))
+        self.assertEqual(params, {"user_id": 1, "refresh_token": "new_refresh_token"})
+        self.session.expunge.assert_called_with(user)
         self.session.commit.assert_called()
+        self.assertEqual(result, user)
+
+    async def test_claim_refresh_token(self):
+        user = UserORM()
+        self.session.scalars().first.return_value = user
+
+        result = await users_repository.claim_refresh_token(self.session, user_id=1, token="old_refresh_token")
+        stmt, params = self.session.scalars.call_args.args
+        self.assertIn("WHERE users.id = :user_id AND users.refresh_token = :token", str(stmt))
+        self.assertEqual(params, {"user_id": 1, "token": "old_refresh_token"})
+        self.session.commit.assert_called()
+        self.assertEqual(result, user)
 
     async def test_confirmed_email(self):
         user = UserORM()
         self.session.scalars().first.return_value = user
-        self.session.commit.return_value = None
 
-        await users_repository.confirmed_email(
-            self.session, email="test@example.com"
-        )
-        self.assertTrue(user.confirmed)
+        result = await users_repository.confirmed_email(self.session, email="test@example.com")
+        stmt, params = self.session.scalars.call_args.args
+        self.assertIn("WHERE users.email = :verified_email AND users.confirmed IS NOT true", str(stmt))
+        self.assertEqual(params, {"verified_email": "test@example.com"})
+        self.session.expunge.assert_called_with(user)
         self.session.commit.assert_called()
+        self.assertEqual(result, user)
 
     async def test_update_avatar(self):
         user = UserORM()
         self.session.scalars().first.return_value = user
-        self.session.refresh.return_value = None
 
         result = await users_repository.update_avatar(
-            self.session, email="test@example.com", url="http://avatar.url"
+            self.session, user_id=1, url="http://avatar.url"
         )
-        self.assertEqual(user.avatar, "http://avatar.url")
+        _, params = self.session.scalars.call_args.args
+        self.assertEqual(params, {"user_id": 1, "avatar": "http://avatar.url"})
         self.session.commit.assert_called()
-        self.session.refresh.assert_called_with(user)
         self.assertEqual(result, user)
 
+    async def test_update_missing_user(self):
+        self.session.scalars().first.return_value = None
+
+        result = await users_repository.update_avatar(
+            self.session, user_id=1, url="http://avatar.url"
+        )
+        self.session.expunge.assert_not_called()
+        self.assertIsNone(result)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import AsyncMock
+
+from fakeredis import FakeAsyncRedis
+
+from src.services.revocation import BloomFilter, RevocationList
+from src.settings import RevocationSettings
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f"jti:{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"jti:{i}")
+        false_positives = sum(f"sid:{i}" in bloom for i in range(10_000))
+        self.assertLess(false_positives, 300)
+
+
+class TestRevocationList(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = FakeAsyncRedis()
+        self.config = RevocationSettings(capacity=100, sync_batch=2)
+        self.revocations = RevocationList(self.config)
+
+    async def test_valid_token_skips_redis(self):
+        redis = AsyncMock()
+        self.assertFalse(await self.revocations.is_revoked(redis, {"jti": "a", "sid": "b"}))
+        redis.exists.assert_not_called()
+
+    async def test_revoked_token(self):
+        await self.revocations.revoke(self.redis, ["sid:b"])
+        self.assertTrue(await self.revocations.is_revoked(self.redis, {"jti": "a", "sid": "b"}))
+        self.assertFalse(await self.revocations.is_revoked(self.redis, {"jti": "a", "sid": "c"}))
+
+    async def test_expired_revocation_is_not_authoritative(self):
+        await self.revocations.revoke(self.redis, ["jti:a"])
+        await self.redis.delete("revoked:jti:a")
+        self.assertFalse(await self.revocations.is_revoked(self.redis, {"jti": "a"}))
+
+    async def test_sync_from_other_worker(self):
+        other = RevocationList(self.config)
+        await other.revoke(self.redis, ["jti:a", "jti:b", "sid:c"])
+        self.assertFalse(await self.revocations.is_revoked(self.redis, {"jti": "a"}))
+
+        await self.revocations.sync(self.redis)
+        for payload in ({"jti": "a"}, {"jti": "b"}, {"sid": "c"}):
+            self.assertTrue(await self.revocations.is_revoked(self.redis, payload))
+
+        await other.revoke(self.redis, ["jti:d"])
+        await self.revocations.sync(self.redis)
+        self.assertTrue(await self.revocations.is_revoked(self.redis, {"jti": "d"}))
+        self.assertEqual(self.revocations.filter.count, 4)
+
+    async def test_revoked_tokens_stay_revoked_during_a_rebuild(self):
+        await self.revocations.revoke(self.redis, ["jti:a"])
+        self.revocations.filter.count = self.config.capacity
+        xrange, checks = self.redis.xrange, []
+
+        async def check_while_loading(*args, **kwargs):
+            checks.append(await self.revocations.is_revoked(self.redis, {"jti": "a"}))
+            return await xrange(*args, **kwargs)
+
+        self.redis.xrange = check_while_loading
+        await self.revocations.sync(self.redis)
+        self.assertEqual(checks, [True])
+        self.assertEqual(self.revocations.filter.count, 1)
+        self.assertTrue(await self.revocations.is_revoked(self.redis, {"jti": "a"}))
@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fakeredis import FakeAsyncRedis
+
+from src.settings import CacheSettings
+from src.utils.singleflight import SingleFlight, StaleWhileRevalidateCache, coalesced_loads, jittered
+
+
+def slow_load(value, calls):
+    async def load():
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+    return load
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_callers_share_one_load(self):
+        flight, calls = SingleFlight("test"), []
+        before = coalesced_loads.values.get(("test",), 0)
+        results = await asyncio.gather(*(flight.do("k", slow_load(1, calls)) for _ in range(5)))
+        self.assertEqual(results, [1] * 5)
+        self.assertEqual(calls, [1])
+        self.assertEqual(coalesced_loads.values[("test",)] - before, 4)
+        self.assertNotIn("k", flight)
+
+    async def test_failure_reaches_every_caller(self):
+        flight = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(await flight.do("k", AsyncMock(return_value=2)), 2)
+
+    async def test_first_caller_going_away_does_not_fail_the_others(self):
+        flight, calls = SingleFlight("test"), []
+        first = asyncio.create_task(flight.do("k", slow_load(1, calls)))
+        await asyncio.sleep(0)
+        others = [asyncio.create_task(flight.do("k", slow_load(2, calls))) for _ in range(2)]
+        await asyncio.sleep(0)
+        first.cancel()
+
+        self.assertEqual(await asyncio.gather(*others), [1, 1])
+        self.assertTrue(first.cancelled())
+        self.assertEqual(calls, [1])
+        self.assertNotIn("k", flight)
+
+
+class TestStaleWhileRevalidateCache(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeAsyncRedis()
+        self.cache = StaleWhileRevalidateCache("test", CacheSettings(lock_poll_ms=1), ttl=60)
+
+    async def test_miss_loads_once_and_caches(self):
+        calls = []
+        results = await asyncio.gather(*(self.cache.get(self.redis, "k", slow_load(b"v", calls)) for _ in range(3)))
+        self.assertEqual(results, [b"v"] * 3)
+        self.assertEqual(calls, [b"v"])
+        self.assertEqual(await self.cache.get(self.redis, "k", AsyncMock()), b"v")
+        self.assertGreater(await self.redis.pttl("k"), 60_000)
+
+    async def test_none_is_not_cached(self):
+        self.assertIsNone(await self.cache.get(self.redis, "k", AsyncMock(return_value=None)))
+        self.assertFalse(await self.redis.exists("k"))
+
+    async def test_stale_value_is_served_while_one_caller_refreshes(self):
+        await self.cache.set(self.redis, "k", b"old")
+        await self.redis.hset("k", "t", 0)
+
+        calls = []
+        results = await asyncio.gather(*(self.cache.get(self.redis, "k", slow_load(b"new", calls)) for _ in range(3)))
+        self.assertEqual(calls, [b"new"])
+        self.assertEqual(results.count(b"new"), 1)
+        self.assertEqual(results.count(b"old"), 2)
+        self.assertEqual(await self.redis.hget("k", "v"), b"new")
+
+    async def test_other_process_holding_the_lock(self):
+        await self.redis.set("k:lock", "other")
+
+        async def fill():
+            await asyncio.sleep(0.01)
+            await self.cache.set(self.redis, "k", b"theirs")
+
+        load = AsyncMock(return_value=b"mine")
+        value, _ = await asyncio.gather(self.cache.get(self.redis, "k", load), fill())
+        self.assertEqual(value, b"theirs")
+        load.assert_not_awaited()
+        self.assertEqual(await self.redis.get("k:lock"), b"other")
+
+    async def test_jittered(self):
+        with patch("src.utils.singleflight.random.uniform", return_value=0.1):
+            self.assertAlmostEqual(jittered(100, 0.1), 90)
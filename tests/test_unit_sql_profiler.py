@@ -0,0 +1,61 @@
+from unittest.mock import AsyncMock
+
+from sqlalchemy import create_engine, text
+
+from src.database.models import UserORM
+from src.database.profiler import normalize_statement, parse_summary, profile_queries
+from src.services.auth import create_verify_token
+
+
+def test_normalize_statement():
+    statement = "SELECT *\n  FROM contacts WHERE id IN (1, 2, 3) AND email = 'a@b.c' AND user_id = %(user_id)s"
+    assert normalize_statement(statement) == (
+        "SELECT * FROM contacts WHERE id IN (?) AND email = ? AND user_id = ?"
+    )
+
+
+def test_profile_flags_repeated_and_slow_statements():
+    engine = create_engine("sqlite://")
+    with profile_queries(slow_query_ms=0, repeat_threshold=3) as profile:
+        with engine.connect() as conn:
+            for i in range(3):
+                conn.execute(text("SELECT :value"), {"value": i})
+
+    assert len(profile.records) == 3
+    assert profile.records[0].params == 1
+    assert profile.repeated() == {"SELECT ?": 3}
+    assert len(profile.slow()) == 3
+    assert parse_summary(profile.summary())["repeated"] == 1
+
+
+def test_profile_is_inactive_outside_context():
+    engine = create_engine("sqlite://")
+    with profile_queries(slow_query_ms=100, repeat_threshold=3) as profile:
+        pass
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert profile.records == []
+
+
+def test_signup_query_budget(query_budget, user, monkeypatch):
+    monkeypatch.setattr("src.services.email.send_email", AsyncMock())
+    response = query_budget("POST", "/auth/signup", max_queries=1, json=user)
+    assert response.status_code == 201, response.text
+
+
+def test_confirmed_email_query_budget(query_budget, user):
+    token = create_verify_token(UserORM(email=user["email"]))
+    response = query_budget("GET", f"/auth/confirmed_email/{token}", max_queries=1)
+    assert response.json() == {"message": "Email confirmed."}
+
+
+def test_login_query_budget(query_budget, session, user):
+    user_model = session.query(UserORM).filter_by(email=user["email"]).first()
+    user_model.confirmed = True
+    session.commit()
+
+    response = query_budget(
+        "POST", "/auth/login", max_queries=1,
+        data={"username": user["email"], "password": user["password"]},
+    )
+    assert response.status_code == 200, response.text